@@ -1,18 +1,132 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, session, jsonify
-import re, json
+from flask import Flask, render_template, request, flash, redirect, url_for, session, jsonify, g, Response, send_file, abort
+import os, re
+import time
+import asyncio
+import logging
+import threading
+from src.config import load_env, configure_logging
 from src.utilities import parse_grades_pdf, parse_review_summary, normalize_course_id, clean_description
-from src.knowledgebase import recommend_courses, get_course_by_id
+from src.knowledgebase import recommend_courses, get_course_with_alternatives_async, get_recommendation_cache_stats
+from src.semesters import recommend_across_semesters
+from src.timing import StageTimings, span
+from src.metrics import REQUEST_SECONDS, render_metrics
+from src.profiling import RequestProfile, get_profile_token, requested_mode, is_admin, list_profiles, profile_path
+from src.course_metadata import parse_course_metadata
+from src.connections import get_connection_stats
+from src.embeddings import warmup_embedding_model, get_embedding_model_status, get_embedding_cache_stats
 from src.agent_supervisor import supervisor_agent  # Use new supervisor
+from src.autocomplete import get_completer, warmup_autocomplete, DEFAULT_LIMIT, MAX_LIMIT
+
+load_env()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = "dev"  # change later
 
+# Courses hydrated and rendered per recommendations request (the rest are only counted)
+RECOMMENDATIONS_PAGE_SIZE = int(os.getenv("RECOMMENDATIONS_PAGE_SIZE", 100))
+
+# Load the embedding model at boot instead of on the first request
+if os.getenv("EMBEDDING_EAGER_LOAD", "").lower() in ("1", "true", "yes"):
+    warmup_embedding_model()
+
+# Build the course ID / title autocomplete indexes in the background at boot instead of on first use
+AUTOCOMPLETE_SEMESTERS = [s.strip() for s in os.getenv("AUTOCOMPLETE_SEMESTERS", "WINTER_2025_2026").split(",") if s.strip()]
+if os.getenv("AUTOCOMPLETE_PRELOAD", "").lower() in ("1", "true", "yes"):
+    threading.Thread(target=warmup_autocomplete, args=(AUTOCOMPLETE_SEMESTERS,), daemon=True,
+                     name="autocomplete-warmup").start()
+
+
+# On-demand request profiling (see src/profiling.py); checked once so it costs nothing when off
+PROFILING_ENABLED = get_profile_token() is not None
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if PROFILING_ENABLED:
+        mode = requested_mode(request.headers, request.args)
+        if mode:
+            profile = RequestProfile(mode, request.endpoint)
+            if profile.start():
+                g.profile = profile
+            else:
+                g.profile_busy = True
+
+
+@app.after_request
+def record_request_time(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        response.headers['X-Profile-Name'] = profile.stop()
+    elif g.pop('profile_busy', False):
+        response.headers['X-Profile-Name'] = 'busy'
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.endpoint or "unknown",
+                                request.method, str(response.status_code))
+    return response
+
+
+@app.teardown_request
+def stop_profile(exc):
+    # after_request is skipped when the view raises: still save (and release) the profile
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: stage and request latency histograms of this worker"""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profiles")
+def admin_profiles():
+    """Stored request profiles, newest first (admin token required)"""
+    if not is_admin(request.headers, request.args):
+        abort(404)
+    return jsonify({'profiles': list_profiles()})
+
+
+@app.get("/admin/profiles/<name>")
+def admin_profile(name):
+    """Download one stored profile (admin token required)"""
+    path = profile_path(name) if is_admin(request.headers, request.args) else None
+    if path is None:
+        abort(404)
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=name)
+
 
 @app.get("/")
 def index():
     return render_template("index.html")
 
 
+def resolve_course_input(semester, query):
+    """
+    Index course ID for the overview form: a 6- or 8-digit ID resolves to the
+    index's own ID, and anything else (e.g. "פיזיקה 2") takes the best
+    autocomplete match. If the autocomplete index can't be built, an ID is used
+    as typed (a name flashes an error).
+    """
+    query = query.strip()
+    course_id = query if re.fullmatch(r"\d{6}|\d{8}", query) else ""
+    try:
+        if course_id:
+            return get_completer(semester).lookup(course_id) or course_id
+        if query:
+            matches = get_completer(semester).complete(query, limit=1)
+            return matches[0]['id'] if matches else ""
+    except Exception:
+        logger.exception("Autocomplete lookup failed for %r", query)
+        if not course_id:
+            flash("An error occurred while looking up the course.")
+    return course_id
+
+
 @app.route("/course-overview", methods=["GET", "POST"])
 def course_overview():
     """Display specific course details and structured summary"""
@@ -23,49 +137,45 @@ def course_overview():
     if request.method == "POST":
         # Get query and clean it
         query = request.form.get("course_id", "").strip()
-        clean_id = re.sub(r"\D", "", query)
+        semester = session.get('filters', {}).get('semester', 'WINTER_2025_2026')
+
+        clean_id = resolve_course_input(semester, query)
 
         if clean_id:
             try:
-                # 1. Fetch metadata from Pinecone
-                semester = session.get('filters', {}).get('semester', 'WINTER_2025_2026')
-                raw_data = get_course_by_id(clean_id, semester)
+                # 1. Fetch metadata and similar courses ("alternatives") concurrently
+                timings = StageTimings()
+                raw_data, alternatives = asyncio.run(
+                    get_course_with_alternatives_async(
+                        clean_id, semester, top_n=3,
+                        completed=[c['id'] for c in session.get('completed_courses', [])],
+                        timings=timings
+                    )
+                )
+                logger.debug("course_overview timings (ms): %s", timings.stages)
 
                 if raw_data:
-                    # 2. Parse the review summary string into structured parts
-                    summary_parts = parse_review_summary(raw_data.get('reviews_summary', ''))
-
-                    # 3. Process the summaries into (Overview, Quotes)
-                    interest_data = split_summary_and_quotes(summary_parts.get('interest', ''))
-                    workload_data = split_summary_and_quotes(summary_parts.get('workload', ''))
-                    bottom_data = split_summary_and_quotes(summary_parts.get('bottom_line', ''))
-
-                    # 4. Calculate average grade from the JSON dictionary
-                    avg_grade = 0
-                    try:
-                        grades_dict = json.loads(raw_data.get('avg_grades', '{}'))
-                        if grades_dict:
-                            avg_grade = sum(grades_dict.values()) / len(grades_dict)
-                    except:
-                        avg_grade = 0
-
-                    # 5. Parse prerequisites
-                    prereqs = []
-                    try:
-                        prereqs = json.loads(raw_data.get('prerequisites', '[]'))
-                        # Flatten list of lists for display if simple, or keep structure
-                        flat_prereqs = []
-                        for group in prereqs:
-                            flat_prereqs.append(" OR ".join(group))
-                        prereqs = flat_prereqs
-                    except:
-                        prereqs = []
+                    with span("summary_parse"):
+                        # 2. Parse the review summary string into structured parts
+                        summary_parts = parse_review_summary(raw_data.get('reviews_summary', ''))
+
+                        # 3. Process the summaries into (Overview, Quotes)
+                        interest_data = split_summary_and_quotes(summary_parts.get('interest', ''))
+                        workload_data = split_summary_and_quotes(summary_parts.get('workload', ''))
+                        bottom_data = split_summary_and_quotes(summary_parts.get('bottom_line', ''))
+
+                    # 4. Typed fields: average grade and prerequisites come pre-derived from ingest
+                    typed = parse_course_metadata(raw_data)
+                    avg_grade = typed['avg_grade'] or 0
+
+                    # 5. Prerequisites: flatten list of lists for display
+                    prereqs = [" OR ".join(group) for group in typed['prerequisites']]
 
                     # 6. Build the display object
                     course_data = {
                         "id": raw_data.get('id', clean_id),
                         "name": raw_data.get('title', 'Unknown Course'),
-                        "points": float(raw_data.get('credits', 0)),
+                        "points": typed['credits'] or 0.0,
                         "rating_5": float(raw_data.get('general_rating', 0) or 0),
                         "workload_rating": float(raw_data.get('workload_rating', 0) or 0),
 
@@ -81,32 +191,15 @@ def course_overview():
                         "moed_b": raw_data.get('moed_b'),
                         "avg_grade": avg_grade
                     }
-
-                    # 7. Get "Similar Courses" (Alternatives)
-                    try:
-                        recs_df = recommend_courses(
-                            semester_name=semester,
-                            courses_list=[clean_id],  # Exclude current course
-                            user_query=course_data['name'],  # Search by title
-                            semantic_weight=0.9,  # High weight on semantic match
-                            credits_weight=0,
-                            avg_grade_weight=0.1,
-                            workload_rating_weight=0,
-                            general_rating_weight=0
-                        )
-
-                        if not recs_df.empty:
-                            alternatives = recs_df.head(3).to_dict('records')
-                    except Exception as e:
-                        print(f"Error fetching alternatives: {e}")
                 else:
                     flash(f"Course {clean_id} not found in database.")
 
-            except Exception as e:
-                print(f"Overview Error: {e}")
+            except Exception:
+                logger.exception("Overview error")
                 flash("An error occurred while fetching course details.")
 
-    return render_template("course_overview.html", course=course_data, query=query, alternatives=alternatives)
+    with span("render"):
+        return render_template("course_overview.html", course=course_data, query=query, alternatives=alternatives)
 
 
 # STEP 1: Upload grade sheet
@@ -132,7 +225,7 @@ def upload():
             return redirect(url_for('review_courses'))
 
         except Exception as e:
-            print(f"Upload Error: {e}")
+            logger.exception("Upload error")
             flash(f"Error parsing file: {str(e)}")
             return redirect(url_for('upload'))
     return render_template("upload.html")
@@ -301,6 +394,7 @@ def recommendations():
     completed_course_ids = [c['id'] for c in completed_courses_data]
 
     courses = []
+    eligible_count = 0
     try:
         # 3. Call the recommendation engine
         ranked_df = recommend_courses(
@@ -313,26 +407,30 @@ def recommendations():
             credits_weight=weights.get('credits', 0.2),
             avg_grade_weight=weights.get('avg_grade', 0.2),
             workload_rating_weight=weights.get('workload_rating', 0.2),
-            general_rating_weight=weights.get('general_rating', 0.2)
+            general_rating_weight=weights.get('general_rating', 0.2),
+            top_n=RECOMMENDATIONS_PAGE_SIZE
         )
         # Convert to dicts
         courses = ranked_df.to_dict('records')
+        eligible_count = ranked_df.attrs.get('eligible_count', len(courses))
 
         # 4. Loop through and add the parsed fields to each course dictionary
-        for course in courses:
-            # Parse the raw summary string into Interest/Workload/BottomLine
-            summary_parts = parse_review_summary(course.get('reviews_summary', ''))
+        with span("summary_parse"):
+            for course in courses:
+                # Parse the raw summary string into Interest/Workload/BottomLine
+                summary_parts = parse_review_summary(course.get('reviews_summary', ''))
 
-            # SPLIT each part into 'overview' and 'quotes' for the UI
-            course['summary_interest'] = split_summary_and_quotes(summary_parts['interest'])
-            course['summary_workload'] = split_summary_and_quotes(summary_parts['workload'])
-            course['summary_bottom_line'] = split_summary_and_quotes(summary_parts['bottom_line'])
-            course['description'] = clean_description(course.get('description', ''))
+                # SPLIT each part into 'overview' and 'quotes' for the UI
+                course['summary_interest'] = split_summary_and_quotes(summary_parts['interest'])
+                course['summary_workload'] = split_summary_and_quotes(summary_parts['workload'])
+                course['summary_bottom_line'] = split_summary_and_quotes(summary_parts['bottom_line'])
+                course['description'] = clean_description(course.get('description', ''))
 
     except Exception as e:
-        print(f"Rec Error: {e}")
+        logger.exception("Recommendations error")
         flash(f"Error: {str(e)}")
         courses = []
+        eligible_count = 0
 
     # Prepare display data so the HTML doesn't crash
     applied_filters = {
@@ -342,13 +440,15 @@ def recommendations():
         "completed_count": len(completed_courses_data)
     }
 
-    return render_template(
-        "recommendations.html",
-        courses=courses,
-        filters=applied_filters,
-        weights=weights,
-        user_query=user_query
-    )
+    with span("render"):
+        return render_template(
+            "recommendations.html",
+            courses=courses,
+            eligible_count=eligible_count,
+            filters=applied_filters,
+            weights=weights,
+            user_query=user_query
+        )
 
 
 # ============================================================================
@@ -393,9 +493,7 @@ def chat():
         return jsonify(result)
 
     except Exception as e:
-        print(f"Chat error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Chat error")
         return jsonify({
             'error': str(e),
             'response': 'מצטער, אירעה שגיאה. אנא נסה שוב.',
@@ -460,7 +558,8 @@ def api_rerank():
             credits_weight=weights.get('credits', 0.2),
             avg_grade_weight=weights.get('avg_grade', 0.2),
             workload_rating_weight=weights.get('workload_rating', 0.2),
-            general_rating_weight=weights.get('general_rating', 0.2)
+            general_rating_weight=weights.get('general_rating', 0.2),
+            top_n=RECOMMENDATIONS_PAGE_SIZE
         )
 
         courses = ranked_df.to_dict('records')
@@ -481,15 +580,92 @@ def api_rerank():
         })
 
     except Exception as e:
-        print(f"Rerank error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Rerank error")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
+@app.post("/api/recommendations/semesters")
+def api_recommendations_semesters():
+    """
+    Compare several semesters at once: the student's profile is ranked against
+    every requested semester concurrently and merged into one list, each
+    course annotated with the semesters that offer it.
+    Body: {"semesters": [...], "query": optional, "top_n": optional}
+    """
+    try:
+        data = request.get_json() or {}
+        semesters = data.get('semesters') or []
+        if not semesters:
+            return jsonify({'success': False, 'error': 'No semesters given'}), 400
+
+        completed_courses_data = session.get('completed_courses', [])
+        filters_data = session.get('filters', {})
+        weights = session.get('weights', {})
+        user_query = data.get('query', session.get('user_query', ''))
+
+        timings = StageTimings()
+        ranked_df = recommend_across_semesters(
+            semesters,
+            courses_list=[c['id'] for c in completed_courses_data],
+            user_query=user_query,
+            no_exam=filters_data.get('no_exam', False),
+            min_credits=filters_data.get('min_credits', 0),
+            semantic_weight=weights.get('semantic', 0.2),
+            credits_weight=weights.get('credits', 0.2),
+            avg_grade_weight=weights.get('avg_grade', 0.2),
+            workload_rating_weight=weights.get('workload_rating', 0.2),
+            general_rating_weight=weights.get('general_rating', 0.2),
+            top_n=int(data.get('top_n', RECOMMENDATIONS_PAGE_SIZE)),
+            timings=timings
+        )
+
+        courses = ranked_df.to_dict('records')
+        for course in courses:
+            course['description'] = clean_description(course.get('description', ''))
+
+        return jsonify({
+            'success': True,
+            'courses': courses,
+            'failed_semesters': ranked_df.attrs.get('failed_semesters', {}),
+            'timings_ms': timings.as_dict()
+        })
+
+    except Exception as e:
+        logger.exception("Multi-semester error")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.get("/api/autocomplete")
+def api_autocomplete():
+    """Courses whose ID (6 or 8 digits) or title starts with ?q=, for search-as-you-type"""
+    semester = request.args.get('semester') or session.get('filters', {}).get('semester', 'WINTER_2025_2026')
+    limit = min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT)
+    try:
+        matches = get_completer(semester).complete(request.args.get('q', ''), limit=limit)
+    except Exception as e:
+        logger.exception("Autocomplete failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, 'semester': semester, 'matches': matches})
+
+
+@app.get("/api/status")
+def api_status():
+    """Runtime status: embedding model load time and memory, cache hit rates, connection reuse"""
+    return jsonify({
+        'pid': os.getpid(),
+        'embedding_model': get_embedding_model_status(),
+        'embedding_cache': get_embedding_cache_stats(),
+        'recommendation_cache': get_recommendation_cache_stats(),
+        'pinecone_connections': get_connection_stats()
+    })
+
+
 # ============================================================================
 # WISHLIST LOGIC
 # ============================================================================
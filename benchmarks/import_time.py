@@ -0,0 +1,108 @@
+"""
+Import-time benchmark: how long a fresh interpreter takes to `import app`.
+
+Runs the import in clean subprocesses, reports the median wall time and the
+slowest modules (from `python -X importtime`), and checks that none of the
+heavy dependencies are loaded at import time.
+
+The budget applies to what the module adds on top of a baseline import
+(--baseline-module, default flask) measured on the same machine, so slower
+runners don't fail on Flask's own cost. Exits non-zero when that median is
+over --max-ms or a heavy module was imported.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module src.knowledgebase --baseline-module numpy --max-ms 100
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded lazily on first use; importing any of them at startup is a regression
+HEAVY_MODULES = ['torch', 'sentence_transformers', 'pinecone', 'google.genai', 'pdfplumber', 'pandas']
+
+
+def _run(args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True,
+                          env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'})
+
+
+def wall_times(module, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(['-c', f'import {module}'])
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def slowest_imports(module, limit):
+    """(cumulative_ms, name) of the slowest top-level imports, from -X importtime."""
+    stderr = _run(['-X', 'importtime', '-c', f'import {module}']).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Only direct imports of the measured module and its own top level
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def heavy_modules_loaded(module):
+    code = f'import sys, {module}; print(" ".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    return _run(['-c', code]).stdout.split()
+
+
+def baseline_ms(runs, module='sys'):
+    return statistics.median(wall_times(module, runs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time")
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--baseline-module", default="flask",
+                        help="Import whose cost is excluded from the budget (default: flask; 'sys' for none)")
+    parser.add_argument("--max-ms", type=float, default=200,
+                        help="Budget for the median import time on top of the baseline module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    interpreter = baseline_ms(args.runs)
+    baseline = baseline_ms(args.runs, args.baseline_module) if args.baseline_module != 'sys' else interpreter
+    times = wall_times(args.module, args.runs)
+    median = statistics.median(times) - interpreter
+    added = statistics.median(times) - baseline
+
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(interpreter start {interpreter:.0f} ms excluded, min {min(times) - interpreter:.0f} ms)")
+    if args.baseline_module != 'sys':
+        print(f"import {args.baseline_module}: median {baseline - interpreter:.0f} ms; "
+              f"{args.module} adds {added:.0f} ms on top")
+    print("Slowest imports:")
+    for cumulative, name in slowest_imports(args.module, args.top):
+        print(f"  {cumulative:8.1f} ms  {name}")
+
+    failed = False
+    heavy = heavy_modules_loaded(args.module)
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if added > args.max_ms:
+        print(f"❌ Over budget: {added:.0f} ms > {args.max_ms:.0f} ms on top of {args.baseline_module}")
+        failed = True
+    if not failed:
+        print(f"✅ Within budget ({args.max_ms:.0f} ms on top of {args.baseline_module}), no heavy modules loaded")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
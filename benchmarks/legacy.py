@@ -0,0 +1,143 @@
+"""
+The original recommendation path, kept only as a comparison baseline for
+benchmarks/recommendation.py: one full index query with metadata, a per-match
+JSON parse and check_prerequisites call into a list of dicts, then a pandas
+rerank over the whole DataFrame.
+
+Copied from src/knowledgebase.py as it was before the catalog, bitset and
+NumPy rerank work; only the debug prints became logger.debug calls so they
+don't dominate the timings. The app uses knowledgebase.get_candidate_set /
+rank_candidate_set instead.
+"""
+import json
+import logging
+from src.course_metadata import DEFAULT_AVG_GRADE
+from src.knowledgebase import get_knowledgebase
+
+logger = logging.getLogger(__name__)
+
+
+def check_prerequisites(courses_list,prerequisites):
+    if len(prerequisites) == 0:
+        return True
+    # Convert to set for O(1) lookup
+    completed_set = set(courses_list)
+
+    # Check each prerequisite combination
+    for combo in prerequisites:
+        # Check if ALL courses in this combo are completed
+        if all(course in completed_set for course in combo):
+            return True  # Found a satisfied combo!
+
+    return False  # No combo was satisfied
+
+
+def filter_according_to_requirements_and_untaken_and_prereq(response,courses_list,no_exam,min_credits):
+    # 3. Filter Locally in Python
+    # Convert list to set for super-fast lookups (O(1) speed)
+    excluded_set = set(courses_list)
+    logger.debug("Excluded set: %s", excluded_set)
+    filtered_courses = []
+
+    for match in response.matches:
+        prereq= json.loads(match["metadata"]["prerequisites"])
+
+        can_take_it = check_prerequisites(courses_list,prereq)
+        # Check if already taken
+        if str(match.id) in excluded_set:
+            logger.debug("EXCLUDED: %s", match.id)
+            continue
+        elif can_take_it:
+            # match.id is the Course ID (assuming you used it as the vector ID)
+            if no_exam == True and match["metadata"]["moed_a"] != "":
+                continue
+            if min_credits > match["metadata"]["credits"]:
+                continue
+
+            grades_dict=json.loads(match["metadata"]["avg_grades"])
+
+            if len(grades_dict)>0:
+                average = sum(grades_dict.values()) / len(grades_dict)
+            else:
+                average=DEFAULT_AVG_GRADE
+
+            # Prepare the data object
+
+            course_data = match.metadata
+            course_data['ID'] = match.id
+            course_data["semantic_score"] = match.score
+            course_data["avg_grade_all_sem"] = average
+
+            filtered_courses.append(course_data)
+        else:
+            logger.debug("Cannot take %s", match["id"])
+    return filtered_courses
+
+
+def get_all_untaken_courses_with_requirements(semester_name="WINTER_2025_2026", courses_list=[], no_exam=False,
+                                              min_credits=0, user_query=""):
+    import pandas as pd
+
+    logger.debug("Starting query with user_query=%r", user_query)
+
+    try:
+        response = get_knowledgebase(semester_name,user_query)
+        # Filter results
+        filtered_courses = filter_according_to_requirements_and_untaken_and_prereq(
+            response, courses_list, no_exam, min_credits
+        )
+        logger.debug("Filtered to %d courses", len(filtered_courses))
+
+        # Convert to DataFrame
+        return pd.DataFrame(filtered_courses)
+
+    except Exception:
+        logger.exception("get_all_untaken_courses_with_requirements failed")
+        raise
+
+
+def rerank(df,semantic_weight=0.2,credits_weight=0.2,avg_grade_weight=0.2,workload_rating_weight=0.2,general_rating_weight=0.2):
+
+    if df.empty:
+        return df
+
+    # Create a copy to avoid modifying original
+    df_ranked = df.copy()
+    df_ranked['workload_rating'] = df_ranked['workload_rating'].fillna(2.5)  # Neutral rating
+    df_ranked['general_rating'] = df_ranked['general_rating'].fillna(2.5)  # Neutral rating
+    df_ranked['credits'] = df_ranked['credits'].fillna(0)
+    df_ranked['avg_grade_all_sem'] = df_ranked['avg_grade_all_sem'].fillna(DEFAULT_AVG_GRADE)
+    df_ranked['semantic_score'] = df_ranked['semantic_score'].fillna(0)
+    # Normalize semantic score (assuming it's already 0-1 from Pinecone)
+    # If score doesn't exist (no semantic search), default to 0
+    semantic_score = df_ranked["semantic_score"]
+
+    # Normalize credits (divide by max)
+    max_credits = df_ranked['credits'].max()
+    if max_credits > 0:
+        credits_normalized = df_ranked['credits'] / max_credits
+    else:
+        credits_normalized = 0
+
+    # Normalize avg_grade (divide by 100)
+    avg_grade_normalized = df_ranked['avg_grade_all_sem'] / 100
+
+    # Normalize workload_rating (divide by 5)
+    workload_normalized = df_ranked['workload_rating'] / 5
+
+    # Normalize general_rating (divide by 5)
+    general_rating_normalized = df_ranked['general_rating'] / 5
+
+    # Calculate combined score
+    df_ranked['combined_score'] = (
+            semantic_weight * semantic_score +
+            credits_weight * credits_normalized +
+            avg_grade_weight * avg_grade_normalized +
+            workload_rating_weight * workload_normalized +
+            general_rating_weight * general_rating_normalized
+    )
+
+    # Sort by combined score (descending - higher is better)
+    df_ranked = df_ranked.sort_values('combined_score', ascending=False).reset_index(drop=True)
+
+    return df_ranked
@@ -0,0 +1,325 @@
+"""
+End-to-end load test: concurrent virtual students walking through the app.
+
+Each virtual user repeats the full flow with its own cookie session:
+upload (skipped) -> add and confirm completed courses -> filters ->
+/recommendations -> /api/chat (RAG question, then a rerank request) ->
+/api/rerank -> wishlist add / remove.
+
+By default the app is started in-process (benchmarks/loadtest_app.py: synthetic
+catalog, stand-in Pinecone and Gemini with configurable latency). With --url it
+drives an already running server instead, e.g. gunicorn serving loadtest_app
+with the same LOADTEST_* settings. Reports throughput, p50/p95/p99 per step
+and the RSS growth of every worker seen at /api/status (in-process, that RSS
+includes the load driver itself).
+
+    python benchmarks/loadtest.py --users 20 --duration 60 --gemini-latency-ms 800
+    gunicorn --chdir benchmarks -w 4 --threads 8 -b 127.0.0.1:8000 loadtest_app:app
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --users 50 --duration 120
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import contextlib
+import urllib.error
+import urllib.parse
+import urllib.request
+import http.cookiejar
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import generate_catalog, query_pool
+
+
+RERANK_REQUESTS = ['תעדיף קורסים קלים', 'דרג לפי ציונים', 'רק קורסים ללא מבחן', 'שנה משקל לעומס נמוך']
+STATUS_PATH = '/api/status'
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A browser follows redirects with a separate GET; the session issues that GET as its own step
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder:
+    """Thread-safe latency samples per step."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def record(self, step, elapsed_ms, ok):
+        with self._lock:
+            self.samples[step].append(elapsed_ms)
+            if not ok:
+                self.errors[step] += 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+
+class VirtualUser:
+    """One student session: a cookie jar and the request helpers, timed into a Recorder."""
+
+    def __init__(self, base_url, recorder, catalog, queries, think_ms, seed):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.catalog = catalog
+        self.queries = queries
+        self.think_ms = think_ms
+        self.rng = random.Random(seed)
+
+    def _request(self, step, path, data=None, json_body=None, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data, doseq=True).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        start = time.perf_counter()
+        status, payload = None, b''
+        try:
+            with self.opener.open(request, timeout=120) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        ok = status is not None and status < 400
+        self.recorder.record(step, elapsed_ms, ok)
+        if self.think_ms:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think_ms / 1000)
+        return status, payload
+
+    def _json(self, step, path, body):
+        status, payload = self._request(step, path, json_body=body)
+        try:
+            return json.loads(payload) if status == 200 else {}
+        except ValueError:
+            return {}
+
+    def run_session(self):
+        rng = self.rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+        completed = self.catalog.completed_courses(rng.randint(3, 8), seed=rng.randrange(1 << 30))
+        ajax = {'X-Requested-With': 'XMLHttpRequest'}
+
+        self._request('upload', '/upload')
+        self._request('upload_skip', '/upload', data={})
+        self._request('review_courses', '/review_courses')
+        for course_id in completed:
+            self._request('review_add', '/review_courses', data={'new_course_id': course_id, 'new_course_name': ''})
+        self._request('review_confirm', '/review_courses', data={'confirmed_courses': completed})
+        self._request('filters', '/filters')
+        self._request('filters_submit', '/filters', data={
+            'semester': 'WINTER_2025_2026',
+            'no_exam': 'true' if rng.random() < 0.2 else 'false',
+            'min_credits': rng.choice([0, 0, 0, 2, 3]),
+            'preferences_text': rng.choice(self.queries),
+            **{f'{name}_importance': rng.randint(1, 5)
+               for name in ('semantic', 'credits', 'avg_grade', 'workload_rating', 'general_rating')},
+        })
+        self._request('recommendations', '/recommendations')
+
+        self._json('chat_rag', '/api/chat', {'message': rng.choice(self.queries), 'agent_mode': 'rag', 'history': []})
+        rerank = self._json('chat_rerank', '/api/chat', {'message': rng.choice(RERANK_REQUESTS), 'agent_mode': 'rerank'})
+        if rerank.get('success'):
+            self._json('api_rerank', '/api/rerank', {'weights': rerank.get('new_weights'),
+                                                     'filters': rerank.get('new_filters'),
+                                                     'query': rerank.get('new_query')})
+
+        picks = [rng.randrange(len(self.catalog)) for _ in range(2)]
+        for row in picks:
+            course = self.catalog.metadata[row]
+            self._request('wishlist_add', '/wishlist/add', headers=ajax, data={
+                'course_id': course['course_id'], 'course_name': course['title'], 'course_points': course.get('credits', 0)})
+        self._request('wishlist_remove', '/wishlist/remove', headers=ajax,
+                      data={'course_id': self.catalog.metadata[picks[0]]['course_id']})
+        self.recorder.session_done()
+
+
+class MemorySampler:
+    """Polls /api/status and keeps the RSS of each worker process (pid) over time."""
+
+    def __init__(self, base_url, interval):
+        self.url = base_url.rstrip('/') + STATUS_PATH
+        self.interval = interval
+        self.rss = defaultdict(list)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="loadtest-memory")
+
+    def sample(self):
+        try:
+            with urllib.request.urlopen(self.url, timeout=30) as response:
+                status = json.loads(response.read())
+            rss = status.get('embedding_model', {}).get('process_rss_mb')
+            if rss is not None:
+                self.rss[status.get('pid')].append(rss)
+        except (urllib.error.URLError, OSError, ValueError):
+            pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def report(self):
+        return {str(pid): {'first_mb': values[0], 'last_mb': values[-1], 'max_mb': max(values),
+                           'growth_mb': round(values[-1] - values[0], 1), 'samples': len(values)}
+                for pid, values in self.rss.items()}
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(recorder, elapsed):
+    steps = {}
+    for step, values in recorder.samples.items():
+        steps[step] = {
+            'count': len(values),
+            'errors': recorder.errors.get(step, 0),
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(_percentile(values, 50), 1),
+            'p95_ms': round(_percentile(values, 95), 1),
+            'p99_ms': round(_percentile(values, 99), 1),
+            'max_ms': round(max(values), 1),
+        }
+    requests = sum(s['count'] for s in steps.values())
+    return {
+        'duration_s': round(elapsed, 1),
+        'sessions': recorder.sessions,
+        'sessions_per_s': round(recorder.sessions / elapsed, 3),
+        'requests': requests,
+        'requests_per_s': round(requests / elapsed, 2),
+        'errors': sum(s['errors'] for s in steps.values()),
+        'steps': steps,
+    }
+
+
+def print_report(report, out):
+    print(f"\n{report['sessions']} sessions, {report['requests']} requests in {report['duration_s']} s: "
+          f"{report['requests_per_s']} req/s, {report['sessions_per_s']} sessions/s, {report['errors']} errors", file=out)
+    print(f"{'step':<18}{'count':>7}{'err':>5}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}", file=out)
+    for step, s in report['steps'].items():
+        print(f"{step:<18}{s['count']:>7}{s['errors']:>5}{s['rps']:>8}{s['p50_ms']:>9}{s['p95_ms']:>9}"
+              f"{s['p99_ms']:>9}{s['max_ms']:>9}", file=out)
+    print("Worker memory (RSS):", file=out)
+    for pid, m in report['memory'].items():
+        print(f"  pid {pid}: {m['first_mb']} -> {m['last_mb']} MB ({m['growth_mb']:+} MB, max {m['max_mb']}, "
+              f"{m['samples']} samples)", file=out)
+
+
+def start_local_server(args):
+    """Serve loadtest_app on a threaded local server; returns (base_url, server)."""
+    os.environ.update({
+        'LOADTEST_COURSES': str(args.courses), 'LOADTEST_SEED': str(args.seed), 'LOADTEST_DIM': str(args.dim),
+        'FAKE_PINECONE_LATENCY_MS': str(args.pinecone_latency_ms), 'FAKE_PINECONE_JITTER_MS': str(args.pinecone_jitter_ms),
+        'FAKE_GEMINI_LATENCY_MS': str(args.gemini_latency_ms), 'FAKE_GEMINI_JITTER_MS': str(args.gemini_jitter_ms),
+    })
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from werkzeug.serving import make_server
+    from loadtest_app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name="loadtest-server").start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app with concurrent student sessions")
+    parser.add_argument("--url", help="Drive a running server instead of starting loadtest_app in-process")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to keep starting sessions")
+    parser.add_argument("--warmup-sessions", type=int, default=1, help="Unrecorded sessions run first")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a user's requests")
+    parser.add_argument("--courses", type=int, default=2000, help="Synthetic catalog size (LOADTEST_COURSES)")
+    parser.add_argument("--seed", type=int, default=0, help="Catalog seed (LOADTEST_SEED)")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension (LOADTEST_DIM)")
+    parser.add_argument("--pinecone-latency-ms", type=float, default=30)
+    parser.add_argument("--pinecone-jitter-ms", type=float, default=10)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=200)
+    parser.add_argument("--status-interval", type=float, default=2, help="Seconds between worker memory samples")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    catalog = generate_catalog(args.courses, dim=args.dim, seed=args.seed)
+    queries = [text for text, _ in query_pool(catalog)]
+    server = None
+    if args.url:
+        base_url = args.url
+    else:
+        print(f"Starting loadtest_app in-process ({args.courses} courses, Pinecone {args.pinecone_latency_ms} ms, "
+              f"Gemini {args.gemini_latency_ms} ms)", file=out)
+        base_url, server = start_local_server(args)
+
+    recorder = Recorder()
+    memory = MemorySampler(base_url, args.status_interval)
+
+    def user_loop(user):
+        while time.monotonic() < deadline:
+            user.run_session()
+
+    users = [VirtualUser(base_url, recorder, catalog, queries, args.think_ms, seed=args.seed * 1000 + i)
+             for i in range(args.users)]
+    threads = [threading.Thread(target=user_loop, args=(user,), name=f"loadtest-user-{i}") for i, user in enumerate(users)]
+    print(f"{args.users} users for {args.duration:.0f} s against {base_url}", file=out)
+
+    # The agents still print to stdout; keep it out of the report when the app runs in-process
+    quiet = open(os.devnull, 'w') if server is not None else None
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        # Warm-up sessions build the catalog, lexical and autocomplete indexes: one-off costs
+        # that would otherwise show up as latency outliers and memory growth
+        for i in range(args.warmup_sessions):
+            VirtualUser(base_url, Recorder(), catalog, queries, 0, seed=-1 - i).run_session()
+        deadline = time.monotonic() + args.duration
+        memory.start()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        memory.stop()
+
+    report = summarize(recorder, elapsed)
+    report['memory'] = memory.report()
+    report['config'] = {k: v for k, v in vars(args).items() if k != 'output'}
+    print_report(report, out)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+    if server is not None:
+        server.shutdown()
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+The Flask app wired to local stand-ins, for load tests (see benchmarks/loadtest.py).
+
+Importing this module generates a synthetic semester, serves it (and its review
+chunks) through the Pinecone code path with a StandInIndex, answers Gemini
+calls with a StandInGenAIClient and pre-caches the embeddings of the query
+pool, then imports app. No model, network or API key is needed, so it can run
+under gunicorn exactly like the real app:
+
+    gunicorn --chdir benchmarks -w 4 --threads 8 -b 127.0.0.1:8000 loadtest_app:app
+
+Settings (environment):
+    LOADTEST_COURSES          catalog size (default 2000)
+    LOADTEST_SEED             catalog seed (default 0); the load driver must use the same
+    LOADTEST_DIM              embedding dimension (default 256)
+    FAKE_PINECONE_LATENCY_MS  per call, mean / jitter (default 30 / 10)
+    FAKE_PINECONE_JITTER_MS
+    FAKE_GEMINI_LATENCY_MS    per call, mean / jitter (default 800 / 200)
+    FAKE_GEMINI_JITTER_MS
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ['VECTOR_STORE_BACKEND'] = 'pinecone'
+
+from synthetic import generate_catalog, review_chunks, query_pool, StandInIndex, StandInGenAIClient
+from src.connections import register_index, register_genai_client
+from src.embeddings import cache_query_embedding
+
+
+SEMESTER = "WINTER_2025_2026"
+
+
+def load_settings():
+    return {
+        'courses': int(os.getenv("LOADTEST_COURSES", 2000)),
+        'seed': int(os.getenv("LOADTEST_SEED", 0)),
+        'dim': int(os.getenv("LOADTEST_DIM", 256)),
+    }
+
+
+def build_catalog(settings=None):
+    """The synthetic semester and its query pool (identical in every process for the same settings)."""
+    settings = settings or load_settings()
+    catalog = generate_catalog(settings['courses'], dim=settings['dim'], seed=settings['seed'])
+    return catalog, query_pool(catalog)
+
+
+def install_stand_ins(catalog, queries):
+    pinecone_latency = (float(os.getenv("FAKE_PINECONE_LATENCY_MS", 30)), float(os.getenv("FAKE_PINECONE_JITTER_MS", 10)))
+    gemini_latency = (float(os.getenv("FAKE_GEMINI_LATENCY_MS", 800)), float(os.getenv("FAKE_GEMINI_JITTER_MS", 200)))
+    register_index(SEMESTER, StandInIndex(catalog, *pinecone_latency))
+    register_index(f"{SEMESTER}_RAG", StandInIndex(review_chunks(catalog), *pinecone_latency))
+    register_genai_client(StandInGenAIClient(queries, *gemini_latency))
+    for text, vector in queries:
+        cache_query_embedding(text, vector)
+
+
+install_stand_ins(*build_catalog())
+
+from app import app  # noqa: E402  (after the stand-ins are registered)
@@ -0,0 +1,213 @@
+"""
+Recommendation engine benchmark on synthetic catalogs (runs fully offline).
+
+For each catalog size and completed-list size it measures the latency and
+peak Python memory (tracemalloc) of:
+
+  untaken    get_all_untaken_courses_with_requirements (query + eligibility filter, benchmarks/legacy.py)
+  rerank     rerank of that DataFrame (benchmarks/legacy.py)
+  recommend  recommend_courses, cold caches (a new query every run)
+
+Catalogs come from benchmarks/synthetic.py and are served through the Pinecone
+code path by an in-process stand-in index; query embeddings are precomputed,
+so no model, network or API key is needed. Results can be saved as a JSON
+baseline and later runs compared against it; exits non-zero on a regression.
+
+    python benchmarks/recommendation.py --sizes 100,1000,10000 --save benchmarks/baselines/recommendation.json
+    python benchmarks/recommendation.py --sizes 100,1000,10000 --baseline benchmarks/baselines/recommendation.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ['VECTOR_STORE_BACKEND'] = 'pinecone'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import numpy as np
+from synthetic import generate_catalog, StandInIndex
+from src.config import configure_logging
+from src.connections import register_index
+from src.embeddings import cache_query_embedding
+from src.knowledgebase import recommend_courses
+from legacy import get_all_untaken_courses_with_requirements, rerank
+
+
+DEFAULT_SIZES = (100, 1000, 10_000, 100_000)
+DEFAULT_COMPLETED = (0, 20, 60)
+OPERATIONS = ('untaken', 'rerank', 'recommend')
+PAGE_SIZE = 100
+
+# A result is a regression when it is this much worse than the baseline, relatively and absolutely
+DEFAULT_TOLERANCE = 0.25
+MIN_DELTA_MS = 1.0
+MIN_DELTA_MB = 1.0
+
+
+class QuerySource:
+    """Distinct synthetic queries with their embeddings already in the query cache."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.count = 0
+
+    def next(self):
+        text, vector = self.catalog.query(seed=self.count)
+        cache_query_embedding(text, vector)
+        self.count += 1
+        return text
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _peak_mb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def _summary(times, peak_mb):
+    times = sorted(times)
+    return {
+        'median_ms': round(statistics.median(times), 3),
+        'p95_ms': round(times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))], 3),
+        'min_ms': round(times[0], 3),
+        'runs': len(times),
+        'peak_mb': None if peak_mb is None else round(peak_mb, 3),
+    }
+
+
+def bench_catalog(size, completed_sizes, runs, dim, seed, memory=True):
+    """{'<size>/<completed>/<operation>': summary} for one catalog size."""
+    start = time.perf_counter()
+    catalog = generate_catalog(size, dim=dim, seed=seed)
+    print(f"catalog {size}: generated in {time.perf_counter() - start:.1f} s")
+    semester = f"SYNTHETIC_{size}"
+    register_index(semester, StandInIndex(catalog))
+    queries = QuerySource(catalog)
+
+    # First use compiles the catalog and the lexical index; not part of the per-request cost
+    start = time.perf_counter()
+    recommend_courses(semester, [], user_query=queries.next(), top_n=PAGE_SIZE)
+    print(f"catalog {size}: first request (catalog + lexical index build) {time.perf_counter() - start:.2f} s")
+
+    results = {}
+    for completed_size in completed_sizes:
+        completed = catalog.completed_courses(completed_size, seed=seed)
+
+        def untaken():
+            return get_all_untaken_courses_with_requirements(semester, completed, user_query=queries.next())
+
+        def recommend():
+            return recommend_courses(semester, completed, user_query=queries.next(), top_n=PAGE_SIZE)
+
+        untaken()
+        times, frames = [], []
+        for _ in range(runs):
+            elapsed, frame = _timed(untaken)
+            times.append(elapsed)
+            frames.append(frame)
+        results[f"{size}/{completed_size}/untaken"] = _summary(times, _peak_mb(untaken) if memory else None)
+
+        frame = frames[-1]
+        rerank(frame)
+        times = [_timed(lambda: rerank(frame))[0] for _ in range(runs)]
+        results[f"{size}/{completed_size}/rerank"] = _summary(times, _peak_mb(lambda: rerank(frame)) if memory else None)
+
+        recommend()
+        times = [_timed(recommend)[0] for _ in range(runs)]
+        results[f"{size}/{completed_size}/recommend"] = _summary(times, _peak_mb(recommend) if memory else None)
+
+        for operation in OPERATIONS:
+            r = results[f"{size}/{completed_size}/{operation}"]
+            peak = f"{r['peak_mb']:8.1f} MB" if r['peak_mb'] is not None else ''
+            print(f"  {size:>7} courses {completed_size:>4} completed  {operation:<10}"
+                  f"median {r['median_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms {peak}")
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions of `results` against a baseline's results, as printable lines."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if (current['median_ms'] > previous['median_ms'] * (1 + tolerance)
+                and current['median_ms'] - previous['median_ms'] > MIN_DELTA_MS):
+            regressions.append(f"{key}: median {previous['median_ms']:.2f} -> {current['median_ms']:.2f} ms")
+        if (current['peak_mb'] is not None and previous.get('peak_mb') is not None
+                and current['peak_mb'] > previous['peak_mb'] * (1 + tolerance)
+                and current['peak_mb'] - previous['peak_mb'] > MIN_DELTA_MB):
+            regressions.append(f"{key}: peak memory {previous['peak_mb']:.1f} -> {current['peak_mb']:.1f} MB")
+    return regressions
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation engine on synthetic catalogs")
+    parser.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES), help="Catalog sizes (comma-separated)")
+    parser.add_argument("--completed", type=_int_list, default=list(DEFAULT_COMPLETED),
+                        help="Completed-list sizes (comma-separated)")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per measurement")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (faster)")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown / memory growth (default 0.25)")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    results = {}
+    for size in args.sizes:
+        results.update(bench_catalog(size, args.completed, args.runs, args.dim, args.seed, memory=not args.no_memory))
+
+    if args.save:
+        report = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'dim': args.dim,
+                'seed': args.seed,
+                'runs': args.runs,
+            },
+            'results': results,
+        }
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+        print(f"Saved {len(results)} results to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Synthetic semester catalogs and in-process Pinecone / Gemini stand-ins, for offline benchmarks.
+
+A catalog has the shape of the real ingest output: 6-digit course IDs, titles
+with the 8-digit number, DNF prerequisites that only point at lower-level
+courses, per-semester grade averages, optional ratings, exam dates and
+Hebrew-like description / review text. Embeddings are clustered by topic so
+queries have a meaningful nearest-neighbour structure.
+
+    catalog = generate_catalog(10_000, dim=256, seed=0)
+    index = StandInIndex(catalog, latency_ms=20)
+    register_index("SYNTHETIC_10000", index)     # src.connections
+    register_genai_client(StandInGenAIClient(queries=query_pool(catalog), latency_ms=800))
+"""
+import sys
+import json
+import time
+import random
+import threading
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.course_metadata import typed_course_fields
+from src.utilities import canonical_course_id
+from src.vector_store import LocalVectorIndex, MetadataTable
+
+
+LEVEL_WEIGHTS = (0.3, 0.3, 0.25, 0.15)       # share of courses per level; prerequisites come from lower levels
+GROUP_COUNT_WEIGHTS = (0.6, 0.3, 0.1)        # 1, 2 or 3 alternative prerequisite groups
+GROUP_SIZE_WEIGHTS = (0.5, 0.35, 0.15)       # 1, 2 or 3 courses per group
+CREDITS = (2.0, 2.5, 3.0, 3.5, 4.0, 5.0)
+GRADE_SEMESTERS = ('2021-2022 חורף', '2021-2022 אביב', '2022-2023 חורף', '2022-2023 אביב',
+                   '2023-2024 חורף', '2023-2024 אביב', '2024-2025 חורף', '2024-2025 אביב')
+EXAM_SHARE = 0.8
+RATED_SHARE = 0.7
+VOCABULARY_SIZE = 3000
+COURSES_PER_TOPIC = 200
+
+_LETTERS = list('אבגדהוזחטיכלמנסעפצקרשת')
+
+
+def _vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(_LETTERS, size=rng.integers(3, 8))))
+    return sorted(words)
+
+
+def _weighted(rng, weights, size=None):
+    return rng.choice(len(weights), size=size, p=np.asarray(weights) / sum(weights))
+
+
+class SyntheticCatalog:
+    """
+    One generated semester.
+
+    Attributes:
+        ids: Course IDs (6-digit strings)
+        embeddings: (N, dim) float32, unit rows
+        metadata: Per-course Pinecone-style metadata dicts
+        levels: Course level (0 = no prerequisites)
+        topics: (num_topics, dim) float32 topic centres
+        vocabulary: Words the text fields are drawn from
+    """
+
+    def __init__(self, ids, embeddings, metadata, levels, topics, vocabulary, seed):
+        self.ids = ids
+        self.embeddings = embeddings
+        self.metadata = metadata
+        self.levels = levels
+        self.topics = topics
+        self.vocabulary = vocabulary
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.ids)
+
+    def completed_courses(self, count, seed=0):
+        """A plausible completed list: `count` courses, mostly from the lower levels."""
+        rng = np.random.default_rng((self.seed, seed, count))
+        count = min(count, len(self.ids))
+        weights = np.array([0.5, 0.3, 0.15, 0.05])[self.levels]
+        rows = rng.choice(len(self.ids), size=count, replace=False, p=weights / weights.sum())
+        return [self.ids[row] for row in rows]
+
+    def query(self, seed=0, words=3):
+        """(text, embedding) of a synthetic student query near a random topic."""
+        rng = np.random.default_rng((self.seed, seed, 7))
+        text = ' '.join(rng.choice(self.vocabulary[:VOCABULARY_SIZE // 4], size=words))
+        vector = self.topics[rng.integers(len(self.topics))] + rng.normal(scale=0.05, size=self.topics.shape[1])
+        return text, (vector / np.linalg.norm(vector)).astype(np.float32)
+
+
+def generate_catalog(num_courses, dim=256, seed=0):
+    """Generate a SyntheticCatalog of `num_courses` courses (deterministic for a seed)."""
+    rng = np.random.default_rng((seed, num_courses))
+    vocabulary = _vocabulary(rng, VOCABULARY_SIZE)
+    # Zipf-like word frequencies, as in real course text
+    word_p = 1.0 / np.arange(1, len(vocabulary) + 1)
+    word_p /= word_p.sum()
+
+    numbers = rng.choice(1_000_000, size=num_courses, replace=False)
+    ids = [f'{n:06d}' for n in numbers]
+    levels = _weighted(rng, LEVEL_WEIGHTS, num_courses)
+    by_level = [np.flatnonzero(levels == level) for level in range(len(LEVEL_WEIGHTS))]
+
+    num_topics = max(8, num_courses // COURSES_PER_TOPIC)
+    topics = rng.normal(size=(num_topics, dim)).astype(np.float32)
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    course_topics = rng.integers(num_topics, size=num_courses)
+    embeddings = topics[course_topics] + rng.normal(scale=0.6 / np.sqrt(dim), size=(num_courses, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    # Candidate prerequisites of each level: every course of the levels below it
+    lower_levels = [np.concatenate(by_level[:level]) if level else np.empty(0, dtype=np.int64)
+                    for level in range(len(LEVEL_WEIGHTS))]
+    # All text is drawn up front: per-row weighted draws dominate generation time otherwise
+    words = np.array(vocabulary)
+    text_lengths = np.stack([rng.integers(2, 6, num_courses), rng.integers(15, 60, num_courses),
+                             rng.integers(0, 120, num_courses)], axis=1)
+    text_words = words[rng.choice(len(words), size=int(text_lengths.sum()), p=word_p)]
+    text_ends = np.cumsum(text_lengths.ravel())
+
+    metadata = []
+    for row, course_id in enumerate(ids):
+        lower = lower_levels[levels[row]]
+        prerequisites = []
+        if len(lower):
+            for _ in range(_weighted(rng, GROUP_COUNT_WEIGHTS) + 1):
+                size = _weighted(rng, GROUP_SIZE_WEIGHTS) + 1
+                group = dict.fromkeys(ids[r] for r in lower[rng.integers(len(lower), size=size)])
+                prerequisites.append(list(group))
+
+        grade_semesters = rng.choice(GRADE_SEMESTERS, size=rng.integers(0, len(GRADE_SEMESTERS) + 1), replace=False)
+        avg_grades = {s: round(float(np.clip(rng.normal(78, 8), 40, 100)), 1) for s in sorted(grade_semesters)}
+        has_exam = rng.random() < EXAM_SHARE
+        moed_a = f'{rng.integers(1, 29):02d}-02-2026' if has_exam else ''
+
+        title_words, description, reviews = (
+            ' '.join(text_words[end - length:end])
+            for length, end in zip(text_lengths[row], text_ends[3 * row:3 * row + 3])
+        )
+        course = {
+            'course_id': course_id,
+            'title': f'{canonical_course_id(course_id)} - {title_words}',
+            'description': description,
+            'moed_a': moed_a,
+            'moed_b': '',
+            'all_reviews': reviews,
+            'reviews_summary': ' '.join(reviews.split()[:30]),
+            # Older indexes' JSON fields, read by the original path in benchmarks/legacy.py
+            'prerequisites': json.dumps(prerequisites),
+            'avg_grades': json.dumps(avg_grades),
+        }
+        if rng.random() < RATED_SHARE:
+            course['general_rating'] = round(float(rng.uniform(1, 5)), 1)
+            course['workload_rating'] = round(float(rng.uniform(1, 5)), 1)
+        course.update(typed_course_fields(prerequisites, avg_grades, moed_a, CREDITS[rng.integers(len(CREDITS))]))
+        metadata.append(course)
+
+    return SyntheticCatalog(ids, embeddings, metadata, levels, topics, vocabulary, seed)
+
+
+def review_chunks(catalog, chunks_per_course=3, seed=0):
+    """
+    Review-chunk index of a catalog (the *_RAG indexes): up to `chunks_per_course`
+    slices of each course's reviews, embedded near the course.
+    """
+    rng = np.random.default_rng((catalog.seed, seed, 11))
+    ids, rows, metadata = [], [], []
+    for row, course in enumerate(catalog.metadata):
+        words = course['all_reviews'].split() or course['description'].split()
+        for chunk in range(chunks_per_course):
+            text = ' '.join(words[chunk::chunks_per_course])
+            if not text:
+                continue
+            ids.append(f"{course['course_id']}_{chunk}")
+            rows.append(row)
+            metadata.append({'course_id': course['course_id'], 'title': course['title'], 'chunk_text': text})
+    embeddings = catalog.embeddings[rows] + rng.normal(scale=0.3 / np.sqrt(catalog.embeddings.shape[1]),
+                                                       size=(len(rows), catalog.embeddings.shape[1])).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return SyntheticCatalog(ids, embeddings, metadata, catalog.levels[rows], catalog.topics, catalog.vocabulary, seed)
+
+
+def query_pool(catalog, size=100):
+    """[(text, embedding)] of `size` distinct synthetic queries (the same for every process)."""
+    pool, seen = [], set()
+    seed = 0
+    while len(pool) < size:
+        text, vector = catalog.query(seed=seed)
+        seed += 1
+        if text not in seen:
+            seen.add(text)
+            pool.append((text, vector))
+    return pool
+
+
+class StandInIndex:
+    """
+    In-process stand-in for a Pinecone index: the query / fetch /
+    describe_index_stats subset the app uses, served from a LocalVectorIndex,
+    with an optional simulated network round trip per call.
+
+    Not a LocalVectorIndex itself, so the app takes its Pinecone code paths
+    (metadata pulls, batched fetch and its cache).
+
+    Args:
+        catalog: SyntheticCatalog to serve (or review_chunks() of one)
+        latency_ms: Mean added latency per call
+        jitter_ms: Standard deviation of the added latency
+    """
+
+    def __init__(self, catalog, latency_ms=0.0, jitter_ms=0.0, seed=0):
+        self.index = LocalVectorIndex(catalog.ids, catalog.embeddings, MetadataTable.from_rows(catalog.metadata),
+                                      normalized=True)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = {'query': 0, 'fetch': 0, 'describe_index_stats': 0}
+        self._rng = random.Random(seed)
+
+    def _round_trip(self, method):
+        self.calls[method] += 1
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+    def query(self, **kwargs):
+        self._round_trip('query')
+        return self.index.query(**kwargs)
+
+    def fetch(self, ids, **kwargs):
+        self._round_trip('fetch')
+        return self.index.fetch(ids, **kwargs)
+
+    def describe_index_stats(self, **kwargs):
+        self._round_trip('describe_index_stats')
+        return self.index.describe_index_stats(**kwargs)
+
+
+class _StandInResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StandInGenAIClient:
+    """
+    In-process stand-in for google.genai.Client: `models.generate_content`
+    sleeps for the simulated model latency and returns a canned answer. Rerank
+    prompts (whose instructions ask for new_weights JSON) get valid random
+    weights and a query from `queries`, the rest a Hebrew answer of
+    `answer_chars` characters.
+
+    Args:
+        queries: [(text, embedding)] the new_query is picked from (see query_pool)
+        latency_ms: Mean added latency per call
+        jitter_ms: Standard deviation of the added latency
+        answer_chars: Length of a chat answer
+    """
+
+    def __init__(self, queries=(), latency_ms=0.0, jitter_ms=0.0, answer_chars=600, seed=0):
+        self.queries = [text for text, _ in queries]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.answer_chars = answer_chars
+        self.calls = 0
+        self.models = self
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, model=None, contents=None, config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            weights = [self._rng.random() for _ in range(5)]
+            query = self._rng.choice(self.queries) if self.queries else None
+            no_exam = self._rng.random() < 0.2
+        if delay:
+            time.sleep(delay)
+
+        instructions = (config or {}).get('system_instruction', '')
+        if 'new_weights' in instructions:
+            total = sum(weights)
+            names = ('semantic_weight', 'credits_weight', 'avg_grade_weight', 'workload_rating_weight',
+                     'general_rating_weight')
+            return _StandInResponse(json.dumps({
+                'new_weights': {name: round(w / total, 3) for name, w in zip(names, weights)},
+                'new_query': query,
+                'new_filters': {'no_exam': no_exam, 'min_credits': 0},
+                'explanation': 'עדכנתי את המשקלים לפי הבקשה.',
+            }, ensure_ascii=False))
+        answer = 'לפי הביקורות, הקורס דורש עבודה שבועית קבועה והמבחן הוגן. '
+        return _StandInResponse((answer * (self.answer_chars // len(answer) + 1))[:self.answer_chars])
@@ -0,0 +1,96 @@
+import sys
+import argparse
+import logging
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.embeddings import get_embedding_model, get_embedding_model_name
+from src.snapshot import course_from_metadata, write_snapshot
+from src.vector_store import get_local_index_dir
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 32
+
+
+def load_courses_csv(csv_path):
+    """
+    Load the course CSV (output of preprocess_courses / preproc_with_llm).
+
+    Args:
+        csv_path: Path to CSV file
+
+    Returns:
+        DataFrame with course_id kept as a string (leading zeros matter)
+    """
+    df = pd.read_csv(csv_path, dtype={'course_id': str}, encoding='utf-8-sig')
+    # preproc_with_llm writes the LLM summary as 'Review_summary'; the app reads 'reviews_summary'
+    if 'Review_summary' in df.columns and 'reviews_summary' not in df.columns:
+        df = df.rename(columns={'Review_summary': 'reviews_summary'})
+    df['description'] = df['description'].fillna('')
+    logger.info(f"Loaded {len(df)} courses from {csv_path}")
+    return df
+
+
+def embed_descriptions(descriptions, batch_size=BATCH_SIZE):
+    """
+    Embed course descriptions the same way the upload notebook does
+    ("passage: " prefix, normalized e5 embeddings).
+
+    Args:
+        descriptions: List of description strings
+        batch_size: Encoding batch size
+
+    Returns:
+        (N, dim) float32 array
+    """
+    model = get_embedding_model()
+    batches = []
+    for start in range(0, len(descriptions), batch_size):
+        batch = ["passage: " + desc for desc in descriptions[start:start + batch_size]]
+        batches.append(model.encode(batch, convert_to_numpy=True, show_progress_bar=False,
+                                    normalize_embeddings=True))
+        logger.info(f"Embedded {min(start + batch_size, len(descriptions))}/{len(descriptions)} descriptions")
+    return np.vstack(batches).astype(np.float32)
+
+
+def main(csv_path, semester_name, output_dir=None):
+    """
+    Build a memory-mappable semester snapshot from the course CSV.
+
+    Args:
+        csv_path: Course CSV (courses_data_before_llm.csv or the LLM-processed one)
+        semester_name: Semester key, e.g. WINTER_2025_2026
+        output_dir: Root snapshot directory (defaults to LOCAL_INDEX_DIR)
+    """
+    df = load_courses_csv(csv_path)
+    rows = [{k: v for k, v in row.items() if not (isinstance(v, float) and np.isnan(v))}
+            for row in df.to_dict('records')]
+    courses = [course_from_metadata(row) for row in rows]
+    embeddings = embed_descriptions(df['description'].tolist())
+
+    output_path = Path(output_dir or get_local_index_dir()) / semester_name
+    manifest = write_snapshot(output_path, semester_name, df['course_id'].tolist(), embeddings, courses,
+                              model_name=get_embedding_model_name())
+    logger.info(f"Snapshot {semester_name}: {manifest['count']} courses, dim {manifest['dimension']}, "
+                f"hash {manifest['content_hash'][:12]}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local semester snapshot from the course CSV")
+    parser.add_argument("csv_path", help="Course CSV file")
+    parser.add_argument("--semester", default="WINTER_2025_2026", help="Semester key (default: WINTER_2025_2026)")
+    parser.add_argument("--output-dir", default=None, help="Snapshot root directory (default: LOCAL_INDEX_DIR)")
+    args = parser.parse_args()
+
+    main(args.csv_path, args.semester, args.output_dir)
@@ -1,10 +1,14 @@
 import json
 import os
 import re
+import sys
 import pandas as pd
 from pathlib import Path
 import logging
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from src.course_metadata import typed_course_fields
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -496,6 +500,14 @@ def main(folder_path, output_csv='courses_data_before_llm.csv', max_courses=None
     # Create DataFrame
     df = pd.DataFrame(all_courses)
 
+    # Pre-derive typed fields once here so the serving layer never recomputes them
+    typed_fields = [
+        typed_course_fields(row['prerequisites'], row['avg_grades'], row['moed_a'], row['credits'])
+        for row in all_courses
+    ]
+    df['avg_grade'] = [fields.get('avg_grade') for fields in typed_fields]
+    df['has_exam'] = [fields['has_exam'] for fields in typed_fields]
+
     # Convert prerequisites list to JSON string for CSV storage
     df['prerequisites'] = df['prerequisites'].apply(json.dumps)
 
@@ -517,6 +529,8 @@ def main(folder_path, output_csv='courses_data_before_llm.csv', max_courses=None
             # Count non-empty dicts
             non_empty = sum(1 for x in df[col] if x != '{}')
             logger.info(f"  {col}: {non_empty} courses have grade history")
+        elif col == 'has_exam':
+            logger.info(f"  {col}: {int(df[col].sum())} courses have a moed A exam")
         elif col in ['description', 'all_reviews']:
             # Count non-empty strings
             non_empty = sum(1 for x in df[col] if x)
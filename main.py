@@ -0,0 +1,40 @@
+"""
+CheeseSpoon command line.
+
+Batch recommendations for a file of student profiles (CSV or JSONL):
+
+    python main.py profiles.csv -o recommendations.csv --top-n 10
+
+See src/batch.py for the accepted profile fields.
+"""
+import argparse
+import sys
+import time
+from src.config import configure_logging
+from src.batch import DEFAULT_BATCH_SIZE, DEFAULT_SEMESTER, DEFAULT_TOP_N, load_profiles, recommend_batch, write_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend courses for a batch of student profiles")
+    parser.add_argument("profiles", help="Student profiles, .csv or .jsonl")
+    parser.add_argument("-o", "--output", default="recommendations.csv", help="Output file, .csv or .jsonl")
+    parser.add_argument("--semester", default=DEFAULT_SEMESTER, help="Semester for profiles that don't name one")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="Courses per student (unless the profile sets top_n)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Students scored together")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    start = time.perf_counter()
+    profiles = load_profiles(args.profiles, default_semester=args.semester, default_top_n=args.top_n)
+    print(f"📥 Loaded {len(profiles)} student profiles from {args.profiles}")
+
+    results = recommend_batch(profiles, batch_size=args.batch_size)
+    write_results(results, args.output)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Wrote {len(results)} recommendations for {len(profiles)} students to {args.output} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,21 @@
 import os
-from dotenv import load_dotenv
-from pinecone import Pinecone
-from google import genai
 import json
-from google.genai import types
+import logging
+import asyncio
 from src.knowledgebase import embed_query
-# Initialize Google GenAI client
-
-
+from src.connections import get_index, get_genai_client
+from src.config import load_env
+from src.timing import StageTimings, run_blocking, span
 
+logger = logging.getLogger(__name__)
+# Initialize Google GenAI client
 
-def get_pinecone():
-    """Initialize Pinecone client"""
-    load_dotenv()
-    api_key = os.getenv("PINECONE_API_KEY")
-
-    if not api_key:
-        raise ValueError("No API key found. Please check your .env file.")
 
-    pc = Pinecone(api_key=api_key)
-    return pc
 
 
 def get_index_by_semester(semester_name):
-    """Get Pinecone index for specific semester"""
-    pc = get_pinecone()
-    kb_name = os.getenv(semester_name)
-
-    if not kb_name:
-        raise ValueError(f"No index found for semester: {semester_name}")
-
-    index = pc.Index(host=kb_name)
-    return index
-
-
-
+    """Get the shared index handle for a specific semester"""
+    return get_index(semester_name)
 
 
 def search_reviews(query, semester_name="WINTER_2025_2026_RAG", top_k=15):
@@ -77,30 +58,7 @@ def search_reviews(query, semester_name="WINTER_2025_2026_RAG", top_k=15):
             include_metadata=True
         )
 
-        print(f"\n📊 SEARCH RESULTS: Found {len(results.matches)} matches")
-        print(f"{'-' * 80}")
-
-        # Extract relevant information
-        context_chunks = []
-        for i, match in enumerate(results.matches, 1):
-            course_id = match.metadata.get('course_id', 'N/A')
-            course_title = match.metadata.get('title', 'N/A')
-            review_text = match.metadata.get('chunk_text', '')
-            score = match.score
-
-            print(f"\n[{i}] Score: {score:.4f}")
-            print(f"    Course: {course_title} ({course_id})")
-            print(f"    Review preview: {review_text[:150]}...")
-
-            context_chunks.append({
-                'course_id': course_id,
-                'course_title': course_title,
-                'review_text': review_text,
-                'score': score
-            })
-
-        print(f"\n{'=' * 80}\n")
-        return context_chunks
+        return _review_chunks(results)
 
     except Exception as e:
         print(f"❌ Error searching reviews: {e}")
@@ -109,6 +67,64 @@ def search_reviews(query, semester_name="WINTER_2025_2026_RAG", top_k=15):
         return []
 
 
+def _review_chunks(results):
+    """Extract the review chunks from a query response"""
+    print(f"\n📊 SEARCH RESULTS: Found {len(results.matches)} matches")
+    print(f"{'-' * 80}")
+
+    context_chunks = []
+    for i, match in enumerate(results.matches, 1):
+        course_id = match.metadata.get('course_id', 'N/A')
+        course_title = match.metadata.get('title', 'N/A')
+        review_text = match.metadata.get('chunk_text', '')
+        score = match.score
+
+        print(f"\n[{i}] Score: {score:.4f}")
+        print(f"    Course: {course_title} ({course_id})")
+        print(f"    Review preview: {review_text[:150]}...")
+
+        context_chunks.append({
+            'course_id': course_id,
+            'course_title': course_title,
+            'review_text': review_text,
+            'score': score
+        })
+
+    print(f"\n{'=' * 80}\n")
+    return context_chunks
+
+
+async def search_reviews_async(query, semester_name="WINTER_2025_2026_RAG", top_k=15, timings=None):
+    """
+    Async search_reviews: the query is embedded in the thread pool while the
+    index handle is opened, then the search runs without blocking the event loop.
+
+    Args:
+        query: User's question
+        semester_name: Semester identifier for the index
+        top_k: Number of results to return
+        timings: Optional StageTimings filled with reviews_connect / reviews_embed /
+            reviews_query times (kept apart from the recommendation stages in /metrics)
+
+    Returns:
+        List of relevant course reviews with metadata
+    """
+    timings = timings if timings is not None else StageTimings()
+    try:
+        index, query_embedding = await asyncio.gather(
+            timings.measure("reviews_connect", run_blocking(get_index_by_semester, semester_name)),
+            timings.measure("reviews_embed", run_blocking(embed_query, query)),
+        )
+        results = await timings.measure(
+            "reviews_query", run_blocking(index.query, vector=query_embedding, top_k=top_k, include_metadata=True)
+        )
+        return _review_chunks(results)
+
+    except Exception:
+        logger.exception("Review search failed for %s", semester_name)
+        return []
+
+
 def build_context(search_results):
     """Build context string from search results for the LLM"""
     if not search_results:
@@ -152,12 +168,11 @@ def chat_with_assistant(user_message, semester_name="WINTER_2025_2026_RAG", conv
     Returns:
         dict with 'response' and 'sources'
     """
-    load_dotenv()
+    load_env()
 
     # 2. Get the key securely
     CHAT_MODEL = os.getenv("CHAT_MODEL")
-    GOOGLE_API_KEY = os.getenv("GOOLGE_API_KEY")
-    genai_client = genai.Client(api_key=GOOGLE_API_KEY)
+    genai_client = get_genai_client()
     try:
         print(f"\n{'#' * 80}")
         print(f"💬 NEW CHAT REQUEST")
@@ -166,8 +181,10 @@ def chat_with_assistant(user_message, semester_name="WINTER_2025_2026_RAG", conv
         print(f"Semester: {semester_name}")
         print(f"Conversation history length: {len(conversation_history) if conversation_history else 0}")
 
-        # Search for relevant reviews
-        search_results = search_reviews(user_message, semester_name, top_k=15)
+        # Search for relevant reviews (embedding overlaps the index connection)
+        timings = StageTimings()
+        search_results = asyncio.run(search_reviews_async(user_message, semester_name, top_k=15, timings=timings))
+        logger.debug("Review search timings (ms): %s", timings.stages)
 
         # Build context from search results
         context = build_context(search_results)
@@ -220,15 +237,16 @@ def chat_with_assistant(user_message, semester_name="WINTER_2025_2026_RAG", conv
         print(f"{'=' * 80}\n")
 
         # Call Google GenAI API
-        response = genai_client.models.generate_content(
-            model=CHAT_MODEL,
-            contents=user_prompt,
-            config={
-                "system_instruction": system_prompt,
-                "temperature": 0.4,  # Lower temperature for more focused answers
-                "max_output_tokens": 2000,
-            }
-        )
+        with span("chat_llm"):
+            response = genai_client.models.generate_content(
+                model=CHAT_MODEL,
+                contents=user_prompt,
+                config={
+                    "system_instruction": system_prompt,
+                    "temperature": 0.4,  # Lower temperature for more focused answers
+                    "max_output_tokens": 2000,
+                }
+            )
 
         assistant_response = response.text
 
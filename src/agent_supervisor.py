@@ -1,18 +1,11 @@
 import os
-from dotenv import load_dotenv
-from google import genai
 import json
 import re
 
 # Import the existing RAG functionality
 from src.agent import chat_with_assistant as rag_chat_with_assistant
-
-
-def get_genai_client():
-    """Initialize Google GenAI client"""
-    load_dotenv()
-    GOOGLE_API_KEY = os.getenv("GOOLGE_API_KEY")
-    return genai.Client(api_key=GOOGLE_API_KEY)
+from src.config import load_env
+from src.connections import get_genai_client
 
 
 def supervisor_agent(user_message, agent_mode=None, context=None):
@@ -160,7 +153,7 @@ def analyze_rerank_request(user_message, current_filters, current_weights, curre
     Returns:
         dict with new_weights, new_filters, new_query, explanation
     """
-    load_dotenv()
+    load_env()
     CHAT_MODEL = os.getenv("CHAT_MODEL")
     client = get_genai_client()
     
@@ -0,0 +1,306 @@
+"""
+Approximate nearest-neighbour search for large local indexes (IVF, NumPy only).
+
+An inverted-file index clusters the unit-length vectors with spherical
+k-means into `nlist` lists. A query scores the centroids, then scans only the
+vectors of the `nprobe` closest lists, so the cost is about
+nlist + N * nprobe / nlist dot products instead of N.
+
+  nlist   more lists -> smaller scans, but each list is a coarser guess (~sqrt(N) to 4*sqrt(N))
+  nprobe  lists scanned per query: the recall/latency knob (ANN_NPROBE, or nprobe= per query)
+
+The index is stored next to a snapshot in `<snapshot>/ann/` (ivf.json, centroids.npy,
+list_offsets.npy, list_rows.npy) and tied to the snapshot version. New vectors can be
+added to it without retraining (IVFIndex.add, used by LocalVectorIndex.upsert).
+
+    python -m src.ann build WINTER_2025_2026_RAG --nlist 1024
+    python -m src.ann report WINTER_2025_2026_RAG --k 10
+    python -m src.ann report --synthetic 200000 --dimension 1024
+"""
+import logging
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+IVF_FORMAT = "cheesespoon-ivf"
+IVF_FORMAT_VERSION = 1
+ANN_DIR = "ann"
+IVF_MANIFEST = "ivf.json"
+DEFAULT_NPROBE = 8
+ASSIGN_BLOCK = 8192
+
+
+def default_nlist(n):
+    return max(1, min(int(4 * np.sqrt(n)), n // 39 or 1))
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _assign(vectors, centroids):
+    """Nearest centroid (max cosine) of every vector, in blocks."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors, nlist, iterations=20, sample_size=None, seed=0):
+    """Spherical k-means on a sample of the vectors. Returns (nlist, dim) unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample_size = min(n, sample_size or nlist * 64)
+    sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Empty lists are re-seeded with random sample vectors
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted lists of row numbers into an external (N, dim) unit-length matrix.
+
+    Args:
+        centroids: (nlist, dim) unit-length centroids
+        lists: One int64 array of rows per centroid
+        nprobe: Default number of lists scanned per query
+    """
+
+    def __init__(self, centroids, lists, nprobe=DEFAULT_NPROBE, snapshot_version=None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.lists = [np.asarray(rows, dtype=np.int64) for rows in lists]
+        self.nprobe = nprobe
+        self.snapshot_version = snapshot_version
+
+    @classmethod
+    def build(cls, vectors, nlist=None, nprobe=DEFAULT_NPROBE, iterations=20, seed=0, snapshot_version=None):
+        nlist = min(nlist or default_nlist(len(vectors)), len(vectors))
+        centroids = train_centroids(vectors, nlist, iterations=iterations, seed=seed)
+        assignments = _assign(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+        lists = [order[offsets[c]:offsets[c + 1]] for c in range(nlist)]
+        return cls(centroids, lists, nprobe=nprobe, snapshot_version=snapshot_version)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.lists)
+
+    def add(self, rows, vectors):
+        """Insert rows (already appended to the vector matrix) into their nearest lists."""
+        rows = np.asarray(rows, dtype=np.int64)
+        assignments = _assign(_normalize(vectors).reshape(len(rows), -1), self.centroids)
+        for c in np.unique(assignments):
+            self.lists[c] = np.concatenate([self.lists[c], rows[assignments == c]])
+
+    def remove(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.lists = [list_rows[~np.isin(list_rows, rows)] for list_rows in self.lists]
+
+    def search(self, vectors, query, top_k, nprobe=None):
+        """
+        Approximate top_k rows of `vectors` by cosine similarity to a unit-length query.
+
+        Returns:
+            (rows, scores), best first
+        """
+        nprobe = max(1, min(int(nprobe or self.nprobe), self.nlist))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+
+        rows = np.concatenate([self.lists[c] for c in probe])
+        if len(rows) == 0:
+            return rows, np.zeros(0, dtype=np.float32)
+        rows.sort()  # sequential reads from a memory-mapped matrix
+        scores = vectors[rows] @ query
+
+        top_k = min(int(top_k), len(rows))
+        top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return rows[top], scores[top]
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        offsets = np.concatenate([[0], np.cumsum([len(rows) for rows in self.lists])]).astype(np.int64)
+        np.save(path / "centroids.npy", self.centroids)
+        np.save(path / "list_offsets.npy", offsets)
+        np.save(path / "list_rows.npy", np.concatenate(self.lists) if self.lists else np.zeros(0, dtype=np.int64))
+        with open(path / IVF_MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': IVF_FORMAT,
+                'format_version': IVF_FORMAT_VERSION,
+                'nlist': self.nlist,
+                'nprobe': self.nprobe,
+                'count': len(self),
+                'snapshot_version': self.snapshot_version,
+                'created_at': time.time(),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with open(path / IVF_MANIFEST, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != IVF_FORMAT or manifest.get('format_version') != IVF_FORMAT_VERSION:
+            raise ValueError(f"Unsupported ANN index at {path}")
+        offsets = np.load(path / "list_offsets.npy")
+        rows = np.load(path / "list_rows.npy")
+        lists = [rows[offsets[c]:offsets[c + 1]] for c in range(len(offsets) - 1)]
+        return cls(np.load(path / "centroids.npy"), lists, nprobe=manifest['nprobe'],
+                   snapshot_version=manifest.get('snapshot_version'))
+
+
+def get_default_nprobe():
+    value = os.getenv("ANN_NPROBE")
+    return int(value) if value else None
+
+
+def load_ann_for_snapshot(snapshot):
+    """The snapshot's IVF index, or None if it has none (or it was built for another version)."""
+    path = snapshot.path / ANN_DIR
+    if not (path / IVF_MANIFEST).exists():
+        return None
+    ann = IVFIndex.load(path)
+    if ann.snapshot_version != snapshot.version:
+        logger.warning("Ignoring ANN index at %s: built for %s, snapshot is %s", path, ann.snapshot_version,
+                       snapshot.version)
+        return None
+    nprobe = get_default_nprobe()
+    if nprobe:
+        ann.nprobe = nprobe
+    return ann
+
+
+# ============================================================================
+# RECALL REPORT
+# ============================================================================
+
+def exact_search(vectors, query, top_k):
+    scores = vectors @ query
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def recall_report(vectors, ann, k=10, num_queries=200, nprobes=(1, 2, 4, 8, 16, 32, 64), noise=0.05, seed=0):
+    """
+    recall@k and latency of the ANN index against exact search.
+
+    Queries are stored vectors perturbed with Gaussian noise (so they are near,
+    but not equal to, indexed vectors).
+
+    Returns:
+        List of dicts: nprobe, recall, avg_ms (plus one 'exact' row)
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    queries = np.asarray(vectors[rows], dtype=np.float32)
+    queries = _normalize(queries + rng.normal(scale=noise, size=queries.shape).astype(np.float32))
+
+    start = time.perf_counter()
+    truth = [set(exact_search(vectors, q, k).tolist()) for q in queries]
+    report = [{'nprobe': 'exact', 'recall': 1.0, 'avg_ms': (time.perf_counter() - start) * 1000 / len(queries)}]
+
+    for nprobe in nprobes:
+        if nprobe > ann.nlist:
+            break
+        hits = 0
+        start = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            found, _ = ann.search(vectors, q, k, nprobe=nprobe)
+            hits += len(expected.intersection(found.tolist()))
+        elapsed = time.perf_counter() - start
+        report.append({'nprobe': nprobe, 'recall': hits / (k * len(queries)), 'avg_ms': elapsed * 1000 / len(queries)})
+    return report
+
+
+def synthetic_vectors(n, dimension, clusters=None, seed=0):
+    """Clustered random unit vectors, shaped roughly like text embeddings."""
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, n // 500)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + rng.normal(scale=0.6, size=(n, dimension)).astype(np.float32)
+    return _normalize(vectors)
+
+
+def main(argv=None):
+    from src.config import configure_logging
+    from src.snapshot import open_snapshot
+    from src.vector_store import get_local_index_dir
+
+    parser = argparse.ArgumentParser(description="Build and evaluate IVF ANN indexes for local snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Train and save the IVF index of a snapshot")
+    build.add_argument("semester")
+    build.add_argument("--nlist", type=int, default=None, help="Number of lists (default ~4*sqrt(N))")
+    build.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="Default lists scanned per query")
+    build.add_argument("--iterations", type=int, default=20)
+
+    report = sub.add_parser("report", help="recall@k vs exact search for a range of nprobe values")
+    report.add_argument("semester", nargs="?")
+    report.add_argument("--synthetic", type=int, default=None, help="Use N synthetic vectors instead of a snapshot")
+    report.add_argument("--dimension", type=int, default=1024)
+    report.add_argument("--nlist", type=int, default=None)
+    report.add_argument("--k", type=int, default=10)
+    report.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.command == "build":
+        snapshot = open_snapshot(get_local_index_dir() / args.semester)
+        start = time.perf_counter()
+        ann = IVFIndex.build(snapshot.embeddings, nlist=args.nlist, nprobe=args.nprobe,
+                             iterations=args.iterations, snapshot_version=snapshot.version)
+        ann.save(snapshot.path / ANN_DIR)
+        print(f"✅ Built IVF index for {args.semester}: {len(ann)} vectors, nlist={ann.nlist}, "
+              f"nprobe={ann.nprobe} in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dimension)
+        ann = IVFIndex.build(vectors, nlist=args.nlist)
+        source = f"{args.synthetic} synthetic vectors (dim {args.dimension})"
+    else:
+        if not args.semester:
+            parser.error("report needs a semester or --synthetic N")
+        snapshot = open_snapshot(get_local_index_dir() / args.semester)
+        vectors = snapshot.embeddings
+        ann = load_ann_for_snapshot(snapshot)
+        if ann is None or args.nlist:
+            ann = IVFIndex.build(vectors, nlist=args.nlist)
+        source = f"{args.semester} ({len(vectors)} vectors)"
+
+    print(f"recall@{args.k} on {source}, nlist={ann.nlist}, {args.queries} queries")
+    print(f"{'nprobe':>8} {'recall':>8} {'avg ms':>8}")
+    for row in recall_report(vectors, ann, k=args.k, num_queries=args.queries):
+        print(f"{row['nprobe']:>8} {row['recall']:>8.3f} {row['avg_ms']:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
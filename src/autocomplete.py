@@ -0,0 +1,134 @@
+"""
+Course ID / title autocomplete.
+
+A sorted-key prefix index (binary search over the keys, so a lookup is
+O(log n + matches)) over every course's 8-digit ID, its legacy 6-digit form
+and its normalised title, from each title word on, so "להנדס" finds
+"מבוא להנדסת תעשיה וניהול". Built once per semester from the snapshot or
+catalog metadata.
+"""
+import logging
+import re
+import time
+import bisect
+import threading
+from src.utilities import canonical_course_id, normalize_course_id
+from src.lexical import tokenize, load_course_texts
+from src.catalog import CATALOG_REFRESH_SECONDS, get_semester_version
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_SCAN = 500
+
+# "00940101 - מבוא להנדסת תעשיה וניהול" -> "מבוא להנדסת תעשיה וניהול"
+_TITLE_ID_PREFIX = re.compile(r'^\s*\d+\s*-\s*')
+
+_completers = {}
+_completers_lock = threading.Lock()
+
+
+def course_name(title):
+    """Course title without its leading course number."""
+    return _TITLE_ID_PREFIX.sub('', title or '').strip()
+
+
+class CourseCompleter:
+    """
+    Prefix index over course IDs and titles.
+
+    Keys are kept in one sorted list of (key, rank, row) tuples; rank orders
+    matches of the same key: 0 = ID, 1 = start of the title, 2 = later title word.
+    """
+
+    def __init__(self, ids, titles, version=None):
+        self.ids = [str(i) for i in ids]
+        self.canonical_ids = [canonical_course_id(i) for i in self.ids]
+        self.names = [course_name(t) for t in titles]
+        self.version = version
+        self.built_at = time.monotonic()
+        self._row_by_canonical = {course_id: row for row, course_id in enumerate(self.canonical_ids) if course_id}
+
+        entries = []
+        for row, (course_id, name) in enumerate(zip(self.canonical_ids, self.names)):
+            if course_id:
+                entries.append((course_id, 0, row))
+                entries.append((normalize_course_id(course_id), 0, row))
+            words = tokenize(name)
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), 1 if start == 0 else 2, row))
+        entries.sort()
+        self.entries = entries
+        self.keys = [key for key, _, _ in entries]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, course_id):
+        """Index ID of a course given in either its 6- or 8-digit form (None if unknown)."""
+        row = self._row_by_canonical.get(canonical_course_id(course_id))
+        return self.ids[row] if row is not None else None
+
+    def complete(self, query, limit=DEFAULT_LIMIT):
+        """
+        Courses whose ID or title starts with `query`, best first.
+
+        Returns:
+            [{'id': index ID, 'canonical_id': 8-digit ID, 'legacy_id': 6-digit ID, 'name': title}, ...]
+        """
+        query = (query or '').strip()
+        if re.fullmatch(r'[\d\s-]+', query):
+            prefix = re.sub(r'\D', '', query)
+        else:
+            prefix = ' '.join(tokenize(query))
+        if not prefix:
+            return []
+
+        # Keys starting with the prefix form one contiguous run of the sorted list;
+        # very short prefixes only rank the first MAX_SCAN keys of it
+        start = bisect.bisect_left(self.keys, prefix)
+        end = min(bisect.bisect_left(self.keys, prefix + '\uffff', lo=start), start + MAX_SCAN)
+        matches = sorted((rank, key != prefix, len(self.names[row]), row)
+                         for key, rank, row in self.entries[start:end])
+
+        seen, results = set(), []
+        for _, _, _, row in matches:
+            if row in seen:
+                continue
+            seen.add(row)
+            results.append({'id': self.ids[row], 'canonical_id': self.canonical_ids[row],
+                            'legacy_id': normalize_course_id(self.canonical_ids[row]), 'name': self.names[row]})
+            if len(results) >= limit:
+                break
+        return results
+
+
+def get_completer(semester_name):
+    """The semester's autocomplete index, built on first use (and refreshed like the catalog)."""
+    version = get_semester_version(semester_name)
+    completer = _completers.get(semester_name)
+    if completer is not None and completer.version == version and (
+            version is not None or time.monotonic() - completer.built_at < CATALOG_REFRESH_SECONDS):
+        return completer
+
+    with _completers_lock:
+        completer = _completers.get(semester_name)
+        if completer is None or completer.version != version or (
+                version is None and time.monotonic() - completer.built_at >= CATALOG_REFRESH_SECONDS):
+            ids, courses, version = load_course_texts(semester_name, fields=('title',))
+            completer = CourseCompleter(ids, [c.get('title', '') for c in courses], version=version)
+            _completers[semester_name] = completer
+            logger.debug("Built autocomplete index for %s: %d courses, %d keys",
+                         semester_name, len(completer), len(completer.keys))
+    return completer
+
+
+def warmup_autocomplete(semester_names):
+    """Build the autocomplete index of each semester (run at startup)."""
+    for semester_name in semester_names:
+        try:
+            get_completer(semester_name)
+        except Exception as e:
+            logger.warning("Could not build autocomplete index for %s: %s", semester_name, e)
@@ -0,0 +1,253 @@
+"""
+Batch recommendations for many students at once (advising offices, pre-registration runs).
+
+Per semester and chunk of students:
+  1. queries go through the lexical index as in recommend_courses; the rest are embedded in one batch
+  2. semantic scores are one (S, D) x (D, N) matrix product against the course embeddings, plus
+     the keyword relevance term for queries with keyword matches
+  3. eligibility is one bitset pass over the prerequisite index for all S students (chunked
+     internally, so memory stays bounded for any batch size)
+  4. combined scores are (S, 4) x (4, N), and only each student's top N courses are hydrated
+
+Scores match recommend_courses for the same profile.
+"""
+import json
+import re
+import numpy as np
+import pandas as pd
+from src.embeddings import embed_queries
+from src.catalog import get_semester_catalog
+from src.connections import get_index, get_index_dimension
+from src.knowledgebase import fetch_course_metadata
+from src.lexical import search_lexical, lexical_weight
+from src.rerank import top_n_order
+from src.vector_store import LocalVectorIndex
+
+
+DEFAULT_SEMESTER = "WINTER_2025_2026"
+DEFAULT_TOP_N = 10
+DEFAULT_BATCH_SIZE = 1024
+WEIGHT_KEYS = ['semantic', 'credits', 'avg_grade', 'workload_rating', 'general_rating']
+DEFAULT_WEIGHT = 0.2
+
+_TRUE_VALUES = ("1", "true", "yes", "y")
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_VALUES
+    return bool(value)
+
+
+def _as_float(value, default):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    value = float(value)
+    return default if np.isnan(value) else value
+
+
+def _as_course_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(c).strip() for c in value if str(c).strip()]
+    # CSV cells: IDs separated by spaces, commas or semicolons
+    return [c for c in re.split(r"[\s,;]+", str(value)) if c]
+
+
+def parse_profile(raw, position, default_semester=DEFAULT_SEMESTER, default_top_n=DEFAULT_TOP_N):
+    """
+    Normalize one student profile (a CSV row or a JSONL object).
+
+    Recognized fields: student_id, semester, completed (list or separated
+    string), no_exam, min_credits, query, top_n, and weights either as a
+    `weights` dict or as `<name>_weight` columns (semantic, credits,
+    avg_grade, workload_rating, general_rating). Missing weights default to 0.2.
+    """
+    weights = raw.get('weights') or {}
+    if isinstance(weights, str):
+        weights = json.loads(weights) if weights.strip() else {}
+
+    return {
+        'student_id': str(raw.get('student_id') or position),
+        'semester': raw.get('semester') or default_semester,
+        'completed': _as_course_list(raw.get('completed', raw.get('courses_list'))),
+        'no_exam': _as_bool(raw.get('no_exam', False)),
+        'min_credits': _as_float(raw.get('min_credits'), 0.0),
+        'query': str(raw.get('query') or raw.get('user_query') or ""),
+        'top_n': int(_as_float(raw.get('top_n'), default_top_n)),
+        'weights': [
+            _as_float(weights.get(key, raw.get(f"{key}_weight")), DEFAULT_WEIGHT) for key in WEIGHT_KEYS
+        ],
+    }
+
+
+def load_profiles(path, default_semester=DEFAULT_SEMESTER, default_top_n=DEFAULT_TOP_N):
+    """Read student profiles from a .csv or .jsonl file."""
+    path = str(path)
+    if path.endswith((".jsonl", ".json")):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        rows = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig").to_dict("records")
+    return [parse_profile(row, i, default_semester, default_top_n) for i, row in enumerate(rows)]
+
+
+def course_embedding_matrix(semester_name, catalog):
+    """
+    (N, D) unit-length course embeddings aligned with the catalog rows.
+
+    Local snapshots are used in place; for Pinecone every vector is pulled
+    once with a single query (the same pull the catalog build does).
+    """
+    index = get_index(semester_name)
+    if isinstance(index, LocalVectorIndex):
+        ids, embeddings = index.ids, index.embeddings
+    else:
+        response = index.query(vector=[0.0] * get_index_dimension(semester_name), top_k=10000,
+                               include_values=True, timeout=30)
+        ids = [m.id for m in response.matches]
+        embeddings = np.array([m.values for m in response.matches], dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings = embeddings / norms
+
+    matrix = np.zeros((len(catalog), embeddings.shape[1]), dtype=np.float32)
+    known = [i for i, course_id in enumerate(ids) if str(course_id) in catalog.row_of]
+    matrix[catalog.rows_for(ids[i] for i in known)] = embeddings[known]
+    return matrix
+
+
+def eligibility_matrix(catalog, profiles):
+    """(S, N) bool: eligible courses of every student (prerequisites, not taken, filters)."""
+    bitsets = np.stack([catalog.prerequisites.completed_bitset(p['completed']) for p in profiles])
+    eligible = catalog.prerequisites.eligible_for_bitsets(bitsets)
+
+    for s, profile in enumerate(profiles):
+        taken = [catalog.row_of[c] for c in profile['completed'] if c in catalog.row_of]
+        eligible[s, taken] = False
+
+    no_exam = np.array([p['no_exam'] for p in profiles], dtype=bool)
+    eligible &= ~(no_exam[:, None] & catalog.has_exam[None, :])
+
+    # Courses with unknown credits are kept (NaN comparisons are False)
+    min_credits = np.array([p['min_credits'] for p in profiles], dtype=np.float64)
+    eligible &= ~(min_credits[:, None] > catalog.credits[None, :])
+    return eligible
+
+
+def score_matrix(catalog, course_matrix, profiles):
+    """
+    Combined scores of every (student, course) pair, -inf where not eligible.
+
+    Returns:
+        (scores, semantic, eligible), each (S, N)
+    """
+    semantic = np.zeros((len(profiles), len(catalog)), dtype=np.float32)
+    lexical = np.zeros((len(profiles), len(catalog)), dtype=np.float32)
+    with_query = []
+    for s, profile in enumerate(profiles):
+        if not profile['query'].strip():
+            continue
+        # Same rules as get_candidate_set: a confident keyword result replaces the embedding,
+        # other keyword matches add their relevance as a separate term
+        result = search_lexical(catalog.semester_name, profile['query'])
+        if result is not None and result.confident:
+            semantic[s] = result.by_row(result.semantic_scores(), catalog.row_of, len(catalog))
+            continue
+        if result is not None:
+            lexical[s] = result.by_row(result.relevance(), catalog.row_of, len(catalog))
+        with_query.append(s)
+    if with_query:
+        queries = embed_queries([profiles[s]['query'] for s in with_query])
+        semantic[with_query] = queries @ course_matrix.T
+
+    eligible = eligibility_matrix(catalog, profiles)
+    features = catalog.features
+    weights = np.array([p['weights'] for p in profiles], dtype=np.float32)
+
+    # Credits are normalized by the max over each student's eligible courses, as in rerank
+    max_credits = np.where(eligible, features[None, :, 0], 0).max(axis=1, initial=0).astype(np.float32)
+    feature_weights = weights[:, 1:].copy()
+    feature_weights[:, 0] *= np.divide(1, max_credits, out=np.zeros_like(max_credits), where=max_credits > 0)
+
+    scores = weights[:, :1] * semantic + feature_weights @ features.T + np.float32(lexical_weight()) * lexical
+    scores[~eligible] = -np.inf
+    return scores, semantic, eligible
+
+
+def top_courses(scores, top_n):
+    """(S, k) row indices of each student's best courses, best first (ties broken as in top_n_order)."""
+    k = min(top_n, scores.shape[1])
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64)
+    return np.stack([top_n_order(student_scores, k) for student_scores in scores])
+
+
+def _recommend_chunk(semester_name, catalog, course_matrix, profiles):
+    scores, semantic, eligible = score_matrix(catalog, course_matrix, profiles)
+    top = top_courses(scores, max(p['top_n'] for p in profiles))
+
+    selected = []
+    for s, profile in enumerate(profiles):
+        rows = [row for row in top[s, :profile['top_n']] if eligible[s, row]]
+        selected.append(rows)
+
+    metadata = fetch_course_metadata(semester_name, sorted({catalog.ids[r] for rows in selected for r in rows}))
+
+    results = []
+    for s, (profile, rows) in enumerate(zip(profiles, selected)):
+        student_results = []
+        for rank, row in enumerate(rows, start=1):
+            course_id = catalog.ids[row]
+            student_results.append({
+                'student_id': profile['student_id'],
+                'semester': semester_name,
+                'rank': rank,
+                'course_id': course_id,
+                'title': metadata.get(course_id, {}).get('title'),
+                'combined_score': float(scores[s, row]),
+                'semantic_score': float(semantic[s, row]),
+                'avg_grade': float(catalog.avg_grade[row]),
+                'credits': None if np.isnan(catalog.credits[row]) else float(catalog.credits[row]),
+                'eligible_count': int(eligible[s].sum()),
+            })
+        results.append(student_results)
+    return results
+
+
+def recommend_batch(profiles, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Ranked recommendations for many students.
+
+    Args:
+        profiles: Profiles from parse_profile / load_profiles
+        batch_size: Students scored together (bounds the (S, N) score matrices)
+
+    Returns:
+        DataFrame with one row per (student, recommended course), in input order
+    """
+    results = []
+    by_semester = {}
+    for position, profile in enumerate(profiles):
+        by_semester.setdefault(profile['semester'], []).append((position, profile))
+
+    for semester_name, group in by_semester.items():
+        catalog = get_semester_catalog(semester_name, index=get_index(semester_name))
+        course_matrix = course_embedding_matrix(semester_name, catalog)
+        for start in range(0, len(group), batch_size):
+            chunk = group[start:start + batch_size]
+            chunk_results = _recommend_chunk(semester_name, catalog, course_matrix, [p for _, p in chunk])
+            results.extend(zip((position for position, _ in chunk), chunk_results))
+
+    results.sort(key=lambda item: item[0])
+    return pd.DataFrame([row for _, student_results in results for row in student_results])
+
+
+def write_results(results, path):
+    """Write batch results as .jsonl (one row per line) or .csv."""
+    path = str(path)
+    if path.endswith(".jsonl"):
+        results.to_json(path, orient="records", lines=True, force_ascii=False)
+    else:
+        results.to_csv(path, index=False, encoding="utf-8-sig")
@@ -0,0 +1,219 @@
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with optional per-entry TTL and hit/miss counters.
+
+    Args:
+        maxsize: Maximum number of entries before the least recently used is evicted
+        ttl: Seconds an entry stays valid (None = no expiry)
+        name: Label used in stats()
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SQLiteVectorStore:
+    """
+    Persistent (model, text) -> float32 vector store in a SQLite file.
+
+    WAL mode lets several worker processes read and write the same file, so a
+    query embedded by one gunicorn worker is a cache hit for the others and
+    survives restarts. Each thread gets its own connection.
+
+    The file is bounded: every `prune_every` writes, rows older than `max_age`
+    seconds and the oldest rows beyond `max_rows` are deleted. It is only a
+    cache, so SQLite errors (e.g. "database is locked" under many workers) are
+    logged and treated as misses instead of failing the caller.
+
+    Args:
+        path: SQLite file
+        max_rows: Rows kept after pruning (None = unbounded)
+        max_age: Seconds a row is kept (None = no expiry)
+        prune_every: Writes between pruning passes
+    """
+
+    def __init__(self, path, max_rows=None, max_age=None, prune_every=256):
+        self.path = str(path)
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.pruned = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (model, text))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS vectors_created_at ON vectors (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _failed(self, action, exc):
+        self.errors += 1
+        logger.warning("Embedding store %s failed (%s): %s", action, self.path, exc)
+
+    def get(self, model, text):
+        try:
+            row = self._connection().execute(
+                "SELECT vector FROM vectors WHERE model = ? AND text = ?", (model, text)
+            ).fetchone()
+        except sqlite3.Error as exc:
+            self._failed("read", exc)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def set(self, model, text, vector):
+        self.set_many(model, [(text, vector)])
+
+    def set_many(self, model, items):
+        """Store (text, vector) pairs in one transaction."""
+        now = time.time()
+        rows = [(model, text, np.asarray(vector, dtype=np.float32).tobytes(), now) for text, vector in items]
+        if not rows:
+            return
+        conn = self._connection()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (model, text, vector, created_at) VALUES (?, ?, ?, ?)", rows
+                )
+        except sqlite3.Error as exc:
+            self._failed("write", exc)
+            return
+        self._writes += len(rows)
+        if self._writes >= self.prune_every:
+            self._writes = 0
+            self.prune()
+
+    def prune(self):
+        """Delete expired rows and the oldest rows beyond max_rows; returns how many were deleted."""
+        conn = self._connection()
+        deleted = 0
+        try:
+            with conn:
+                if self.max_age is not None:
+                    deleted += conn.execute(
+                        "DELETE FROM vectors WHERE created_at < ?", (time.time() - self.max_age,)
+                    ).rowcount
+                if self.max_rows is not None:
+                    deleted += conn.execute(
+                        "DELETE FROM vectors WHERE rowid IN ("
+                        " SELECT rowid FROM vectors ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_rows,)
+                    ).rowcount
+        except sqlite3.Error as exc:
+            self._failed("prune", exc)
+            return 0
+        self.pruned += deleted
+        return deleted
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        try:
+            size = len(self)
+        except sqlite3.Error as exc:
+            self._failed("count", exc)
+            size = None
+        return {
+            'path': self.path,
+            'size': size,
+            'max_rows': self.max_rows,
+            'max_age': self.max_age,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'pruned': self.pruned,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
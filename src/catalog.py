@@ -0,0 +1,198 @@
+import logging
+import time
+import threading
+import numpy as np
+from src.course_metadata import DEFAULT_AVG_GRADE, parse_course_metadata
+from src.prerequisites import PrerequisiteIndex
+from src.rerank import build_feature_matrix
+from src.vector_store import get_vector_store_backend, get_local_index
+from src.connections import get_index_dimension
+
+logger = logging.getLogger(__name__)
+
+
+# Pinecone indexes carry no version, so catalogs built from query results are
+# rebuilt after this many seconds (or as soon as an unknown course ID shows up)
+CATALOG_REFRESH_SECONDS = 600
+
+# Course text kept from Pinecone metadata for the lexical and autocomplete indexes
+TEXT_FIELDS = ('title', 'description', 'all_reviews', 'reviews_summary')
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def _rating(metadata, key):
+    value = (metadata or {}).get(key)
+    return np.nan if value is None else float(value)
+
+
+def _neighbor_rows(course_ids, similar):
+    """(N, k) neighbour rows from per-course lists of similar course IDs (index metadata)."""
+    row_of = {course_id: row for row, course_id in enumerate(course_ids)}
+    rows = [[row_of[str(c)] for c in (ids or []) if str(c) in row_of] for ids in similar]
+    neighbors = np.full((len(rows), max(len(r) for r in rows)), -1, dtype=np.int32)
+    for i, r in enumerate(rows):
+        neighbors[i, :len(r)] = r
+    return neighbors
+
+
+class SemesterCatalog:
+    """
+    Per-semester data compiled once and shared by every request: the course
+    ID -> row mapping, the prerequisite bitset index, typed per-course
+    columns (credits, exam flag, average grade) used by the filter step,
+    the float32 rerank feature matrix and, when the ingest produced one,
+    the similar-courses graph (neighbors: (N, k) rows, -1 padded).
+    Catalogs compiled from index metadata also keep the course text
+    (TEXT_FIELDS), so the lexical and autocomplete indexes reuse the same
+    metadata pull; snapshots serve their text columns directly.
+    """
+
+    def __init__(self, semester_name, course_ids, prerequisites, credits, has_exam, avg_grade,
+                 workload_rating, general_rating, version=None, neighbors=None, neighbor_scores=None,
+                 texts=None):
+        self.semester_name = semester_name
+        self.ids = [str(c) for c in course_ids]
+        self.row_of = {course_id: row for row, course_id in enumerate(self.ids)}
+        self.prerequisites = prerequisites
+        self.credits = np.asarray(credits, dtype=np.float64)
+        self.has_exam = np.asarray(has_exam, dtype=bool)
+        # Courses without grade history get the default average, as before
+        self.avg_grade = np.where(np.isnan(avg_grade), DEFAULT_AVG_GRADE, avg_grade)
+        self.features = build_feature_matrix(self.credits, self.avg_grade, workload_rating, general_rating)
+        self.neighbors = neighbors
+        self.neighbor_scores = neighbor_scores
+        self.texts = texts or {}
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_matches(cls, semester_name, matches, version=None):
+        """Compile from index query matches (typed metadata or legacy JSON strings)."""
+        course_ids = [str(m.id) for m in matches]
+        courses = [parse_course_metadata(m.metadata) for m in matches]
+        similar = [(m.metadata or {}).get('similar_courses') for m in matches]
+        return cls(
+            semester_name,
+            course_ids,
+            PrerequisiteIndex(course_ids, [c['prerequisites'] for c in courses]),
+            credits=[np.nan if c['credits'] is None else c['credits'] for c in courses],
+            has_exam=[c['has_exam'] for c in courses],
+            avg_grade=np.array([np.nan if c['avg_grade'] is None else c['avg_grade'] for c in courses]),
+            workload_rating=[_rating(m.metadata, 'workload_rating') for m in matches],
+            general_rating=[_rating(m.metadata, 'general_rating') for m in matches],
+            version=version,
+            neighbors=_neighbor_rows(course_ids, similar) if any(similar) else None,
+            texts={field: [(m.metadata or {}).get(field) or '' for m in matches] for field in TEXT_FIELDS},
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Compile from a snapshot's typed arrays (no parsing at all)."""
+        arrays = snapshot.arrays
+        prerequisites = PrerequisiteIndex.from_offsets(
+            snapshot.ids, arrays['prereq_course_offsets'], arrays['prereq_group_offsets'], arrays['prereq_ids']
+        )
+        return cls(snapshot.semester, snapshot.ids, prerequisites,
+                   credits=arrays['credits'], has_exam=arrays['has_exam'], avg_grade=arrays['avg_grade'],
+                   workload_rating=arrays['workload_rating'], general_rating=arrays['general_rating'],
+                   version=snapshot.version,
+                   neighbors=arrays.get('neighbors'), neighbor_scores=arrays.get('neighbor_scores'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_for(self, course_ids):
+        return np.fromiter((self.row_of[str(c)] for c in course_ids), dtype=np.int64)
+
+    def eligible_mask(self, rows, courses_list, no_exam=False, min_credits=0):
+        """
+        Vectorized version of the filter rules for the given catalog rows:
+        not already taken, prerequisites satisfied, optional no-exam and
+        minimum-credits filters.
+        """
+        taken = np.zeros(len(self), dtype=bool)
+        taken[[self.row_of[str(c)] for c in courses_list if str(c) in self.row_of]] = True
+
+        mask = self.prerequisites.eligible(courses_list)[rows] & ~taken[rows]
+        if no_exam:
+            mask &= ~self.has_exam[rows]
+        if min_credits:
+            # Courses with unknown credits are kept (NaN comparisons are False)
+            mask &= ~(min_credits > self.credits[rows])
+        return mask
+
+    def course_texts(self, fields=TEXT_FIELDS):
+        """Per course, {field: text} for the requested fields ('' when not kept)."""
+        columns = [(field, self.texts.get(field)) for field in fields]
+        return [{field: column[row] if column else '' for field, column in columns} for row in range(len(self))]
+
+    def covers(self, course_ids):
+        return all(str(c) in self.row_of for c in course_ids)
+
+    def is_stale(self, version=None):
+        if version is not None or self.version is not None:
+            return version != self.version
+        return time.monotonic() - self.built_at > CATALOG_REFRESH_SECONDS
+
+
+def get_semester_version(semester_name):
+    """Version of the data behind a semester (snapshot hash), or None for Pinecone."""
+    if get_vector_store_backend() == "local":
+        return get_local_index(semester_name).version
+    return None
+
+
+def _pull_catalog_matches(semester_name, index):
+    """One full metadata pull from a (Pinecone) index: every course with its metadata."""
+    dimension = get_index_dimension(semester_name)
+    response = index.query(vector=[0.0] * dimension, top_k=10000, include_metadata=True, timeout=30)
+    return response.matches
+
+
+def _is_usable(catalog, version, matches):
+    """A cached catalog can serve this call: fresh, and it knows every matched course."""
+    if catalog is None or catalog.is_stale(version):
+        return False
+    return matches is None or catalog.covers(m.id for m in matches)
+
+
+def get_semester_catalog(semester_name, matches=None, index=None):
+    """
+    Return the compiled catalog for a semester, building it on first use.
+
+    Local snapshots are compiled from their typed arrays and keyed by snapshot
+    version. For Pinecone the catalog is compiled from query `matches` that
+    carry metadata, or from one full metadata pull of `index`, and refreshed
+    periodically or when a match isn't in it.
+    """
+    snapshot = None
+    if get_vector_store_backend() == "local":
+        snapshot = get_local_index(semester_name).snapshot
+    version = snapshot.version if snapshot is not None else None
+
+    catalog = _catalogs.get(semester_name)
+    if _is_usable(catalog, version, matches):
+        return catalog
+
+    with _catalogs_lock:
+        # Another thread may have rebuilt it while this one waited for the lock
+        catalog = _catalogs.get(semester_name)
+        if _is_usable(catalog, version, matches):
+            return catalog
+        if snapshot is not None:
+            catalog = SemesterCatalog.from_snapshot(snapshot)
+        elif matches is not None and all(m.metadata for m in matches):
+            catalog = SemesterCatalog.from_matches(semester_name, matches)
+        elif index is not None:
+            catalog = SemesterCatalog.from_matches(semester_name, _pull_catalog_matches(semester_name, index))
+        elif catalog is not None:
+            # Stale, but there is nothing to rebuild from; the next query refreshes it
+            return catalog
+        else:
+            raise ValueError(f"No catalog source for semester {semester_name}")
+        _catalogs[semester_name] = catalog
+        logger.debug("Compiled catalog for %s: %d courses, %d prerequisite clauses",
+                     semester_name, len(catalog), catalog.prerequisites.num_clauses)
+    return catalog
@@ -0,0 +1,29 @@
+import os
+import logging
+import threading
+from dotenv import load_dotenv
+
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """Load .env into the environment once per process (later calls are free)."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+
+
+def configure_logging(level=None):
+    """
+    Root logging setup for entry points: level from LOG_LEVEL (default INFO).
+    Does nothing if logging is already configured (e.g. by gunicorn).
+    """
+    load_env()
+    level = level or os.getenv("LOG_LEVEL", "INFO").upper()
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
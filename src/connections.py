@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+from src.config import load_env
+from src.vector_store import get_vector_store_backend, get_local_index
+
+
+# Index stats (dimension, vector count) are cached and refreshed after this many seconds
+DEFAULT_STATS_REFRESH_SECONDS = 300
+
+# Process-wide connection state: one Pinecone client (and its HTTP pool), one
+# index handle per semester and one GenAI client, shared by all Flask threads
+_client = None
+_genai_client = None
+_indexes = {}
+_stats = {}
+# Stand-ins from register_index / register_genai_client; they hold no sockets, so forks keep them
+_registered = {}
+_registered_genai = None
+_owner_pid = None
+_lock = threading.Lock()
+
+_metrics = {
+    'clients_created': 0,
+    'genai_clients_created': 0,
+    'index_handles_created': 0,
+    'index_handle_reuses': 0,
+    'stats_requests': 0,
+    'stats_cache_hits': 0,
+}
+
+
+def _check_pid():
+    # A forked worker must not reuse the parent's sockets: start over with fresh handles
+    global _client, _genai_client, _owner_pid
+    pid = os.getpid()
+    if _owner_pid != pid:
+        _client = None
+        _genai_client = None
+        _indexes.clear()
+        _stats.clear()
+        _owner_pid = pid
+
+
+def _pool_threads():
+    value = os.getenv("PINECONE_POOL_THREADS")
+    return int(value) if value else None
+
+
+def get_pinecone():
+    """Return the process-wide Pinecone client, creating it on first use."""
+    global _client
+    with _lock:
+        _check_pid()
+        if _client is None:
+            from pinecone import Pinecone
+
+            load_env()
+            api_key = os.getenv("PINECONE_API_KEY")
+            if not api_key:
+                raise ValueError("No API key found. Please check your .env file.")
+            _client = Pinecone(api_key=api_key)
+            _metrics['clients_created'] += 1
+        return _client
+
+
+def get_index(semester_name):
+    """
+    Return the cached index handle of a semester.
+
+    The handle owns the HTTP connection pool, so reusing it keeps TLS sessions
+    alive between requests. The local backend returns the in-memory snapshot index,
+    and indexes passed to register_index are returned as they are.
+    """
+    if get_vector_store_backend() == "local":
+        return get_local_index(semester_name)
+
+    index = _registered.get(semester_name)
+    if index is not None:
+        return index
+
+    pc = get_pinecone()
+    with _lock:
+        index = _indexes.get(semester_name)
+        if index is not None:
+            _metrics['index_handle_reuses'] += 1
+            return index
+
+        host = os.getenv(semester_name)
+        if not host:
+            raise ValueError(f"No index found for semester: {semester_name}")
+
+        pool_threads = _pool_threads()
+        index = pc.Index(host=host, pool_threads=pool_threads) if pool_threads else pc.Index(host=host)
+        _indexes[semester_name] = index
+        _metrics['index_handles_created'] += 1
+        return index
+
+
+def register_index(semester_name, index):
+    """
+    Serve `index` for a semester instead of connecting to Pinecone. Anything
+    with the Index API (query, fetch, describe_index_stats) works; used by the
+    offline benchmarks to run the Pinecone code path without a network.
+    """
+    with _lock:
+        _registered[semester_name] = index
+        _stats.pop(semester_name, None)
+
+
+def get_genai_client():
+    """Return the process-wide Google GenAI client, creating it on first use."""
+    global _genai_client
+    if _registered_genai is not None:
+        return _registered_genai
+    with _lock:
+        _check_pid()
+        if _genai_client is None:
+            from google import genai
+
+            load_env()
+            _genai_client = genai.Client(api_key=os.getenv("GOOLGE_API_KEY"))
+            _metrics['genai_clients_created'] += 1
+        return _genai_client
+
+
+def register_genai_client(client):
+    """Serve `client` (anything with models.generate_content) instead of a real GenAI client."""
+    global _registered_genai
+    _registered_genai = client
+
+
+def get_stats_refresh_seconds():
+    load_env()
+    return float(os.getenv("PINECONE_STATS_REFRESH_SECONDS", DEFAULT_STATS_REFRESH_SECONDS))
+
+
+def get_index_stats(semester_name, refresh=False):
+    """describe_index_stats() of a semester index, cached for PINECONE_STATS_REFRESH_SECONDS."""
+    index = get_index(semester_name)
+    if get_vector_store_backend() == "local":
+        return index.describe_index_stats()
+
+    with _lock:
+        _metrics['stats_requests'] += 1
+        cached = _stats.get(semester_name)
+        if not refresh and cached is not None and time.monotonic() - cached[0] < get_stats_refresh_seconds():
+            _metrics['stats_cache_hits'] += 1
+            return cached[1]
+
+    stats = index.describe_index_stats()
+    with _lock:
+        _stats[semester_name] = (time.monotonic(), stats)
+    return stats
+
+
+def get_index_dimension(semester_name):
+    return get_index_stats(semester_name)['dimension']
+
+
+def get_connection_stats():
+    """Connection reuse counters for the status endpoint."""
+    with _lock:
+        metrics = dict(_metrics)
+        metrics['open_index_handles'] = sorted(_indexes)
+    created = metrics['index_handles_created']
+    lookups = created + metrics['index_handle_reuses']
+    metrics['index_handle_reuse_rate'] = round(metrics['index_handle_reuses'] / lookups, 4) if lookups else 0.0
+    return metrics
@@ -0,0 +1,120 @@
+"""
+Typed course metadata shared by the ingest pipeline and the serving layer.
+
+Index metadata can only hold strings, numbers, booleans and lists of strings,
+so the typed fields are laid out as:
+
+  credits              float
+  has_exam             bool (True when a moed A date exists)
+  avg_grade            float, mean of the per-semester final averages (absent if none)
+  grade_semesters      list[str], semester labels
+  grade_values         list[float], final average per semester (same order)
+  prerequisite_groups  list[str], one "ID ID ..." string per alternative group
+
+Older indexes (and the ingest CSV) store 'prerequisites' and 'avg_grades' as
+JSON strings instead; parse_course_metadata reads both. It runs once per course
+when a semester catalog is compiled, never per request.
+"""
+import json
+import math
+
+
+DEFAULT_AVG_GRADE = 60
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or value == ""
+
+
+def _json_field(value, default):
+    if isinstance(value, (list, dict)):
+        return value
+    if _is_missing(value) or not isinstance(value, str):
+        return default
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return default
+
+
+def encode_prerequisite_groups(prerequisites):
+    return [" ".join(str(c) for c in group) for group in prerequisites]
+
+
+def decode_prerequisite_groups(groups):
+    return [group.split() for group in groups or []]
+
+
+def average_grade(avg_grades):
+    if not avg_grades:
+        return None
+    return sum(avg_grades.values()) / len(avg_grades)
+
+
+def typed_course_fields(prerequisites, avg_grades, moed_a, credits):
+    """
+    Derive the typed index fields at ingest time.
+
+    Args:
+        prerequisites: List of prerequisite groups (lists of course IDs)
+        avg_grades: Dict of semester -> final average grade
+        moed_a: Moed A exam date (empty/None when there is no exam)
+        credits: Credit points
+
+    Returns:
+        Dict of typed metadata fields (missing values omitted)
+    """
+    avg_grades = {str(k): float(v) for k, v in (avg_grades or {}).items()}
+    fields = {
+        'has_exam': not _is_missing(moed_a),
+        'grade_semesters': list(avg_grades.keys()),
+        'grade_values': list(avg_grades.values()),
+        'prerequisite_groups': encode_prerequisite_groups(prerequisites or []),
+    }
+    if not _is_missing(credits):
+        fields['credits'] = float(credits)
+    avg_grade = average_grade(avg_grades)
+    if avg_grade is not None:
+        fields['avg_grade'] = avg_grade
+    return fields
+
+
+def parse_course_metadata(metadata):
+    """
+    Read the typed view of one course's metadata (typed schema or legacy JSON strings).
+
+    Returns:
+        Dict with prerequisites (list of lists), avg_grades (dict), avg_grade
+        (float or None), has_exam (bool) and credits (float or None)
+    """
+    metadata = metadata or {}
+
+    # Each field falls back to its legacy form on its own, so partially typed
+    # sources (e.g. the ingest CSV) read correctly too
+    if 'prerequisite_groups' in metadata or 'prerequisites' not in metadata:
+        prerequisites = decode_prerequisite_groups(metadata.get('prerequisite_groups'))
+    else:
+        prerequisites = _json_field(metadata.get('prerequisites'), [])
+
+    if 'grade_semesters' in metadata or 'avg_grades' not in metadata:
+        avg_grades = dict(zip(metadata.get('grade_semesters') or [], metadata.get('grade_values') or []))
+    else:
+        avg_grades = _json_field(metadata.get('avg_grades'), {})
+
+    avg_grade = metadata.get('avg_grade')
+    if _is_missing(avg_grade):
+        avg_grade = average_grade(avg_grades)
+
+    if 'has_exam' in metadata:
+        has_exam = bool(metadata['has_exam'])
+    else:
+        has_exam = not _is_missing(metadata.get('moed_a'))
+
+    credits = metadata.get('credits')
+    return {
+        'prerequisites': [[str(c) for c in group] for group in prerequisites],
+        'avg_grades': {str(k): float(v) for k, v in avg_grades.items()},
+        'avg_grade': float(avg_grade) if avg_grade is not None else None,
+        'has_exam': has_exam,
+        'credits': None if _is_missing(credits) else float(credits),
+    }
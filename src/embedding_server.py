@@ -0,0 +1,376 @@
+"""
+Shared embedding inference server over a Unix socket.
+
+One process holds the embedding model; every Flask / gunicorn worker on the
+node sends its embed_query calls to it instead of loading its own copy. The
+server coalesces concurrent requests into micro-batches: the batcher takes
+whatever is queued, waits at most `max_wait_ms` for more, and encodes up to
+`max_batch` texts in one forward pass.
+
+    python -m src.embedding_server serve --socket /run/cheesespoon/embed.sock --max-batch 32 --max-wait-ms 5
+    python -m src.embedding_server stats --socket /run/cheesespoon/embed.sock
+
+Workers use it when EMBEDDING_SERVER_SOCKET is set (see src/embeddings.py).
+
+Wire format: every message is a 4-byte big-endian length and a payload. A
+request is one JSON frame ({"op": "embed", "model": ..., "texts": [...]} or
+{"op": "stats"}); an embed reply is a JSON header frame ({"count", "dim"})
+followed by the float32 vectors as one raw frame; errors are {"error": ...}.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import argparse
+import threading
+import socketserver
+from collections import Counter
+import numpy as np
+from src.config import load_env, configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 5
+DEFAULT_TIMEOUT = 30
+_HEADER = struct.Struct('>I')
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class EmbeddingServerError(RuntimeError):
+    """The embedding server could not be reached or rejected a request."""
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+def _send_frames(sock, *payloads):
+    sock.sendall(b''.join(_HEADER.pack(len(p)) + p for p in payloads))
+
+
+def _json_frame(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class _Pending:
+    __slots__ = ('texts', 'enqueued', 'done', 'vectors', 'error')
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.vectors = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent encode requests into batches for one model.
+
+    Args:
+        encode: Function from a list of texts to an (n, dim) float32 array
+        max_batch: Texts per batch (a single larger request is encoded alone)
+        max_wait_ms: How long the first queued request may wait for company
+    """
+
+    def __init__(self, encode, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'texts': 0, 'batches': 0, 'errors': 0, 'max_queue_depth': 0,
+                       'encode_seconds': 0.0, 'queue_wait_seconds': 0.0}
+        self._batch_sizes = Counter()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="embedding-batcher")
+        self._thread.start()
+
+    def submit(self, texts):
+        """Encode `texts` as part of the next batch; blocks until done."""
+        pending = _Pending(list(texts))
+        self._queue.put(pending)
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], depth)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vectors
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        count = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+        while count < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(pending)
+            count += len(pending.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for pending in batch for text in pending.texts]
+            start = time.perf_counter()
+            try:
+                vectors = np.asarray(self.encode(texts), dtype=np.float32)
+                offset = 0
+                for pending in batch:
+                    pending.vectors = vectors[offset:offset + len(pending.texts)]
+                    offset += len(pending.texts)
+            except Exception as e:
+                logger.exception("Encoding a batch of %d texts failed", len(texts))
+                for pending in batch:
+                    pending.error = e
+            end = time.perf_counter()
+
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['texts'] += len(texts)
+                self._stats['encode_seconds'] += end - start
+                self._stats['queue_wait_seconds'] += sum(start - p.enqueued for p in batch)
+                if batch[0].error is not None:
+                    self._stats['errors'] += len(batch)
+                self._batch_sizes[len(texts)] += 1
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+        batches = stats['batches'] or 1
+        stats.update({
+            'queue_depth': self._queue.qsize(),
+            'mean_batch_size': round(stats['texts'] / batches, 2),
+            'mean_encode_ms': round(stats['encode_seconds'] / batches * 1000, 2),
+            'mean_queue_wait_ms': round(stats['queue_wait_seconds'] / max(stats['requests'], 1) * 1000, 2),
+            'batch_sizes': batch_sizes,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        })
+        del stats['encode_seconds'], stats['queue_wait_seconds']
+        return stats
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection per client thread, kept open for many requests
+        while True:
+            try:
+                frame = _recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                try:
+                    request = json.loads(frame)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    # The frame was read whole, so the connection stays usable
+                    _send_frames(self.request, _json_frame({'error': "Malformed request frame"}))
+                    continue
+                self._dispatch(request)
+            except (ConnectionError, OSError):
+                return
+
+    def _dispatch(self, request):
+        server = self.server
+        op = request.get('op')
+        if op == 'stats':
+            _send_frames(self.request, _json_frame({**server.batcher.stats(), 'model': server.model_name,
+                                                    'pid': os.getpid()}))
+        elif op == 'embed':
+            if request.get('model') and request['model'] != server.model_name:
+                _send_frames(self.request, _json_frame(
+                    {'error': f"Server has model {server.model_name}, not {request['model']}"}))
+                return
+            try:
+                vectors = server.batcher.submit(request.get('texts') or [])
+            except Exception as e:
+                _send_frames(self.request, _json_frame({'error': f"Encoding failed: {e}"}))
+                return
+            header = {'count': int(vectors.shape[0]), 'dim': int(vectors.shape[1]) if vectors.ndim == 2 else 0}
+            _send_frames(self.request, _json_frame(header), np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        else:
+            _send_frames(self.request, _json_frame({'error': f"Unknown op {op!r}"}))
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server answering embed / stats requests through a MicroBatcher."""
+
+    daemon_threads = True
+    # Every worker thread connects on its first query; the default backlog of 5 refuses bursts
+    request_queue_size = 1024
+
+    def __init__(self, path, model_name, encode, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        if os.path.exists(path):
+            os.remove(path)  # stale socket of a previous run
+        self.model_name = model_name
+        self.batcher = MicroBatcher(encode, max_batch, max_wait_ms)
+        super().__init__(path, _Handler)
+
+
+def serve(path, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """Load the model once and serve it on `path` until interrupted."""
+    # The server encodes with its own model, never through another server
+    from src.embeddings import get_embedding_model, get_embedding_model_name, WARMUP_QUERY
+
+    model_name = get_embedding_model_name()
+    model = get_embedding_model(model_name)
+    model.encode([WARMUP_QUERY], convert_to_numpy=True, normalize_embeddings=True)
+
+    def encode(texts):
+        return model.encode(texts, batch_size=max_batch, convert_to_numpy=True, normalize_embeddings=True)
+
+    server = EmbeddingServer(path, model_name, encode, max_batch, max_wait_ms)
+    logger.info("Serving %s on %s (max batch %d, max wait %.1f ms)", model_name, path, max_batch, max_wait_ms)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class EmbeddingClient:
+    """
+    Client of an EmbeddingServer. Each thread keeps its own connection, so
+    concurrent requests of one worker reach the batcher together.
+    """
+
+    def __init__(self, path, timeout=DEFAULT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        # A forked worker must not share its parent's connection
+        if sock is not None and self._local.pid == os.getpid():
+            return sock
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _call(self, request, frames=1):
+        payload = _json_frame(request)
+        for attempt in range(2):
+            sent = False
+            try:
+                sock = self._connection()
+                _send_frames(sock, payload)
+                sent = True
+                try:
+                    header = json.loads(_recv_frame(sock))
+                    if not isinstance(header, dict):
+                        raise ValueError(f"Expected a JSON object, got {type(header).__name__}")
+                except ValueError as e:
+                    # Whatever follows can't be framed reliably: drop the connection
+                    self._close()
+                    raise EmbeddingServerError(f"Malformed reply from embedding server at {self.path}") from e
+                if 'error' in header:
+                    raise EmbeddingServerError(header['error'])
+                return header, [_recv_frame(sock) for _ in range(frames - 1)]
+            except OSError as e:
+                self._close()
+                # Retry only if the server never got the request (it restarted, or the socket
+                # is not there yet): a timeout or a failure after sending is not retried, so
+                # a slow batch is not queued twice
+                retry = not sent and not attempt and isinstance(e, (ConnectionError, FileNotFoundError))
+                if not retry:
+                    raise EmbeddingServerError(f"Embedding server at {self.path} unavailable: {e}") from e
+
+    def embed(self, texts, model_name=None):
+        """(len(texts), dim) float32 normalized embeddings of `texts` (prefixes included)."""
+        header, (data,) = self._call({'op': 'embed', 'model': model_name, 'texts': list(texts)}, frames=2)
+        return np.frombuffer(data, dtype=np.float32).reshape(header['count'], header['dim']).copy()
+
+    def stats(self):
+        header, _ = self._call({'op': 'stats'})
+        return header
+
+
+def get_embedding_client():
+    """Client of the server at EMBEDDING_SERVER_SOCKET, or None to encode in-process."""
+    global _client
+    load_env()
+    path = os.getenv("EMBEDDING_SERVER_SOCKET")
+    if not path:
+        return None
+    if _client is None or _client.path != path:
+        with _client_lock:
+            if _client is None or _client.path != path:
+                _client = EmbeddingClient(path, float(os.getenv("EMBEDDING_SERVER_TIMEOUT", DEFAULT_TIMEOUT)))
+    return _client
+
+
+def main(argv=None):
+    load_env()
+    parser = argparse.ArgumentParser(description="Shared embedding model server")
+    parser.add_argument("command", choices=["serve", "stats"])
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER_SOCKET"),
+                        help="Unix socket path (default: EMBEDDING_SERVER_SOCKET)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Texts per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Longest a request waits for others to share its batch")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if not args.socket:
+        parser.error("--socket or EMBEDDING_SERVER_SOCKET is required")
+    if args.command == "serve":
+        serve(args.socket, args.max_batch, args.max_wait_ms)
+    else:
+        print(json.dumps(EmbeddingClient(args.socket).stats(), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+import logging
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+import numpy as np
+from src.cache import LRUCache, SQLiteVectorStore
+from src.config import load_env
+from src.embedding_server import get_embedding_client
+
+logger = logging.getLogger(__name__)
+
+
+WARMUP_QUERY = "query: warmup"
+
+# Process-wide model registry: one SentenceTransformer per model name, shared by all Flask threads
+_models = {}
+_model_status = {}
+_registry_lock = threading.Lock()
+_device = None
+
+# Query embedding cache: in-memory LRU, optionally backed by a SQLite file shared across workers
+DEFAULT_EMBEDDING_CACHE_SIZE = 2048
+DEFAULT_EMBEDDING_CACHE_MAX_ROWS = 100_000
+_query_cache = None
+_query_store = None
+_query_cache_lock = threading.Lock()
+
+
+def get_device():
+    global _device
+    if _device is not None:
+        return _device
+
+    import torch
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if device == 'cuda':
+        logger.info("Using device: cuda (%s, %.2f GB)", torch.cuda.get_device_name(0),
+                    torch.cuda.get_device_properties(0).total_memory / 1e9)
+    else:
+        logger.info("Using device: cpu (no GPU detected)")
+    _device = device
+    return _device
+
+
+def _process_rss_mb():
+    """Current resident set size of this process in MB (None if unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak RSS in KB on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def _model_size_mb(model):
+    return round(sum(p.numel() * p.element_size() for p in model.parameters()) / 1e6, 1)
+
+
+def get_embedding_model_name():
+    load_env()
+    return os.getenv("EMBEDDING_MODEL")
+
+
+def get_embedding_model(model_name=None):
+    """
+    Return the process-wide embedding model, loading it on first use.
+
+    Safe to call from concurrent threads: the first caller loads the model while
+    the others wait on the registry lock, then everyone shares the same instance.
+    """
+    model_name = model_name or get_embedding_model_name()
+
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        # Another thread may have finished loading while we waited
+        model = _models.get(model_name)
+        if model is not None:
+            return model
+
+        device = get_device()
+        logger.info("Loading embedding model %s (large model, download may take a moment)", model_name)
+
+        # Heavy imports (torch, transformers) happen here, on first use, not at import time
+        from sentence_transformers import SentenceTransformer
+
+        rss_before = _process_rss_mb()
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name, device=device)
+        load_seconds = time.perf_counter() - start
+        embedding_dim = model.get_sentence_embedding_dimension()
+
+        _model_status[model_name] = {
+            'model': model_name,
+            'device': device,
+            'embedding_dim': embedding_dim,
+            'load_seconds': round(load_seconds, 3),
+            'parameters_mb': _model_size_mb(model),
+            'rss_before_mb': rss_before,
+            'rss_after_mb': _process_rss_mb(),
+            'loaded_at': time.time(),
+            'warmup_seconds': None,
+        }
+        _models[model_name] = model
+
+        logger.info("Model loaded in %.1fs, embedding dimension %d", load_seconds, embedding_dim)
+
+    return model
+
+
+def warmup_embedding_model(model_name=None):
+    """
+    Load the model (if needed) and run one encode so the first real request
+    doesn't pay for lazy kernel/tokenizer initialisation.
+    """
+    model_name = model_name or get_embedding_model_name()
+    client = get_embedding_client()
+    if client is not None:
+        # The shared server holds the model: only check that it answers
+        start = time.perf_counter()
+        client.embed([WARMUP_QUERY], model_name)
+        logger.info("Embedding server %s answered in %.2fs", client.path, time.perf_counter() - start)
+        return None
+    model = get_embedding_model(model_name)
+
+    start = time.perf_counter()
+    model.encode(WARMUP_QUERY, convert_to_numpy=True, normalize_embeddings=True)
+    warmup_seconds = time.perf_counter() - start
+
+    with _registry_lock:
+        _model_status[model_name]['warmup_seconds'] = round(warmup_seconds, 3)
+    logger.info("Embedding model warmed up in %.2fs", warmup_seconds)
+    return model
+
+
+def get_embedding_model_status():
+    """Snapshot of the registry for the status endpoint."""
+    with _registry_lock:
+        models = [dict(status) for status in _model_status.values()]
+    client = get_embedding_client()
+    server = None
+    if client is not None:
+        try:
+            server = client.stats()
+        except Exception as e:
+            server = {'socket': client.path, 'error': str(e)}
+    return {
+        'loaded_models': models,
+        'process_rss_mb': _process_rss_mb(),
+        'server': server,
+    }
+
+
+def normalize_query(query):
+    """Canonical form of a query for caching: NFC, trimmed, single spaces."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", str(query))).strip()
+
+
+def _get_query_cache():
+    global _query_cache, _query_store
+    if _query_cache is not None:
+        return _query_cache, _query_store
+
+    with _query_cache_lock:
+        if _query_cache is None:
+            load_env()
+            cache_path = os.getenv("EMBEDDING_CACHE_PATH")
+            if cache_path:
+                max_age_days = os.getenv("EMBEDDING_CACHE_MAX_AGE_DAYS")
+                try:
+                    _query_store = SQLiteVectorStore(
+                        cache_path,
+                        max_rows=int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", DEFAULT_EMBEDDING_CACHE_MAX_ROWS)),
+                        max_age=float(max_age_days) * 86400 if max_age_days else None,
+                    )
+                    logger.info("Persistent query embedding cache: %s", cache_path)
+                except sqlite3.Error as exc:
+                    logger.warning("Persistent query embedding cache disabled (%s): %s", cache_path, exc)
+            maxsize = int(os.getenv("EMBEDDING_CACHE_SIZE", DEFAULT_EMBEDDING_CACHE_SIZE))
+            _query_cache = LRUCache(maxsize=maxsize, name="query_embeddings")
+    return _query_cache, _query_store
+
+
+def get_embedding_cache_stats():
+    cache, store = _get_query_cache()
+    return {
+        'memory': cache.stats(),
+        'persistent': store.stats() if store is not None else None,
+    }
+
+
+def _encode_query(model_name, query):
+    # E5 models require "query: " prefix for search queries
+    prefixed_query = f"query: {query}"
+
+    client = get_embedding_client()
+    if client is not None:
+        return client.embed([prefixed_query], model_name)[0]
+
+    model = get_embedding_model(model_name)
+
+    # Generate embedding
+    return model.encode(
+        prefixed_query,
+        convert_to_numpy=True,
+        normalize_embeddings=True  # Recommended for similarity search
+    ).astype(np.float32)
+
+
+def embed_query(query):
+    """
+    Embed a search query, going through the (model, normalized query) cache.
+
+    Lookup order: in-memory LRU -> persistent SQLite tier (if EMBEDDING_CACHE_PATH
+    is set) -> the model itself, or the shared embedding server if
+    EMBEDDING_SERVER_SOCKET is set.
+    """
+    model_name = get_embedding_model_name()
+    query = normalize_query(query)
+    key = (model_name, query)
+    cache, store = _get_query_cache()
+
+    embedding = cache.get(key)
+    if embedding is None and store is not None:
+        embedding = store.get(model_name, query)
+        if embedding is not None:
+            cache.set(key, embedding)
+    if embedding is None:
+        embedding = _encode_query(model_name, query)
+        cache.set(key, embedding)
+        if store is not None:
+            store.set(model_name, query, embedding)
+
+    # Convert to list for Pinecone
+    return embedding.tolist()
+
+
+def cache_query_embedding(query, embedding):
+    """Store a precomputed embedding of `query` in the in-memory cache (e.g. for offline benchmarks)."""
+    cache, _ = _get_query_cache()
+    cache.set((get_embedding_model_name(), normalize_query(query)), np.asarray(embedding, dtype=np.float32))
+
+
+def embed_queries(queries, batch_size=64):
+    """
+    Embed many search queries at once.
+
+    Cached queries are served from the cache; the rest are deduplicated and
+    encoded in batches of `batch_size`.
+
+    Returns:
+        (len(queries), dim) float32 array of normalized embeddings
+    """
+    model_name = get_embedding_model_name()
+    queries = [normalize_query(q) for q in queries]
+    cache, store = _get_query_cache()
+
+    embeddings = {}
+    for query in set(queries):
+        embedding = cache.get((model_name, query))
+        if embedding is None and store is not None:
+            embedding = store.get(model_name, query)
+            if embedding is not None:
+                cache.set((model_name, query), embedding)
+        if embedding is not None:
+            embeddings[query] = embedding
+
+    missing = [q for q in dict.fromkeys(queries) if q not in embeddings]
+    if missing:
+        client = get_embedding_client()
+        if client is not None:
+            encoded = client.embed([f"query: {q}" for q in missing], model_name)
+        else:
+            encoded = get_embedding_model(model_name).encode(
+                [f"query: {q}" for q in missing],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            ).astype(np.float32)
+        for query, embedding in zip(missing, encoded):
+            embeddings[query] = embedding
+            cache.set((model_name, query), embedding)
+        if store is not None:
+            store.set_many(model_name, zip(missing, encoded))
+
+    return np.stack([embeddings[q] for q in queries]) if queries else np.zeros((0, 0), dtype=np.float32)
@@ -1,60 +1,40 @@
-import os
-from dotenv import load_dotenv
-from pinecone import Pinecone
-import numpy as np
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-import torch
 import json
+import logging
+import asyncio
+import hashlib
+import numpy as np
+from src.embeddings import embed_query, normalize_query
+from src.cache import LRUCache
+from src.vector_store import LocalVectorIndex
+from src.connections import get_index, get_index_dimension
+from src.catalog import CATALOG_REFRESH_SECONDS, get_semester_catalog, get_semester_version
+from src.course_metadata import DEFAULT_AVG_GRADE
+from src.rerank import weight_vector, combined_scores, top_n_order
+from src.timing import StageTimings, run_blocking, span
+from src.lexical import search_lexical, lexical_matches, lexical_weight
 # from google import genai
 
+logger = logging.getLogger(__name__)
 
-DEFAULT_AVG_GRADE = 60
+# Retrieval results (eligible courses + semantic scores) reused across weight changes.
+# The TTL bounds staleness against a live Pinecone index; snapshots are keyed by version.
+CANDIDATE_CACHE_SIZE = 256
+CANDIDATE_CACHE_TTL = 600
+_candidate_cache = LRUCache(maxsize=CANDIDATE_CACHE_SIZE, ttl=CANDIDATE_CACHE_TTL, name="candidate_sets")
 
-def get_pinecone():
-    # 1. Load variables from the .env file
-    load_dotenv()
+# Final ranked results, shared by every student with the same profile and parameters
+RESULT_CACHE_SIZE = 1024
+RESULT_CACHE_TTL = 300
+_result_cache = LRUCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, name="recommendations")
 
-    # 2. Get the key securely
-    api_key = os.getenv("PINECONE_API_KEY")
+# Text-heavy metadata fetched for displayed courses only (Pinecone backend)
+FETCH_BATCH_SIZE = 100
+_course_metadata_cache = LRUCache(maxsize=4096, ttl=CATALOG_REFRESH_SECONDS, name="course_metadata")
 
-    if not api_key:
-        raise ValueError("No API key found. Please check your .env file.")
 
-    # 3. Initialize Pinecone
-    pc = Pinecone(api_key=api_key)
-    return pc
 def get_index_by_semester(semester_name):
-    pc = get_pinecone()
-    kb_name = os.getenv(semester_name)
-    if not kb_name:
-        raise ValueError("No API key found. Please check your .env file.")
-    index = pc.Index(host=kb_name)
-    return index
-
-def get_device():
-    device = 'cuda' if torch.cuda.is_available() else 'cpu'
-    print(f"Using device: {device}")
-    if device == 'cuda':
-        print(f"   GPU: {torch.cuda.get_device_name(0)}")
-        print(f"   Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB")
-    else:
-        print("No GPU detected. Consider enabling GPU in Runtime -> Change runtime type")
-    return device
-def get_embedding_model():
-    MODEL_NAME = os.getenv("EMBEDDING_MODEL")
-    device = get_device()
-
-    print(f"📥 Loading embedding model: {MODEL_NAME}")
-    print("   Note: This is a large model (~2.24GB), download may take a moment...")
-
-    _embedding_model = SentenceTransformer(MODEL_NAME, device=device)
-    embedding_dim = _embedding_model.get_sentence_embedding_dimension()
-
-    print(f"✅ Model loaded. Embedding dimension: {embedding_dim}")
-
-
-    return _embedding_model
+    # Shared handle (or the local snapshot index), see src/connections.py
+    return get_index(semester_name)
 
 # def embed_query(query):
 #     model_name = os.getenv("EMBEDDING_MODEL")
@@ -66,116 +46,34 @@ def get_embedding_model():
 #     )
 #
 #     return embedd_query.embeddings[0].values
-def embed_query(query):
-    model = get_embedding_model()
-
-
-    # E5 models require "query: " prefix for search queries
-    prefixed_query = f"query: {query}"
-
-    # Generate embedding
-    embedding = model.encode(
-        prefixed_query,
-        convert_to_numpy=True,
-        normalize_embeddings=True  # Recommended for similarity search
-    )
-
-    # Convert to list for Pinecone
-    return embedding.tolist()
-def check_prerequisites(courses_list,prerequisites):
-    if len(prerequisites) == 0:
-        return True
-    # Convert to set for O(1) lookup
-    completed_set = set(courses_list)
-
-    # Check each prerequisite combination
-    for combo in prerequisites:
-        # Check if ALL courses in this combo are completed
-        if all(course in completed_set for course in combo):
-            return True  # Found a satisfied combo!
-
-    return False  # No combo was satisfied
-def filter_according_to_requirements_and_untaken_and_prereq(response,courses_list,no_exam,min_credits):
-    # 3. Filter Locally in Python
-    # Convert list to set for super-fast lookups (O(1) speed)
-    excluded_set = set(courses_list)
-    print(f"[DEBUG] Excluded set: {excluded_set}")
-    filtered_courses = []
-
-    for match in response.matches:
-        # print(f'ID: {match.id}, title: {match["metadata"]["title"]} | pre : {json.loads(match["metadata"]["prerequisites"])} len pre {len(json.loads(match["metadata"]["prerequisites"]))}')
-        prereq= json.loads(match["metadata"]["prerequisites"])
-
-        can_take_it = check_prerequisites(courses_list,prereq)
-        # Check if already taken
-        if str(match.id) in excluded_set:
-            print(f'[DEBUG] EXCLUDED: {match.id} (normalized: {match.id})')
-            continue
-        elif can_take_it:
-            # match.id is the Course ID (assuming you used it as the vector ID)
-            if no_exam == True and match["metadata"]["moed_a"] != "":
-                continue
-            if min_credits > match["metadata"]["credits"]:
-                continue
-
-
-
-
-
-            grades_dict=json.loads(match["metadata"]["avg_grades"])
+def get_knowledgebase(semester_name,user_query="",only_ids_titles=False,include_metadata=True):
+    import pandas as pd
 
-            if len(grades_dict)>0:
-                average = sum(grades_dict.values()) / len(grades_dict)
-            else:
-                average=DEFAULT_AVG_GRADE
-
-            # Prepare the data object
-
-            course_data = match.metadata
-            course_data['ID'] = match.id
-            course_data["semantic_score"] = match.score
-            course_data["avg_grade_all_sem"] = average
-
-            filtered_courses.append(course_data)
-        else:
-            print(f'Cannot take {match["id"]}')
-    return filtered_courses
-
-def get_knowledgebase(semester_name,user_query="",only_ids_titles=False):
     # Get index
-    print(f"[DEBUG] Getting index for semester: {semester_name}")
     index = get_index_by_semester(semester_name=semester_name)
-    print(f"[DEBUG] Index obtained successfully")
-
-    # Get index dimensions
-    print(f"[DEBUG] Describing index stats...")
-    stats = index.describe_index_stats()
-    print(f"[DEBUG] Index stats: {stats}")
 
     # Create query vector
     if user_query == "":
-        print(f"[DEBUG] Creating dummy vector of dimension {stats['dimension']}")
-        embedded_query = [0.0] * stats['dimension']
+        dimension = get_index_dimension(semester_name)
+        logger.debug("Creating dummy vector of dimension %d", dimension)
+        embedded_query = [0.0] * dimension
     else:
-        print(f"[DEBUG] Embedding query: '{user_query}'")
-        embedded_query = embed_query(user_query)
-        print(
-            f"[DEBUG] Embedded query shape: {embedded_query.shape if hasattr(embedded_query, 'shape') else len(embedded_query)}")
+        logger.debug("Embedding query: %r", user_query)
+        with span("embed"):
+            embedded_query = embed_query(user_query)
         # Convert numpy array to list if needed
         if hasattr(embedded_query, 'tolist'):
             embedded_query = embedded_query.tolist()
 
-    print(f"[DEBUG] Embedded query dimension: {len(embedded_query)}")
-
     # Query Pinecone
-    print(f"[DEBUG] Querying Pinecone with top_k=10000...")
     try:
-        response = index.query(
-            vector=embedded_query,
-            top_k=10000,
-            include_metadata=True,
-            timeout=30  # Add timeout
-        )
+        with span("query"):
+            response = index.query(
+                vector=embedded_query,
+                top_k=10000,
+                include_metadata=include_metadata or only_ids_titles,
+                timeout=30  # Add timeout
+            )
         if only_ids_titles:
             df = pd.DataFrame(
                 [
@@ -188,107 +86,255 @@ def get_knowledgebase(semester_name,user_query="",only_ids_titles=False):
             )
             return df
 
-        print(f"[DEBUG] Query successful! Got {len(response.matches)} matches")
-    except Exception as query_error:
-        print(f"[ERROR] Pinecone query failed: {query_error}")
-        print(f"[ERROR] Query error type: {type(query_error)}")
+        logger.debug("Query returned %d matches", len(response.matches))
+    except Exception:
+        logger.exception("Pinecone query failed")
         raise
     return response
-def get_all_untaken_courses_with_requirements(semester_name="WINTER_2025_2026", courses_list=[], no_exam=False,
-                                              min_credits=0, user_query=""):
-    print(f"[DEBUG] Starting query with: user_query='{user_query}'")
+class CandidateSet:
+    """
+    Output of the retrieval stage: catalog rows of the eligible courses,
+    their semantic scores and, for hybrid queries, their keyword relevance.
+    Compact (no text fields) and independent of the weights, so it can be
+    reused for every weight change.
+    """
 
+    def __init__(self, semester_name, catalog, rows, semantic_scores, lexical_scores=None):
+        self.semester_name = semester_name
+        self.catalog = catalog
+        self.rows = rows
+        self.semantic_scores = semantic_scores
+        self.lexical_scores = lexical_scores
+        self.features = catalog.features[rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def candidate_set_key(semester_name, courses_list, no_exam, min_credits, user_query):
+    """Cache key of a candidate set: everything retrieval depends on, but not the weights."""
+    return (
+        semester_name,
+        get_semester_version(semester_name),
+        tuple(sorted(set(str(c) for c in courses_list))),
+        bool(no_exam),
+        float(min_credits or 0),
+        normalize_query(user_query or ""),
+    )
 
-    try:
-        response = get_knowledgebase(semester_name,user_query)
-        # Filter results
-        print(f"[DEBUG] Filtering results...")
-        filtered_courses = filter_according_to_requirements_and_untaken_and_prereq(
-            response, courses_list, no_exam, min_credits
-        )
-        print(f"[DEBUG] Filtered to {len(filtered_courses)} courses")
 
-        # Convert to DataFrame
-        filtered_courses = pd.DataFrame(filtered_courses)
-        print(f"[DEBUG] Returning DataFrame with shape: {filtered_courses.shape}")
+def get_candidate_set(semester_name="WINTER_2025_2026", courses_list=[], no_exam=False, min_credits=0, user_query=""):
+    """
+    Stage 1 - embed, query the index for IDs and scores only, and filter
+    eligible courses on the catalog's compact columns. Queries with keyword
+    matches also get each course's BM25 relevance as a separate rerank term
+    (src/lexical.py), and confident lexical matches skip the embedding model.
 
-        return filtered_courses
+    Cached per (semester, completed set, filters, query), so weight-only changes
+    skip embedding, retrieval and filtering entirely.
+    """
+    key = candidate_set_key(semester_name, courses_list, no_exam, min_credits, user_query)
+    candidates = _candidate_cache.get(key)
+    if candidates is not None:
+        logger.debug("Candidate set cache hit (%d courses)", len(candidates))
+        return candidates
+
+    with span("lexical"):
+        lexical = search_lexical(semester_name, user_query)
+    if lexical is not None and lexical.confident:
+        logger.debug("Lexical match (%d courses), skipping the embedding model", len(lexical))
+        matches = lexical_matches(lexical)
+    else:
+        matches = get_knowledgebase(semester_name, user_query, include_metadata=False).matches
+    with span("filter"):
+        candidates = _build_candidate_set(semester_name, matches, courses_list, no_exam, min_credits, lexical)
+    _candidate_cache.set(key, candidates)
+    return candidates
 
-    except Exception as e:
-        print(f"[ERROR] Exception in get_all_untaken_courses_with_requirements: {e}")
-        print(f"[ERROR] Exception type: {type(e)}")
-        import traceback
-        traceback.print_exc()
-        raise
 
-def rerank(df,semantic_weight=0.2,credits_weight=0.2,avg_grade_weight=0.2,workload_rating_weight=0.2,general_rating_weight=0.2):
-
-    if df.empty:
-        return df
-
-    max_credits = df["credits"].max()
-    # Create a copy to avoid modifying original
-    df_ranked = df.copy()
-    df_ranked['workload_rating'] = df_ranked['workload_rating'].fillna(2.5)  # Neutral rating
-    df_ranked['general_rating'] = df_ranked['general_rating'].fillna(2.5)  # Neutral rating
-    df_ranked['credits'] = df_ranked['credits'].fillna(0)
-    df_ranked['avg_grade_all_sem'] = df_ranked['avg_grade_all_sem'].fillna(DEFAULT_AVG_GRADE)
-    df_ranked['semantic_score'] = df_ranked['semantic_score'].fillna(0)
-    # Normalize semantic score (assuming it's already 0-1 from Pinecone)
-    # If score doesn't exist (no semantic search), default to 0
-    semantic_score = df_ranked["semantic_score"]
-
-    # Normalize credits (divide by max)
-    max_credits = df_ranked['credits'].max()
-    if max_credits > 0:
-        credits_normalized = df_ranked['credits'] / max_credits
-    else:
-        credits_normalized = 0
+def _build_candidate_set(semester_name, matches, courses_list, no_exam, min_credits, lexical=None):
+    catalog = get_semester_catalog(semester_name, matches, index=get_index_by_semester(semester_name))
 
-    # Normalize avg_grade (divide by 100)
-    avg_grade_normalized = df_ranked['avg_grade_all_sem'] / 100
+    matches = [m for m in matches if str(m.id) in catalog.row_of]
+    rows = catalog.rows_for(m.id for m in matches)
+    scores = np.fromiter((m.score for m in matches), dtype=np.float32, count=len(matches))
+    mask = catalog.eligible_mask(rows, courses_list, no_exam, min_credits)
+    logger.debug("%d of %d courses are eligible", int(mask.sum()), len(rows))
 
-    # Normalize workload_rating (divide by 5)
-    workload_normalized = df_ranked['workload_rating'] / 5
+    # A confident lexical result already is the semantic score; otherwise BM25 is its own term
+    lexical_scores = None
+    if lexical is not None and not lexical.confident:
+        lexical_scores = lexical.by_row(lexical.relevance(), catalog.row_of, len(catalog))[rows[mask]]
+    return CandidateSet(semester_name, catalog, rows[mask], scores[mask], lexical_scores)
 
-    # Normalize general_rating (divide by 5)
-    general_rating_normalized = df_ranked['general_rating'] / 5
-    print('SEMANTIC SCORE')
 
-    # Calculate combined score
-    df_ranked['combined_score'] = (
-            semantic_weight * semantic_score +
-            credits_weight * credits_normalized +
-            avg_grade_weight * avg_grade_normalized +
-            workload_rating_weight * workload_normalized +
-            general_rating_weight * general_rating_normalized
-    )
+def fetch_course_metadata(semester_name, course_ids):
+    """
+    Full metadata (including description / reviews text) for just these courses.
+
+    Local snapshots read the rows directly; Pinecone is fetched in batches and
+    cached, so heavy text crosses the network only for displayed courses.
+    """
+    index = get_index_by_semester(semester_name)
+    if isinstance(index, LocalVectorIndex):
+        return index.metadata_for(course_ids)
+
+    metadata = {}
+    missing = []
+    for course_id in course_ids:
+        cached = _course_metadata_cache.get((semester_name, course_id))
+        if cached is None:
+            missing.append(course_id)
+        else:
+            metadata[course_id] = dict(cached)
+
+    for start in range(0, len(missing), FETCH_BATCH_SIZE):
+        response = index.fetch(ids=missing[start:start + FETCH_BATCH_SIZE])
+        for course_id, vector in response.vectors.items():
+            _course_metadata_cache.set((semester_name, course_id), dict(vector.metadata or {}))
+            metadata[course_id] = dict(vector.metadata or {})
+    return metadata
+
+
+def hydrate_courses(candidates, order, combined):
+    """Stage 3 - build the result DataFrame for the selected candidates only."""
+    import pandas as pd
+
+    catalog = candidates.catalog
+    rows = candidates.rows[order]
+    course_ids = [catalog.ids[row] for row in rows]
+    metadata = fetch_course_metadata(candidates.semester_name, course_ids)
+
+    lexical = candidates.lexical_scores[order] if candidates.lexical_scores is not None else None
+
+    courses = []
+    for i, (course_id, row, semantic_score, combined_score) in enumerate(
+            zip(course_ids, rows, candidates.semantic_scores[order], combined)):
+        course_data = metadata.get(course_id, {})
+        course_data['ID'] = course_id
+        course_data["semantic_score"] = float(semantic_score)
+        if lexical is not None:
+            course_data["lexical_score"] = float(lexical[i])
+        course_data["avg_grade_all_sem"] = float(catalog.avg_grade[row])
+        course_data["combined_score"] = float(combined_score)
+        courses.append(course_data)
+    return pd.DataFrame(courses)
+
+
+def rank_candidate_set(candidates,semantic_weight=0.2,credits_weight=0.2,avg_grade_weight=0.2,workload_rating_weight=0.2,general_rating_weight=0.2,top_n=None,max_credits=None):
+    """
+    Stage 2 - weight rerank of a candidate set (no I/O), then fetch the
+    metadata of the top_n courses only. max_credits overrides the credits
+    normalizer (the candidates' own max) when several sets are merged.
+    """
+    import pandas as pd
+
+    if len(candidates) == 0:
+        ranked = pd.DataFrame()
+        ranked.attrs['eligible_count'] = 0
+        return ranked
+
+    weights = weight_vector(credits_weight, avg_grade_weight, workload_rating_weight, general_rating_weight)
+    scores = combined_scores(candidates.features, candidates.semantic_scores, semantic_weight, weights, max_credits)
+    if candidates.lexical_scores is not None:
+        scores = scores + np.float32(lexical_weight()) * candidates.lexical_scores
+    order = top_n_order(scores, top_n)
+    with span("hydrate"):
+        ranked = hydrate_courses(candidates, order, scores[order])
+    ranked.attrs['eligible_count'] = len(candidates)
+    return ranked
 
-    # Sort by combined score (descending - higher is better)
-    df_ranked = df_ranked.sort_values('combined_score', ascending=False).reset_index(drop=True)
 
-    return df_ranked
-def recommend_courses(semester_name="WINTER_2025_2026",courses_list=[],no_exam=False,min_credits=0,user_query="",semantic_weight=0.2,credits_weight=0.2,avg_grade_weight=0.2,workload_rating_weight=0.2,general_rating_weight=0.2):
-    print(f'User query {user_query}')
-    print(f'Before rerank')
-    print(f'Courses: {len(courses_list)}')
-    print(f'courses {courses_list}')
-    filtered_courses = get_all_untaken_courses_with_requirements(semester_name,courses_list,no_exam,min_credits,user_query)
+def recommendation_cache_key(semester_name, courses_list, no_exam, min_credits, user_query, weights, top_n=None):
+    """
+    Canonical hash of a recommendation request. Completed courses are sorted and
+    de-duplicated and the query normalized, so equivalent profiles share an entry;
+    the semester version is included so a new snapshot invalidates old results.
+    """
+    canonical = {
+        'semester': semester_name,
+        'version': get_semester_version(semester_name),
+        'completed': sorted(set(str(c) for c in courses_list)),
+        'no_exam': bool(no_exam),
+        'min_credits': float(min_credits or 0),
+        'query': normalize_query(user_query or ""),
+        'weights': [round(float(w), 6) for w in weights],
+        'top_n': top_n,
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def get_recommendation_cache_stats():
+    return {
+        'candidate_sets': _candidate_cache.stats(),
+        'results': _result_cache.stats(),
+        'course_metadata': _course_metadata_cache.stats(),
+    }
+
+
+def recommend_courses(semester_name="WINTER_2025_2026",courses_list=[],no_exam=False,min_credits=0,user_query="",semantic_weight=0.2,credits_weight=0.2,avg_grade_weight=0.2,workload_rating_weight=0.2,general_rating_weight=0.2,top_n=None):
+    """
+    Ranked recommendations for one student.
 
-    # print(filtered_courses.head(10)[['title','avg_grade_all_sem',"prerequisites"]])
+    Results are cached (LRU + TTL) by recommendation_cache_key, so the returned
+    DataFrame may be shared with other callers - treat it as read-only.
+    """
+    logger.debug("Recommending for query %r with %d completed courses", user_query, len(courses_list))
+    weights = (semantic_weight,credits_weight,avg_grade_weight,workload_rating_weight,general_rating_weight)
+    key = recommendation_cache_key(semester_name,courses_list,no_exam,min_credits,user_query,weights,top_n)
+    reranked_courses = _result_cache.get(key)
+    if reranked_courses is not None:
+        logger.debug("Recommendation cache hit")
+        return reranked_courses
+
+    candidates = get_candidate_set(semester_name,courses_list,no_exam,min_credits,user_query)
 
-    reranked_courses = rerank(filtered_courses,semantic_weight,credits_weight,avg_grade_weight,workload_rating_weight,general_rating_weight)
+    with span("rank"):
+        reranked_courses = rank_candidate_set(candidates,*weights,top_n=top_n)
+    _result_cache.set(key, reranked_courses)
 
     # print(reranked_courses.head(10)[['title','avg_grade_all_sem',"prerequisites"]])
     return reranked_courses
-# recommend_courses(courses_list=['00960210'])
-# print(recommend_courses(courses_list=['00960210'])['description'])
-results = recommend_courses(courses_list=['00960210'])
 
-print("\n--- RECOMMENDED COURSE DESCRIPTIONS ---\n")
-for desc in results['description']:
-    print(desc)
-    print("-" * 30) # Visual separator between courses
+
+def get_similar_courses(course_id, semester_name="WINTER_2025_2026", completed=(), top_n=3):
+    """
+    Nearest courses to `course_id` from the precomputed similarity graph that
+    the student can take: not completed and prerequisites satisfied by
+    `completed` plus this course.
+
+    Returns:
+        List of course dicts (metadata + 'ID' and 'similarity'), best first,
+        or None when the semester has no similarity graph.
+    """
+    try:
+        catalog = get_semester_catalog(semester_name, index=get_index_by_semester(semester_name))
+    except Exception as e:
+        logger.error("Failed to load catalog for %s: %s", semester_name, e)
+        return None
+    if catalog.neighbors is None:
+        return None
+
+    row = catalog.row_of.get(str(course_id))
+    if row is None:
+        return []
+
+    taken = {str(c) for c in completed} | {str(course_id)}
+    neighbors = np.asarray(catalog.neighbors[row], dtype=np.int64)
+    positions = np.array([p for p, r in enumerate(neighbors) if r >= 0 and catalog.ids[r] not in taken], dtype=np.int64)
+    positions = positions[catalog.prerequisites.eligible_rows(list(taken), neighbors[positions])][:top_n]
+
+    ids = [catalog.ids[r] for r in neighbors[positions]]
+    metadata = fetch_course_metadata(semester_name, ids)
+    similar = []
+    for position, neighbor_id in zip(positions, ids):
+        course = metadata.get(neighbor_id, {})
+        course['ID'] = neighbor_id
+        if catalog.neighbor_scores is not None:
+            course['similarity'] = float(catalog.neighbor_scores[row, position])
+        similar.append(course)
+    return similar
+
 
 def get_course_by_id(course_id, semester_name="WINTER_2025_2026"):
     """
@@ -308,5 +354,121 @@ def get_course_by_id(course_id, semester_name="WINTER_2025_2026"):
         else:
             return None
     except Exception as e:
-        print(f"[ERROR] Failed to fetch course {course_id}: {e}")
-        return None
\ No newline at end of file
+        logger.error("Failed to fetch course %s: %s", course_id, e)
+        return None
+
+
+# ---------------------------------------------------------------------------
+# asyncio counterparts: blocking calls run in the shared thread pool, and
+# independent stages (query embedding / index + catalog setup) overlap.
+# Pass a StageTimings to collect per-stage wall times.
+# ---------------------------------------------------------------------------
+
+def _prepare_semester(semester_name):
+    """Open the index handle and make sure the semester catalog is compiled."""
+    index = get_index_by_semester(semester_name)
+    get_semester_catalog(semester_name, index=index)
+    return index
+
+
+def _query_vector(semester_name, user_query):
+    if user_query == "":
+        return [0.0] * get_index_dimension(semester_name)
+    return embed_query(user_query)
+
+
+async def get_candidate_set_async(semester_name="WINTER_2025_2026", courses_list=[], no_exam=False, min_credits=0,
+                                  user_query="", timings=None):
+    """Async get_candidate_set: embeds the query while the index and catalog are set up."""
+    timings = timings if timings is not None else StageTimings()
+    key = candidate_set_key(semester_name, courses_list, no_exam, min_credits, user_query)
+    candidates = _candidate_cache.get(key)
+    if candidates is not None:
+        logger.debug("Candidate set cache hit (%d courses)", len(candidates))
+        return candidates
+
+    lexical = await timings.measure("lexical", run_blocking(search_lexical, semester_name, user_query))
+    if lexical is not None and lexical.confident:
+        await timings.measure("connect", run_blocking(_prepare_semester, semester_name))
+        matches = lexical_matches(lexical)
+    else:
+        index, vector = await asyncio.gather(
+            timings.measure("connect", run_blocking(_prepare_semester, semester_name)),
+            timings.measure("embed", run_blocking(_query_vector, semester_name, user_query)),
+        )
+        response = await timings.measure(
+            "query", run_blocking(index.query, vector=vector, top_k=10000, include_metadata=False, timeout=30)
+        )
+        matches = response.matches
+    with timings.stage("filter"):
+        candidates = _build_candidate_set(semester_name, matches, courses_list, no_exam, min_credits, lexical)
+    _candidate_cache.set(key, candidates)
+    return candidates
+
+
+async def recommend_courses_async(semester_name="WINTER_2025_2026",courses_list=[],no_exam=False,min_credits=0,user_query="",semantic_weight=0.2,credits_weight=0.2,avg_grade_weight=0.2,workload_rating_weight=0.2,general_rating_weight=0.2,top_n=None,timings=None):
+    """
+    Async recommend_courses (same results, same caches).
+
+    Args:
+        timings: Optional StageTimings filled with lexical / connect / embed /
+            query / filter / rank stage times
+    """
+    timings = timings if timings is not None else StageTimings()
+    weights = (semantic_weight,credits_weight,avg_grade_weight,workload_rating_weight,general_rating_weight)
+    key = recommendation_cache_key(semester_name,courses_list,no_exam,min_credits,user_query,weights,top_n)
+    reranked_courses = _result_cache.get(key)
+    if reranked_courses is not None:
+        logger.debug("Recommendation cache hit")
+        return reranked_courses
+
+    candidates = await get_candidate_set_async(semester_name,courses_list,no_exam,min_credits,user_query,timings)
+    reranked_courses = await timings.measure(
+        "rank", run_blocking(rank_candidate_set, candidates, *weights, top_n=top_n)
+    )
+    _result_cache.set(key, reranked_courses)
+    return reranked_courses
+
+
+async def get_course_by_id_async(course_id, semester_name="WINTER_2025_2026"):
+    return await run_blocking(get_course_by_id, course_id, semester_name)
+
+
+async def get_course_with_alternatives_async(course_id, semester_name="WINTER_2025_2026", top_n=3, completed=(),
+                                             timings=None):
+    """
+    Course page lookups: the course's metadata and its similar courses are
+    fetched concurrently. Alternatives come from the precomputed neighbour
+    graph; semesters ingested without one fall back to ranking the catalog by
+    the course title once the metadata arrives.
+
+    Returns:
+        (metadata or None, list of alternative course dicts)
+    """
+    timings = timings if timings is not None else StageTimings()
+    course, alternatives = await asyncio.gather(
+        timings.measure("course", get_course_by_id_async(course_id, semester_name)),
+        timings.measure("similar", run_blocking(get_similar_courses, course_id, semester_name, completed, top_n)),
+    )
+    if course is None:
+        return None, []
+    if alternatives is not None:
+        return course, alternatives
+
+    try:
+        alternatives = await recommend_courses_async(
+            semester_name=semester_name,
+            courses_list=[course_id],  # Exclude current course
+            user_query=course.get('title', ''),  # Search by title
+            semantic_weight=0.9,  # High weight on semantic match
+            credits_weight=0,
+            avg_grade_weight=0.1,
+            workload_rating_weight=0,
+            general_rating_weight=0,
+            top_n=top_n,
+            timings=timings,
+        )
+    except Exception as e:
+        logger.error("Error fetching alternatives: %s", e)
+        return course, []
+    return course, alternatives.to_dict('records') if not alternatives.empty else []
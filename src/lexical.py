@@ -0,0 +1,274 @@
+"""
+Lexical (BM25) search over course text, and how it is combined with dense retrieval.
+
+Short queries - a course number, a lecturer's name, a specific term such as
+"פייתון" - are answered by an inverted index over each course's title,
+description and reviews. When the lexical result is confident (every query
+term is known and only a few courses match), the query skips the embedding
+model. Otherwise BM25 becomes its own rerank term: the dense cosine stays the
+semantic score (so semantic_weight keeps its meaning), and each course adds
+HYBRID_LEXICAL_WEIGHT times its keyword relevance - the BM25 score as a
+fraction of the best score the query's terms could reach, so a match on a
+rare, specific term counts and a match on a common word barely does.
+HYBRID_SEARCH=0 turns lexical search off.
+
+Tokenization is Hebrew-aware: niqqud and geresh/gershayim are stripped, final
+letters are normalised, and single-letter prefixes (ו ה ב ל מ ש כ) are indexed
+both with and without the prefix. 6-digit course numbers are indexed in their
+8-digit form.
+"""
+import logging
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import Counter
+import numpy as np
+from src.utilities import canonical_course_id
+from src.vector_store import ScoredVector, get_vector_store_backend, get_local_index
+from src.connections import get_index
+from src.catalog import CATALOG_REFRESH_SECONDS, get_semester_version, get_semester_catalog
+
+logger = logging.getLogger(__name__)
+
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Title words count as if they appeared this many times
+TITLE_BOOST = 3
+TEXT_FIELDS = ('description', 'all_reviews', 'reviews_summary')
+
+# Weight of the keyword relevance term in the combined score (the sliders default to 0.2)
+DEFAULT_LEXICAL_WEIGHT = 0.2
+
+# A lexical result skips the embedding model when the query is short, every term is
+# in the vocabulary and at most this many courses match
+CONFIDENT_MAX_TERMS = 3
+CONFIDENT_MAX_HITS = 20
+
+_NIQQUD = re.compile(r'[֑-ׇ]')
+_QUOTES = re.compile(r'(?<=[א-ת])["\'׳״](?=[א-ת])')
+_TOKEN = re.compile(r'\w+')
+_FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+_HEBREW_PREFIXES = 'והבלמשכ'
+STOPWORDS = {
+    'של', 'את', 'על', 'עם', 'או', 'גם', 'זה', 'זו', 'כי', 'אם', 'לא', 'יש', 'אין', 'הוא', 'היא', 'הם', 'אני',
+    'the', 'a', 'an', 'and', 'or', 'of', 'in', 'on', 'to', 'for', 'with', 'is', 'are',
+}
+
+_lexical_indexes = {}
+_lexical_indexes_lock = threading.Lock()
+
+
+def _is_hebrew(token):
+    return 'א' <= token[0] <= 'ת'
+
+
+def _prefix_variants(token):
+    """The token without up to two leading prefix letters, keeping at least 3 letters."""
+    variants = []
+    while len(variants) < 2 and len(token) > 3 and token[0] in _HEBREW_PREFIXES:
+        token = token[1:]
+        variants.append(token)
+    return variants
+
+
+def tokenize(text):
+    """Normalised surface tokens of `text` (stopwords dropped)."""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    text = _QUOTES.sub('', _NIQQUD.sub('', text))
+    tokens = []
+    for token in _TOKEN.findall(text):
+        if token in STOPWORDS:
+            continue
+        if token.isdigit():
+            tokens.append(canonical_course_id(token) if len(token) in (6, 8) else token)
+        elif _is_hebrew(token):
+            tokens.append(token.translate(_FINAL_LETTERS))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def index_terms(text):
+    """Terms indexed for a document: every token plus its prefix-stripped variants."""
+    terms = []
+    for token in tokenize(text):
+        terms.append(token)
+        if _is_hebrew(token):
+            terms.extend(_prefix_variants(token))
+    return terms
+
+
+class LexicalResult:
+    """BM25 scores of one query over every document of a LexicalIndex."""
+
+    def __init__(self, index, scores, hits, confident, max_score=None):
+        self.index = index
+        self.scores = scores
+        self.hits = hits
+        self.confident = confident
+        self.max_score = max_score
+
+    def __len__(self):
+        return len(self.hits)
+
+    def ranked_ids(self):
+        """IDs of the matching documents, best first."""
+        order = self.hits[np.argsort(-self.scores[self.hits], kind='stable')]
+        return [self.index.ids[row] for row in order]
+
+    def semantic_scores(self):
+        """Per document, the BM25 score scaled to [0, 1] (0 for non-matches)."""
+        top = self.scores.max() if len(self.hits) else 0.0
+        return self.scores / top if top > 0 else self.scores
+
+    def relevance(self):
+        """Per document, the BM25 score as a fraction of the query's maximum possible score."""
+        return self.scores / self.max_score if self.max_score else np.zeros_like(self.scores)
+
+    def by_row(self, values, row_of, size):
+        """Per-document `values` (0 for non-matches) laid out on another ID -> row mapping."""
+        laid_out = np.zeros(size, dtype=np.float32)
+        for row in self.hits:
+            target = row_of.get(self.index.ids[row])
+            if target is not None:
+                laid_out[target] = values[row]
+        return laid_out
+
+
+class LexicalIndex:
+    """
+    Inverted index with BM25 scoring over a fixed set of documents.
+
+    Args:
+        ids: Document (course) IDs
+        documents: Per document, the list of indexed terms (see index_terms)
+    """
+
+    def __init__(self, ids, documents, version=None, k1=BM25_K1, b=BM25_B):
+        self.ids = [str(i) for i in ids]
+        self.version = version
+        self.built_at = time.monotonic()
+        self.k1 = k1
+        self.b = b
+        self.lengths = np.array([len(terms) for terms in documents], dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(documents) and self.lengths.mean() > 0 else 1.0
+
+        postings = {}
+        for row, terms in enumerate(documents):
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(row)
+                postings[term][1].append(count)
+        n = len(self.ids)
+        self.postings = {}
+        for term, (rows, counts) in postings.items():
+            rows = np.array(rows, dtype=np.int32)
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (rows, np.array(counts, dtype=np.float32), np.float32(idf))
+
+    @classmethod
+    def from_courses(cls, ids, courses, version=None):
+        """Index course records (dicts with title / description / review text)."""
+        documents = []
+        for course_id, course in zip(ids, courses):
+            terms = index_terms(course.get('title', '')) * TITLE_BOOST
+            for field in TEXT_FIELDS:
+                terms += index_terms(course.get(field, ''))
+            terms.append(canonical_course_id(course_id))
+            documents.append(terms)
+        return cls(ids, documents, version=version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _query_terms(self, query):
+        """Per query token, the indexed term to look up (the token, else a prefix-stripped form)."""
+        terms = []
+        for token in tokenize(query):
+            candidates = [token] + (_prefix_variants(token) if _is_hebrew(token) else [])
+            terms.append(next((t for t in candidates if t in self.postings), None))
+        return terms
+
+    def search(self, query):
+        """BM25 scores of every document for `query`."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        terms = self._query_terms(query)
+        for term in terms:
+            if term is None:
+                continue
+            rows, counts, idf = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / self.avg_length)
+            scores[rows] += idf * counts * (self.k1 + 1) / (counts + norm)
+
+        # BM25 term scores are bounded by idf * (k1 + 1); unknown terms count at the idf of an
+        # unseen term, so a query only partly found in the index scores lower
+        unseen_idf = np.log(1 + (len(self.ids) + 0.5) / 0.5)
+        max_score = sum(self.postings[t][2] if t is not None else unseen_idf for t in terms) * (self.k1 + 1)
+
+        hits = np.flatnonzero(scores > 0)
+        confident = (0 < len(terms) <= CONFIDENT_MAX_TERMS and None not in terms
+                     and 0 < len(hits) <= CONFIDENT_MAX_HITS)
+        return LexicalResult(self, scores, hits, confident, max_score=float(max_score))
+
+
+def lexical_matches(result):
+    """Index-style matches for every course, scored by the lexical result alone."""
+    scores = result.semantic_scores()
+    return [ScoredVector(id=course_id, score=float(score)) for course_id, score in zip(result.index.ids, scores)]
+
+
+def hybrid_search_enabled():
+    """HYBRID_SEARCH=0 turns lexical search off (dense retrieval only)."""
+    return os.getenv("HYBRID_SEARCH", "1").strip().lower() not in ("0", "false", "no")
+
+
+def lexical_weight():
+    """Weight of the keyword relevance term (HYBRID_LEXICAL_WEIGHT)."""
+    return float(os.getenv("HYBRID_LEXICAL_WEIGHT", DEFAULT_LEXICAL_WEIGHT))
+
+
+def load_course_texts(semester_name, fields=('title',) + TEXT_FIELDS):
+    """(ids, course text records, version) of every course in a semester."""
+    if get_vector_store_backend() == "local":
+        snapshot = get_local_index(semester_name).snapshot
+        fields = [f for f in fields if f in snapshot.text_columns]
+        courses = [{field: snapshot.text(field, i) for field in fields} for i in range(len(snapshot))]
+        return snapshot.ids, courses, snapshot.version
+
+    # The text kept by the semester catalog: one metadata pull serves catalog, lexical and autocomplete
+    catalog = get_semester_catalog(semester_name, index=get_index(semester_name))
+    return catalog.ids, catalog.course_texts(fields), None
+
+
+def get_lexical_index(semester_name):
+    """
+    The semester's lexical index, built on first use. Snapshot indexes are keyed
+    by version; Pinecone ones are rebuilt after CATALOG_REFRESH_SECONDS.
+    """
+    version = get_semester_version(semester_name)
+    index = _lexical_indexes.get(semester_name)
+    if index is not None and index.version == version and (
+            version is not None or time.monotonic() - index.built_at < CATALOG_REFRESH_SECONDS):
+        return index
+
+    with _lexical_indexes_lock:
+        index = _lexical_indexes.get(semester_name)
+        if index is None or index.version != version or (
+                version is None and time.monotonic() - index.built_at >= CATALOG_REFRESH_SECONDS):
+            ids, courses, version = load_course_texts(semester_name)
+            index = LexicalIndex.from_courses(ids, courses, version=version)
+            _lexical_indexes[semester_name] = index
+            logger.debug("Built lexical index for %s: %d courses, %d terms",
+                         semester_name, len(index), len(index.postings))
+    return index
+
+
+def search_lexical(semester_name, user_query):
+    """LexicalResult for a query, or None (hybrid search off, empty query or no match)."""
+    if not user_query or not user_query.strip() or not hybrid_search_enabled():
+        return None
+    result = get_lexical_index(semester_name).search(user_query)
+    return result if len(result) else None
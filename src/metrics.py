@@ -0,0 +1,89 @@
+"""
+Prometheus-style metrics, rendered in the text exposition format at /metrics.
+
+Only histograms are needed so far: the wall time of each pipeline stage
+(embed, query, filter, rank, ...) and of each HTTP request. Kept in-process
+and dependency-free; every worker process exposes its own values.
+"""
+import bisect
+import threading
+
+
+# Seconds; stages range from sub-millisecond filters to multi-second model loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """
+    Thread-safe histogram with a fixed label set.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        labelnames: Label names; observe() takes their values positionally
+        buckets: Upper bounds (ascending); +Inf is implicit
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labelvalues, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labelvalues)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}')
+        return '\n'.join(lines)
+
+
+STAGE_SECONDS = Histogram(
+    "cheesespoon_stage_duration_seconds",
+    "Wall time of a recommendation pipeline stage",
+    labelnames=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "cheesespoon_request_duration_seconds",
+    "Wall time of an HTTP request, by endpoint and status",
+    labelnames=("endpoint", "method", "status"),
+)
+_registry = [STAGE_SECONDS, REQUEST_SECONDS]
+
+
+def observe_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, name)
+
+
+def render_metrics():
+    """All registered metrics in the Prometheus text format."""
+    return '\n'.join(metric.render() for metric in _registry) + '\n'
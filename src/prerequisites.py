@@ -0,0 +1,111 @@
+import numpy as np
+
+# Bound on the (students x clauses x words) temporaries of eligible_for_bitsets, in uint64 words (16 MB)
+CHUNK_WORDS = 1 << 21
+
+
+class PrerequisiteIndex:
+    """
+    Prerequisites of a whole semester catalog compiled to DNF bitmasks.
+
+    Every course ID that appears in any prerequisite is interned to a bit
+    position. Each prerequisite group ("all of these courses") becomes a
+    clause: a row of uint64 words with those bits set, owned by one course.
+    A course is eligible if it has no prerequisites or at least one of its
+    clauses is a subset of the student's completed-course bitset, evaluated
+    for the whole catalog in one vectorized pass.
+
+    Args:
+        course_ids: Catalog course IDs, in row order
+        prerequisites: Per course, a list of groups (lists of course IDs)
+    """
+
+    def __init__(self, course_ids, prerequisites):
+        self.course_ids = [str(c) for c in course_ids]
+        self.bit_of = {}
+
+        owners = []
+        clause_bits = []
+        for row, groups in enumerate(prerequisites):
+            for group in groups or []:
+                bits = [self.bit_of.setdefault(str(c), len(self.bit_of)) for c in group]
+                owners.append(row)
+                clause_bits.append(bits)
+
+        self.num_words = max(1, (len(self.bit_of) + 63) // 64)
+        self.clause_owner = np.array(owners, dtype=np.int64)
+        self.clause_masks = np.zeros((len(clause_bits), self.num_words), dtype=np.uint64)
+        for clause, bits in enumerate(clause_bits):
+            for bit in bits:
+                self.clause_masks[clause, bit >> 6] |= np.uint64(1) << np.uint64(bit & 63)
+
+        self.has_prerequisites = np.zeros(len(self.course_ids), dtype=bool)
+        self.has_prerequisites[self.clause_owner] = True
+
+    @classmethod
+    def from_offsets(cls, course_ids, course_offsets, group_offsets, prereq_ids):
+        """Compile straight from a snapshot's offset-encoded prerequisite arrays."""
+        groups = [prereq_ids[group_offsets[g]:group_offsets[g + 1]] for g in range(len(group_offsets) - 1)]
+        prerequisites = [groups[course_offsets[i]:course_offsets[i + 1]] for i in range(len(course_ids))]
+        return cls(course_ids, prerequisites)
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    @property
+    def num_clauses(self):
+        return len(self.clause_owner)
+
+    def completed_bitset(self, completed_ids):
+        """Bitset of the completed courses that matter for some prerequisite."""
+        bitset = np.zeros(self.num_words, dtype=np.uint64)
+        for course_id in completed_ids:
+            bit = self.bit_of.get(str(course_id))
+            if bit is not None:
+                bitset[bit >> 6] |= np.uint64(1) << np.uint64(bit & 63)
+        return bitset
+
+    def eligible(self, completed_ids):
+        """(N,) bool: can each catalog course be taken given `completed_ids`."""
+        return self.eligible_for_bitsets(self.completed_bitset(completed_ids)[None, :])[0]
+
+    def eligible_rows(self, completed_ids, rows):
+        """(len(rows),) bool: eligibility of just these catalog rows (only their clauses are checked)."""
+        bitset = self.completed_bitset(completed_ids)
+        # Clauses are stored grouped by owner row, in row order
+        starts = np.searchsorted(self.clause_owner, rows, side='left')
+        ends = np.searchsorted(self.clause_owner, rows, side='right')
+        eligible = np.zeros(len(rows), dtype=bool)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            masks = self.clause_masks[start:end]
+            eligible[i] = start == end or bool(np.any(np.all((masks & bitset) == masks, axis=1)))
+        return eligible
+
+    def eligible_for_bitsets(self, bitsets):
+        """
+        Eligibility of the whole catalog for many students at once.
+
+        Args:
+            bitsets: (S, num_words) uint64 completed-course bitsets
+
+        Returns:
+            (S, N) bool matrix
+        """
+        bitsets = np.asarray(bitsets, dtype=np.uint64)
+        eligible = np.broadcast_to(~self.has_prerequisites, (len(bitsets), len(self))).copy()
+        if self.num_clauses == 0:
+            return eligible
+
+        # A clause is satisfied when every required bit is present. Students and clauses are
+        # taken in chunks so the (students, clauses, words) temporaries stay under CHUNK_WORDS.
+        clause_step = max(1, min(self.num_clauses, CHUNK_WORDS // self.num_words))
+        student_step = max(1, CHUNK_WORDS // (clause_step * self.num_words))
+        for c0 in range(0, self.num_clauses, clause_step):
+            masks = self.clause_masks[None, c0:c0 + clause_step, :]
+            owners = self.clause_owner[c0:c0 + clause_step]
+            for s0 in range(0, len(bitsets), student_step):
+                chunk = bitsets[s0:s0 + student_step, None, :]
+                satisfied = np.all((chunk & masks) == masks, axis=2)
+                students, clauses = np.nonzero(satisfied)
+                eligible[s0 + students, owners[clauses]] = True
+        return eligible
@@ -0,0 +1,217 @@
+"""
+On-demand profiling of single requests.
+
+Disabled unless PROFILE_TOKEN is set. A request carrying that token (header
+`X-Admin-Token` or query `admin_token`) together with `X-Profile` / `profile`
+set to `cprofile` or `sample` runs under a profiler:
+
+- cprofile: deterministic cProfile of the request thread, saved as a .prof
+  file (pstats format; open with snakeviz, flameprof or gprof2dot)
+- sample: wall-clock stack sampler over the request thread and the shared
+  async I/O pool, saved as collapsed stacks (.folded; flamegraph.pl / speedscope)
+
+Profiles go to PROFILE_DIR, which keeps only the newest PROFILE_KEEP files.
+"""
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import cProfile
+import logging
+import threading
+from collections import Counter
+from src.config import load_env
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILE_DIR = os.path.join("data", "profiles")
+DEFAULT_KEEP = 50
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+MODES = ("cprofile", "sample")
+EXTENSIONS = {"cprofile": ".prof", "sample": ".folded"}
+
+# Threads of src.timing's executor: sampled along with the request thread
+IO_THREAD_PREFIX = "cheesespoon-io"
+
+# <unix ms>-<endpoint>-<id>.<ext>; also the only names the admin endpoint will serve
+_PROFILE_NAME = re.compile(r'^(\d+)-([\w.]+)-([0-9a-f]{8})\.(prof|folded)$')
+
+# Only one cProfile may be active per process at a time on newer Pythons
+_cprofile_lock = threading.Lock()
+_ring_lock = threading.Lock()
+
+
+def get_profile_token():
+    load_env()
+    return os.getenv("PROFILE_TOKEN") or None
+
+
+def get_profile_dir():
+    load_env()
+    return os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR)
+
+
+def is_admin(headers, args):
+    """True if the request carries the PROFILE_TOKEN admin token."""
+    token = get_profile_token()
+    supplied = headers.get("X-Admin-Token") or args.get("admin_token")
+    return bool(token and supplied and hmac.compare_digest(token.encode(), supplied.encode()))
+
+
+def requested_mode(headers, args):
+    """Profiler mode asked for by an admin request, or None."""
+    mode = (headers.get("X-Profile") or args.get("profile") or "").strip().lower()
+    if not mode or not is_admin(headers, args):
+        return None
+    if mode in ("1", "true", "yes"):
+        return "cprofile"
+    return mode if mode in MODES else None
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of the given thread (and the async I/O pool
+    threads) every `interval` seconds into collapsed-stack counts.
+
+    I/O pool threads are shared by concurrent requests, so their stacks may
+    include other requests' work; they are prefixed with the thread name.
+    """
+
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profile-sampler")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            frames = sys._current_frames()
+            targets = {self.thread_id: None}
+            for thread in threading.enumerate():
+                if thread.name.startswith(IO_THREAD_PREFIX):
+                    targets[thread.ident] = thread.name
+            for thread_id, root in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.counts[_collapse(frame, root)] += 1
+            self.samples += 1
+            if self._stop.wait(self.interval):
+                break
+
+    def collapsed(self):
+        """Collapsed stacks, one 'root;...;leaf count' line each."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+def _collapse(frame, root=None):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    if root:
+        names.append(root)
+    return ';'.join(reversed(names))
+
+
+class RequestProfile:
+    """Profiler around one request; start() and stop() must run on the request thread."""
+
+    def __init__(self, mode, endpoint):
+        self.mode = mode
+        self.endpoint = re.sub(r'[^\w.]', '_', endpoint or 'unknown')
+        self.started = None
+        self._profiler = None
+        self._sampler = None
+
+    def start(self):
+        """Start profiling; False if another cProfile run is active in this process."""
+        if self.mode == "cprofile":
+            if not _cprofile_lock.acquire(blocking=False):
+                return False
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", DEFAULT_SAMPLE_INTERVAL_MS)) / 1000
+            self._sampler = StackSampler(threading.get_ident(), interval)
+            self._sampler.start()
+        self.started = time.perf_counter()
+        return True
+
+    def stop(self):
+        """Stop profiling and write the profile into the ring. Returns its file name."""
+        duration_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        name = f"{int(time.time() * 1000)}-{self.endpoint}-{uuid.uuid4().hex[:8]}{EXTENSIONS[self.mode]}"
+        directory = get_profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        if self._profiler is not None:
+            try:
+                self._profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            self._profiler.dump_stats(path)
+        else:
+            self._sampler.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._sampler.collapsed())
+        logger.info("Profiled %s (%s, %.1f ms) -> %s", self.endpoint, self.mode, duration_ms, path)
+        _trim_ring(directory)
+        return name
+
+
+def _trim_ring(directory):
+    keep = int(os.getenv("PROFILE_KEEP", DEFAULT_KEEP))
+    with _ring_lock:
+        names = sorted(n for n in os.listdir(directory) if _PROFILE_NAME.match(n))
+        for name in names[:max(len(names) - keep, 0)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Stored profiles, newest first."""
+    directory = get_profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        match = _PROFILE_NAME.match(name)
+        if not match:
+            continue
+        created_ms, endpoint, _, ext = match.groups()
+        try:
+            size = os.path.getsize(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            'name': name,
+            'endpoint': endpoint,
+            'mode': 'cprofile' if ext == 'prof' else 'sample',
+            'created': int(created_ms) / 1000,
+            'bytes': size,
+        })
+    profiles.sort(key=lambda p: p['name'], reverse=True)
+    return profiles
+
+
+def profile_path(name):
+    """Path of a stored profile, or None if `name` is not a profile in the ring."""
+    if not _PROFILE_NAME.match(name or ''):
+        return None
+    path = os.path.join(get_profile_dir(), name)
+    return path if os.path.isfile(path) else None
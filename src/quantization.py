@@ -0,0 +1,298 @@
+"""
+Quantized copies of a snapshot's embeddings for cheaper scans.
+
+  int8    per-dimension symmetric scalar quantization, 1 byte per value (4x smaller)
+  binary  sign bits packed 8 per byte, scored by Hamming distance (32x smaller)
+
+A query scans the compact codes, keeps a shortlist of the best candidates and
+rescores it with the float32 rows. The float matrix stays memory-mapped on disk
+and only the shortlisted rows are read, so workers keep just the codes
+resident. Every returned score is exact: queries that ask for more rows than
+QUANTIZATION_RESCORE (such as recommendation candidate sets, which score the
+whole catalog) skip the codes and use the float32 matmul, so quantization
+never changes a ranking.
+
+The codes are stored in `<snapshot>/quantized/`, tied to the snapshot version.
+
+    python -m src.quantization build WINTER_2025_2026 --mode int8
+    python -m src.quantization report WINTER_2025_2026 --k 10
+"""
+import logging
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+QUANTIZED_DIR = "quantized"
+QUANTIZED_MANIFEST = "quantized.json"
+MODES = ("int8", "binary")
+# Shortlist size per requested result: sign bits rank much more coarsely than int8
+RESCORE_FACTORS = {"int8": 4, "binary": 32}
+MIN_SHORTLIST = 100
+DEFAULT_MAX_RESCORE = 1000
+# int8 rows converted per step; small enough for the float copy to stay in cache
+SCAN_BLOCK = 2048
+
+# Number of set bits of every byte value (for NumPy < 2.0 without bitwise_count)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _hamming(codes, query_bits):
+    """Hamming distance of every packed row of `codes` to `query_bits`."""
+    if hasattr(np, "bitwise_count") and codes.shape[1] % 8 == 0 and codes.flags.c_contiguous:
+        return np.bitwise_count(codes.view(np.uint64) ^ query_bits.view(np.uint64)).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[codes ^ query_bits].sum(axis=1, dtype=np.int32)
+
+
+class QuantizedVectors:
+    """
+    Compact codes of an (N, dim) unit-length matrix plus the shortlist + rescore search.
+
+    Args:
+        mode: 'int8' or 'binary'
+        codes: (N, dim) int8 or (N, ceil(dim / 8)) uint8 packed sign bits
+        dimension: Embedding dimension
+        scale: (dim,) float32 int8 step per dimension (int8 only)
+    """
+
+    def __init__(self, mode, codes, dimension, scale=None, snapshot_version=None,
+                 rescore_factor=None, max_rescore=DEFAULT_MAX_RESCORE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown quantization mode {mode!r}, expected one of {MODES}")
+        self.mode = mode
+        self.codes = codes
+        self.dimension = dimension
+        self.scale = scale
+        self.snapshot_version = snapshot_version
+        self.rescore_factor = rescore_factor or RESCORE_FACTORS[mode]
+        self.max_rescore = max_rescore
+
+    @classmethod
+    def build(cls, vectors, mode, snapshot_version=None):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if mode == "int8":
+            scale = np.abs(vectors).max(axis=0) / 127
+            scale[scale == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+            return cls(mode, codes, vectors.shape[1], scale=scale.astype(np.float32), snapshot_version=snapshot_version)
+        if mode == "binary":
+            return cls(mode, np.packbits(vectors > 0, axis=1), vectors.shape[1], snapshot_version=snapshot_version)
+        raise ValueError(f"Unknown quantization mode {mode!r}, expected one of {MODES}")
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def encode(self, vectors):
+        """Codes of new unit-length vectors with the existing scale (out-of-range values clip)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.mode == "int8":
+            return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+        return np.packbits(vectors > 0, axis=1)
+
+    def set_rows(self, rows, vectors):
+        """Overwrite or append (rows >= len) the codes of upserted vectors."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and rows.max() >= len(self.codes):
+            grown = np.zeros((int(rows.max()) + 1, self.codes.shape[1]), dtype=self.codes.dtype)
+            grown[:len(self.codes)] = self.codes
+            self.codes = grown
+        self.codes[rows] = self.encode(vectors)
+
+    def estimate_scores(self, query):
+        """Estimated cosine similarity of a unit-length query to every row."""
+        if self.mode == "int8":
+            scores = np.empty(len(self.codes), dtype=np.float32)
+            weighted = (query * self.scale).astype(np.float32)
+            for start in range(0, len(self.codes), SCAN_BLOCK):
+                block = self.codes[start:start + SCAN_BLOCK]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weighted
+            return scores
+
+        hamming = _hamming(self.codes, np.packbits(query > 0))
+        return np.cos(np.pi * hamming / self.dimension).astype(np.float32)
+
+    def search(self, vectors, query, top_k):
+        """
+        Top rows by cosine similarity: scan the codes, rescore a shortlist with
+        the float rows of `vectors`.
+
+        Returns:
+            (rows, scores), best first
+        """
+        n = len(self.codes)
+        top_k = min(int(top_k), n)
+        if top_k > self.max_rescore:
+            # Too many rows to rescore one by one: exact scores for all of them
+            scores = np.asarray(vectors, dtype=np.float32) @ query
+            top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k < n else np.arange(n)
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return top, scores[top]
+        estimates = self.estimate_scores(query)
+
+        shortlist = min(n, max(top_k * self.rescore_factor, MIN_SHORTLIST))
+        rows = np.argpartition(-estimates, shortlist - 1)[:shortlist] if shortlist < n else np.arange(n)
+        rows = rows[np.argsort(-estimates[rows], kind='stable')]
+
+        # Exact scores for the whole shortlist, gathered in row order so the
+        # memory-mapped reads stay sequential
+        scores = np.empty(len(rows), dtype=np.float32)
+        order = np.argsort(rows)
+        scores[order] = np.asarray(vectors[rows[order]], dtype=np.float32) @ query
+
+        top = np.argsort(-scores, kind='stable')[:top_k]
+        return rows[top], scores[top]
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / f"{self.mode}_codes.npy", self.codes)
+        if self.scale is not None:
+            np.save(path / f"{self.mode}_scale.npy", self.scale)
+        manifest_path = path / QUANTIZED_MANIFEST
+        manifest = {}
+        if manifest_path.exists():
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        manifest[self.mode] = {'dimension': self.dimension, 'count': len(self), 'snapshot_version': self.snapshot_version,
+                               'created_at': time.time()}
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mode):
+        path = Path(path)
+        with open(path / QUANTIZED_MANIFEST, encoding='utf-8') as f:
+            info = json.load(f)[mode]
+        scale_path = path / f"{mode}_scale.npy"
+        return cls(mode, np.load(path / f"{mode}_codes.npy"), info['dimension'],
+                   scale=np.load(scale_path) if scale_path.exists() else None,
+                   snapshot_version=info['snapshot_version'])
+
+
+def get_quantization_mode():
+    """'int8', 'binary' or None, from the VECTOR_QUANTIZATION env var"""
+    mode = os.getenv("VECTOR_QUANTIZATION", "").strip().lower()
+    return mode if mode in MODES else None
+
+
+def load_quantized_for_snapshot(snapshot, mode=None):
+    """
+    Quantized codes of a snapshot in the configured mode (None when disabled).
+    Codes missing or stale on disk are rebuilt in memory.
+    """
+    mode = mode or get_quantization_mode()
+    if mode is None:
+        return None
+
+    path = snapshot.path / QUANTIZED_DIR
+    quantized = None
+    try:
+        quantized = QuantizedVectors.load(path, mode)
+    except (OSError, KeyError, ValueError):
+        pass
+    if quantized is None or quantized.snapshot_version != snapshot.version:
+        logger.info("Quantizing %s embeddings (%s) in memory; run `python -m src.quantization build %s --mode %s` "
+                    "to persist", snapshot.semester, mode, snapshot.semester, mode)
+        quantized = QuantizedVectors.build(snapshot.embeddings, mode, snapshot_version=snapshot.version)
+
+    quantized.max_rescore = int(os.getenv("QUANTIZATION_RESCORE", DEFAULT_MAX_RESCORE))
+    return quantized
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def _top(scores, k):
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def agreement_report(vectors, quantized, k=10, num_queries=200, noise=0.05, seed=0):
+    """
+    How closely quantized search tracks full precision.
+
+    Queries are stored vectors plus Gaussian noise. Reports recall@k of the
+    quantized search and the mean error of the code-only score estimates
+    (what the shortlist is chosen by).
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    queries = np.asarray(vectors[rows], dtype=np.float32)
+    queries += rng.normal(scale=noise, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    recall, exact_ms, quantized_ms, score_error = [], 0.0, 0.0, []
+    for query in queries:
+        start = time.perf_counter()
+        exact = np.asarray(vectors, dtype=np.float32) @ query
+        exact_ms += (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        found, _ = quantized.search(vectors, query, k)
+        quantized_ms += (time.perf_counter() - start) * 1000
+        recall.append(len(set(found.tolist()) & set(_top(exact, k).tolist())) / k)
+        score_error.append(float(np.abs(quantized.estimate_scores(query) - exact).mean()))
+
+    float_bytes = len(vectors) * quantized.dimension * 4
+    return {
+        'mode': quantized.mode,
+        'vectors': len(vectors),
+        'float32_mb': round(float_bytes / 1e6, 2),
+        'quantized_mb': round(quantized.nbytes / 1e6, 2),
+        'compression': round(float_bytes / quantized.nbytes, 1),
+        f'recall@{k}': round(float(np.mean(recall)), 4),
+        'mean_abs_estimate_error': round(float(np.mean(score_error)), 5),
+        'exact_ms': round(exact_ms / len(queries), 3),
+        'quantized_ms': round(quantized_ms / len(queries), 3),
+    }
+
+
+def main(argv=None):
+    from src.config import configure_logging
+    from src.snapshot import open_snapshot
+    from src.vector_store import get_local_index_dir
+
+    parser = argparse.ArgumentParser(description="Quantize snapshot embeddings and measure ranking agreement")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Write quantized codes next to a snapshot")
+    build.add_argument("semester")
+    build.add_argument("--mode", choices=MODES, action="append", help="int8 and/or binary (default: both)")
+    report = sub.add_parser("report", help="Memory, speed and ranking agreement vs full precision")
+    report.add_argument("semester")
+    report.add_argument("--mode", choices=MODES, action="append")
+    report.add_argument("--k", type=int, default=10)
+    report.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    snapshot = open_snapshot(get_local_index_dir() / args.semester)
+    modes = args.mode or list(MODES)
+
+    if args.command == "build":
+        for mode in modes:
+            quantized = QuantizedVectors.build(snapshot.embeddings, mode, snapshot_version=snapshot.version)
+            quantized.save(snapshot.path / QUANTIZED_DIR)
+            print(f"✅ {args.semester} {mode}: {quantized.nbytes / 1e6:.1f} MB "
+                  f"({snapshot.embeddings.nbytes / quantized.nbytes:.0f}x smaller than float32)")
+        return 0
+
+    for mode in modes:
+        quantized = QuantizedVectors.build(snapshot.embeddings, mode)
+        print(json.dumps(agreement_report(snapshot.embeddings, quantized, k=args.k, num_queries=args.queries),
+                         ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
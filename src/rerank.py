@@ -0,0 +1,91 @@
+"""
+Vectorized rerank engine.
+
+Static per-course features are kept as one preallocated (N, 4) float32 matrix
+per semester, already filled and normalized the same way the DataFrame rerank
+(now benchmarks/legacy.py) always did it:
+
+  column 0  credits            raw, missing -> 0 (divided by the candidate max per request)
+  column 1  avg_grade / 100    missing -> DEFAULT_AVG_GRADE
+  column 2  workload_rating / 5, missing -> neutral 2.5
+  column 3  general_rating / 5,  missing -> neutral 2.5
+
+The combined score is then a single matrix-vector product with the weight
+vector plus the weighted semantic score, and only the top N rows are sorted.
+"""
+import numpy as np
+from src.course_metadata import DEFAULT_AVG_GRADE
+
+
+NEUTRAL_RATING = 2.5
+FEATURE_COLUMNS = ['credits', 'avg_grade', 'workload_rating', 'general_rating']
+
+
+def _filled(values, fill):
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), fill, values)
+
+
+def build_feature_matrix(credits, avg_grade, workload_rating, general_rating):
+    """
+    Args:
+        credits, avg_grade, workload_rating, general_rating: (N,) arrays, NaN when missing
+
+    Returns:
+        (N, 4) float32 feature matrix (see module docstring for the layout)
+    """
+    features = np.empty((len(credits), len(FEATURE_COLUMNS)), dtype=np.float32)
+    features[:, 0] = _filled(credits, 0)
+    features[:, 1] = _filled(avg_grade, DEFAULT_AVG_GRADE) / 100
+    features[:, 2] = _filled(workload_rating, NEUTRAL_RATING) / 5
+    features[:, 3] = _filled(general_rating, NEUTRAL_RATING) / 5
+    return features
+
+
+def weight_vector(credits_weight=0.2, avg_grade_weight=0.2, workload_rating_weight=0.2, general_rating_weight=0.2):
+    return np.array([credits_weight, avg_grade_weight, workload_rating_weight, general_rating_weight],
+                    dtype=np.float32)
+
+
+def combined_scores(features, semantic_scores, semantic_weight, weights, max_credits=None):
+    """
+    Combined score of every candidate row.
+
+    Args:
+        features: (K, 4) feature rows of the candidates
+        semantic_scores: (K,) similarity to the user query (NaN -> 0)
+        semantic_weight: Weight of the semantic score
+        weights: (4,) weight vector from weight_vector()
+        max_credits: Credits normalizer; defaults to the max over these candidates
+            (callers merging several candidate sets pass their common max)
+
+    Returns:
+        (K,) float32 combined scores
+    """
+    if len(features) == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # Credits are normalized by the max over the candidates, as in the original rerank
+    weights = np.array(weights, dtype=np.float32)
+    if max_credits is None:
+        max_credits = features[:, 0].max()
+    weights[0] = weights[0] / max_credits if max_credits > 0 else 0.0
+
+    semantic = np.nan_to_num(np.asarray(semantic_scores, dtype=np.float32), nan=0.0)
+    return semantic_weight * semantic + features @ weights
+
+
+def top_n_order(scores, top_n=None):
+    """
+    Row indices of the best `top_n` scores, best first (all rows if top_n is None).
+    Ties break by row, so the result is always a prefix of the full stable sort.
+    """
+    if top_n is None or top_n >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    if top_n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    cutoff = scores[np.argpartition(-scores, top_n - 1)[top_n - 1]]
+    # argpartition picks arbitrary rows among those tied at the cut-off; take the first ones
+    ahead = np.flatnonzero(scores > cutoff)
+    top = np.concatenate([ahead, np.flatnonzero(scores == cutoff)[:top_n - len(ahead)]])
+    return top[np.argsort(-scores[top], kind='stable')]
@@ -0,0 +1,103 @@
+"""
+Multi-semester search: fan out to several semester indexes concurrently and
+merge the results into one ranked list.
+
+Each shard builds its candidate set with get_candidate_set_async, so every
+semester uses its own catalog, caches and prerequisite rules; latency is that
+of the slowest shard, not the sum. Scores are comparable across shards:
+credits are normalized by the max over all shards' candidates, the semantic
+score comes from the same query embedding, grades and ratings are on fixed
+scales, and keyword relevance is already a 0-1 fraction of a perfect match.
+Courses are deduplicated by canonical (8-digit) course ID: the best-scoring
+offering is kept and annotated with every semester whose catalog has the
+course, whether or not it made that shard's top_n.
+"""
+import logging
+import asyncio
+from src.knowledgebase import get_candidate_set_async, rank_candidate_set
+from src.timing import StageTimings, run_blocking
+from src.utilities import canonical_course_id, normalize_course_id
+
+logger = logging.getLogger(__name__)
+
+
+async def _candidate_shard(semester_name, timings, **kwargs):
+    with timings.stage(semester_name):
+        return await get_candidate_set_async(semester_name=semester_name, **kwargs)
+
+
+async def recommend_across_semesters_async(semester_names, courses_list=[], no_exam=False, min_credits=0,
+                                           user_query="", semantic_weight=0.2, credits_weight=0.2,
+                                           avg_grade_weight=0.2, workload_rating_weight=0.2,
+                                           general_rating_weight=0.2, top_n=50, timings=None):
+    """
+    Ranked recommendations merged across semesters.
+
+    Args:
+        semester_names: Semester index names (env var names, e.g. WINTER_2025_2026)
+        top_n: Length of the merged list (each shard is asked for top_n, which
+            is enough for an exact merged top_n after deduplication)
+        timings: Optional StageTimings, one stage per semester plus "rank"
+
+    Returns:
+        DataFrame ranked by combined_score with 'canonical_id', 'semester' (the
+        offering shown) and 'semesters' (all offering semesters) columns.
+        attrs['failed_semesters'] maps semesters that errored to the error.
+    """
+    import pandas as pd
+
+    timings = timings if timings is not None else StageTimings()
+    semester_names = list(dict.fromkeys(semester_names))
+    weights = (semantic_weight, credits_weight, avg_grade_weight, workload_rating_weight, general_rating_weight)
+
+    shards = await asyncio.gather(
+        *(_candidate_shard(semester, timings, courses_list=courses_list, no_exam=no_exam,
+                           min_credits=min_credits, user_query=user_query) for semester in semester_names),
+        return_exceptions=True,
+    )
+
+    failed = {}
+    candidate_sets = {}
+    for semester, shard in zip(semester_names, shards):
+        if isinstance(shard, Exception):
+            logger.error("Semester %s failed: %s", semester, shard)
+            failed[semester] = str(shard)
+        else:
+            candidate_sets[semester] = shard
+
+    # One credits normalizer for every shard, so combined scores compare across semesters
+    max_credits = max((float(c.features[:, 0].max()) for c in candidate_sets.values() if len(c)), default=0.0)
+    ranked = await timings.measure("rank", asyncio.gather(
+        *(run_blocking(rank_candidate_set, candidates, *weights, top_n=top_n, max_credits=max_credits)
+          for candidates in candidate_sets.values()),
+        return_exceptions=True,
+    ))
+
+    best = {}
+    for semester, shard in zip(list(candidate_sets), ranked):
+        if isinstance(shard, Exception):
+            logger.error("Semester %s failed: %s", semester, shard)
+            failed[semester] = str(shard)
+            del candidate_sets[semester]
+            continue
+        for course in shard.to_dict('records'):
+            canonical = canonical_course_id(course['ID'])
+            if canonical not in best or course['combined_score'] > best[canonical]['combined_score']:
+                best[canonical] = {**course, 'canonical_id': canonical, 'semester': semester}
+
+    merged = sorted(best.values(), key=lambda course: course['combined_score'], reverse=True)[:top_n]
+    # Offering semesters come from catalog membership, not from each shard's truncated top_n
+    for course in merged:
+        canonical = course['canonical_id']
+        forms = {canonical, normalize_course_id(canonical)} - {""}
+        course['semesters'] = [semester for semester, candidates in candidate_sets.items()
+                               if any(form in candidates.catalog.row_of for form in forms)]
+
+    merged = pd.DataFrame(merged)
+    merged.attrs['failed_semesters'] = failed
+    return merged
+
+
+def recommend_across_semesters(semester_names, **kwargs):
+    """Sync wrapper around recommend_across_semesters_async."""
+    return asyncio.run(recommend_across_semesters_async(semester_names, **kwargs))
@@ -0,0 +1,55 @@
+"""
+Course-to-course similarity graph ("Similar Courses").
+
+At ingest time every course gets its k nearest neighbours by cosine
+similarity of the description embeddings. The graph is stored with the
+semester (snapshot arrays `neighbors` / `neighbor_scores`, or the
+`similar_courses` metadata list on Pinecone), so the course page looks
+alternatives up in O(k) instead of embedding the title and ranking the
+whole catalog.
+"""
+import numpy as np
+
+
+NEIGHBORS_K = 10
+
+
+def build_neighbor_graph(embeddings, k=NEIGHBORS_K, block_size=1024):
+    """
+    Exact k-nearest-neighbour graph over unit-length embeddings.
+
+    Rows are processed in blocks, so memory stays at block_size x N scores.
+
+    Args:
+        embeddings: (N, dim) L2-normalised float32 embeddings
+        k: Neighbours per course (self excluded)
+
+    Returns:
+        (neighbors, scores): (N, k) int32 rows, best first, -1 padded when N <= k,
+        and the matching (N, k) float32 cosine similarities (NaN padded)
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    n = len(embeddings)
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.full((n, k), np.nan, dtype=np.float32)
+    available = min(k, n - 1)
+    if available <= 0:
+        return neighbors, scores
+
+    for start in range(0, n, block_size):
+        block = embeddings[start:start + block_size] @ embeddings.T
+        rows = np.arange(start, start + len(block))
+        block[rows - start, rows] = -np.inf
+
+        top = np.argpartition(-block, available - 1, axis=1)[:, :available]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        neighbors[start:start + len(block), :available] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(block), :available] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbors, scores
+
+
+def similar_course_ids(ids, neighbors):
+    """Per course, the neighbour course IDs (for the `similar_courses` index metadata field)."""
+    return [[ids[j] for j in row if j >= 0] for row in neighbors]
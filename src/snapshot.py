@@ -0,0 +1,325 @@
+"""
+On-disk semester snapshots.
+
+A snapshot is a directory (e.g. data/indexes/WINTER_2025_2026/) holding:
+
+  manifest.json             format version, semester, model, counts and a sha256 per file
+  embeddings.npy            (N, dim) float32, rows L2-normalised
+  ids.npy                   (N,) fixed-width unicode course IDs
+  <numeric column>.npy      (N,) float64, NaN when missing (credits, ratings, avg_grade)
+  has_exam.npy              (N,) bool
+  prereq_course_offsets.npy (N+1,) int64 - course i owns groups [off[i], off[i+1])
+  prereq_group_offsets.npy  (G+1,) int64 - group g owns ids [off[g], off[g+1])
+  prereq_ids.npy            (P,) unicode - flattened prerequisite course IDs
+  grades_offsets.npy        (N+1,) int64 - course i owns grades [off[i], off[i+1])
+  grades_semesters.npy      unicode semester labels, grades_values.npy float64 final averages
+  text_<column>.npy         utf-8 bytes of every row concatenated (uint8), one per text field
+  text_<column>_offsets.npy (N+1,) int64 byte offsets into the blob
+  neighbors.npy             (N, k) int32 rows of each course's nearest courses, best first (-1 padded)
+  neighbor_scores.npy       (N, k) float32 cosine similarities of those neighbours
+
+Every array is a plain .npy file opened with mmap_mode='r', so opening a snapshot
+costs milliseconds and all gunicorn workers share the same page-cache pages.
+"""
+import logging
+import os
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+import numpy as np
+from src.course_metadata import parse_course_metadata, encode_prerequisite_groups
+from src.similarity import NEIGHBORS_K, build_neighbor_graph
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_FORMAT = "cheesespoon-semester-snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+NUMERIC_COLUMNS = ['credits', 'general_rating', 'workload_rating', 'avg_grade']
+TEXT_COLUMNS = ['course_id', 'title', 'description', 'moed_a', 'moed_b', 'all_reviews', 'reviews_summary']
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value
+
+
+def _to_text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return str(value)
+
+
+def course_from_metadata(metadata):
+    """
+    Convert index/CSV metadata (typed fields or legacy JSON strings) into the
+    course record stored in a snapshot.
+    """
+    typed = parse_course_metadata(metadata)
+    course = {column: _to_text(metadata.get(column)) for column in TEXT_COLUMNS}
+    # Keep any other text fields as-is (e.g. chunk_text on review-chunk indexes)
+    course.update({k: v for k, v in metadata.items() if isinstance(v, str) and k not in course
+                   and k not in ('prerequisites', 'avg_grades')})
+    course.update({
+        'credits': _to_float(metadata.get('credits')),
+        'general_rating': _to_float(metadata.get('general_rating')),
+        'workload_rating': _to_float(metadata.get('workload_rating')),
+        'prerequisites': typed['prerequisites'],
+        'avg_grades': typed['avg_grades'],
+    })
+    return course
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _unicode_array(values):
+    return np.array(values, dtype=str) if values else np.array([], dtype='<U1')
+
+
+def write_snapshot(path, semester_name, ids, embeddings, courses, model_name=None, neighbors_k=NEIGHBORS_K):
+    """
+    Write a semester snapshot to `path` atomically.
+
+    Args:
+        path: Target snapshot directory
+        semester_name: Semester key, e.g. WINTER_2025_2026
+        ids: Course IDs (index vector IDs), one per row
+        embeddings: (N, dim) passage embeddings
+        courses: Typed course records (see course_from_metadata), one per row
+        model_name: Embedding model the vectors came from
+        neighbors_k: Size of the precomputed similar-courses graph
+
+    Returns:
+        The written manifest
+    """
+    path = Path(path)
+    if len(ids) != len(courses) or len(ids) != len(embeddings):
+        raise ValueError(f"Row count mismatch: {len(ids)} ids, {len(embeddings)} embeddings, {len(courses)} courses")
+
+    embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    embeddings = embeddings / norms
+    neighbors, neighbor_scores = build_neighbor_graph(embeddings, neighbors_k)
+    arrays = {
+        'embeddings': embeddings,
+        'ids': _unicode_array([str(i) for i in ids]),
+        'has_exam': np.array([bool(c.get('moed_a')) for c in courses], dtype=bool),
+        'neighbors': neighbors,
+        'neighbor_scores': neighbor_scores,
+    }
+
+    for column in ['credits', 'general_rating', 'workload_rating']:
+        arrays[column] = np.array([_to_float(c.get(column)) for c in courses], dtype=np.float64)
+    grades = [course.get('avg_grades') or {} for course in courses]
+    arrays['avg_grade'] = np.array([sum(g.values()) / len(g) if g else np.nan for g in grades], dtype=np.float64)
+
+    # Prerequisites: two levels of offsets (course -> groups -> ids)
+    groups = [[str(c) for c in group] for course in courses for group in course.get('prerequisites') or []]
+    arrays['prereq_course_offsets'] = _offsets([len(c.get('prerequisites') or []) for c in courses])
+    arrays['prereq_group_offsets'] = _offsets([len(group) for group in groups])
+    arrays['prereq_ids'] = _unicode_array([course_id for group in groups for course_id in group])
+
+    grade_items = [list(g.items()) for g in grades]
+    arrays['grades_offsets'] = _offsets([len(items) for items in grade_items])
+    arrays['grades_semesters'] = _unicode_array([k for items in grade_items for k, _ in items])
+    arrays['grades_values'] = np.array([v for items in grade_items for _, v in items], dtype=np.float64)
+
+    text_columns = list(TEXT_COLUMNS)
+    for course in courses:
+        text_columns += [k for k, v in course.items() if isinstance(v, str) and k not in text_columns]
+    for column in text_columns:
+        encoded = [_to_text(c.get(column)).encode('utf-8') for c in courses]
+        arrays[f'text_{column}'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        arrays[f'text_{column}_offsets'] = _offsets([len(e) for e in encoded])
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    files = {}
+    for name, array in arrays.items():
+        file_name = f"{name}.npy"
+        np.save(tmp_path / file_name, array)
+        files[name] = {
+            'file': file_name,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'sha256': _file_sha256(tmp_path / file_name),
+        }
+
+    content_hash = hashlib.sha256(
+        "".join(f"{name}:{files[name]['sha256']}" for name in sorted(files)).encode()
+    ).hexdigest()
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'semester': semester_name,
+        'model': model_name,
+        'count': len(ids),
+        'dimension': int(embeddings.shape[1]),
+        'text_columns': text_columns,
+        'neighbors_k': neighbors_k,
+        'created_at': time.time(),
+        'content_hash': content_hash,
+        'files': files,
+    }
+    with open(tmp_path / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Swap directories; workers holding the old files keep their mappings valid
+    old_path = path.with_name(path.name + ".old")
+    if path.exists():
+        if old_path.exists():
+            shutil.rmtree(old_path)
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    if old_path.exists():
+        shutil.rmtree(old_path)
+
+    logger.info("Wrote snapshot %s (%d courses, version %s) to %s", semester_name, len(ids), content_hash[:12], path)
+    return manifest
+
+
+def is_snapshot(path):
+    return (Path(path) / MANIFEST_FILE).exists()
+
+
+class SemesterSnapshot:
+    """Read-only, memory-mapped view of a snapshot directory."""
+
+    def __init__(self, path, manifest, arrays):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.arrays = arrays
+        self.ids = [str(i) for i in arrays['ids']]
+
+    @property
+    def semester(self):
+        return self.manifest['semester']
+
+    @property
+    def version(self):
+        return f"v{self.manifest['format_version']}-{self.manifest['content_hash'][:16]}"
+
+    @property
+    def text_columns(self):
+        return self.manifest['text_columns']
+
+    @property
+    def embeddings(self):
+        return self.arrays['embeddings']
+
+    def __len__(self):
+        return self.manifest['count']
+
+    def column(self, name):
+        if name in self.arrays:
+            return self.arrays[name]
+        if name in self.text_columns:
+            return [self.text(name, i) for i in range(len(self))]
+        raise KeyError(name)
+
+    def text(self, column, i):
+        blob = self.arrays[f'text_{column}']
+        offsets = self.arrays[f'text_{column}_offsets']
+        return blob[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def prerequisites(self, i):
+        course_offsets = self.arrays['prereq_course_offsets']
+        group_offsets = self.arrays['prereq_group_offsets']
+        prereq_ids = self.arrays['prereq_ids']
+        return [
+            [str(c) for c in prereq_ids[group_offsets[g]:group_offsets[g + 1]]]
+            for g in range(course_offsets[i], course_offsets[i + 1])
+        ]
+
+    def grades(self, i):
+        offsets = self.arrays['grades_offsets']
+        start, end = offsets[i], offsets[i + 1]
+        return {
+            str(semester): float(value)
+            for semester, value in zip(self.arrays['grades_semesters'][start:end], self.arrays['grades_values'][start:end])
+        }
+
+
+class SnapshotMetadata:
+    """
+    Metadata table backed by a snapshot, with the same row()/column() interface
+    as vector_store.MetadataTable. Rows use the typed index metadata layout
+    (see src/course_metadata.py).
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.num_rows = len(snapshot)
+
+    def column(self, name):
+        return self.snapshot.column(name)
+
+    def row(self, i):
+        snapshot = self.snapshot
+        row = {column: snapshot.text(column, i) for column in snapshot.text_columns}
+        for column in NUMERIC_COLUMNS:
+            value = snapshot.arrays[column][i]
+            if not np.isnan(value):
+                row[column] = float(value)
+        grades = snapshot.grades(i)
+        row['has_exam'] = bool(snapshot.arrays['has_exam'][i])
+        row['grade_semesters'] = list(grades.keys())
+        row['grade_values'] = list(grades.values())
+        row['prerequisite_groups'] = encode_prerequisite_groups(snapshot.prerequisites(i))
+        return row
+
+
+def open_snapshot(path, verify=False):
+    """
+    Open a snapshot directory with every array memory-mapped (zero-copy).
+
+    Args:
+        path: Snapshot directory
+        verify: Re-hash every file against the manifest (reads the whole snapshot)
+
+    Returns:
+        SemesterSnapshot
+    """
+    path = Path(path)
+    with open(path / MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != SNAPSHOT_FORMAT or manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot at {path}: {manifest.get('format')} v{manifest.get('format_version')}, "
+            f"expected {SNAPSHOT_FORMAT} v{SNAPSHOT_FORMAT_VERSION}"
+        )
+
+    arrays = {}
+    for name, info in manifest['files'].items():
+        file_path = path / info['file']
+        if verify and _file_sha256(file_path) != info['sha256']:
+            raise ValueError(f"Snapshot file {file_path} does not match its manifest hash")
+        # Empty arrays can't be memory-mapped
+        arrays[name] = np.load(file_path, mmap_mode='r' if np.prod(info['shape']) > 0 else None)
+
+    return SemesterSnapshot(path, manifest, arrays)
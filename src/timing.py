@@ -0,0 +1,69 @@
+import time
+import asyncio
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from src.metrics import observe_stage
+
+
+# Blocking work (model inference, Pinecone HTTP calls) awaited by the async pipeline
+ASYNC_WORKERS = 8
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="cheesespoon-io")
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call in the shared thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+@contextmanager
+def span(name):
+    """Time a block as pipeline stage `name` (exported as a /metrics histogram)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+class StageTimings:
+    """
+    Wall time of each named stage of one request, in milliseconds. Every stage
+    is also recorded in the /metrics stage histogram.
+
+    Stages may overlap (concurrent stages are timed independently), so their
+    sum can exceed `total_ms`.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = round(seconds * 1000, 2)
+            observe_stage(name, seconds)
+
+    async def measure(self, name, awaitable):
+        with self.stage(name):
+            return await awaitable
+
+    @property
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def as_dict(self):
+        return {**self.stages, 'total': self.total_ms}
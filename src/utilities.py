@@ -1,7 +1,7 @@
-import pdfplumber
-import re 
-import pandas as pd
-from src.knowledgebase import get_knowledgebase
+import logging
+import re
+
+logger = logging.getLogger(__name__)
 
 # SEMESTER_NAME = "WINTER_2025_2026"
 # KB = get_knowledgebase(SEMESTER_NAME,user_query="",only_ids_titles=True)
@@ -35,6 +35,8 @@ def parse_grades_pdf(file_storage):
     completed_courses = []
     seen_ids = set()
 
+    import pdfplumber
+
     try:
         with pdfplumber.open(file_storage) as pdf:
             for page in pdf.pages:
@@ -90,7 +92,7 @@ def parse_grades_pdf(file_storage):
                             seen_ids.add(course_id)
 
     except Exception as e:
-        print(f"Error parsing PDF: {e}")
+        logger.error("Error parsing PDF: %s", e)
         return []
     
     return completed_courses
@@ -122,9 +124,24 @@ def parse_review_summary(text):
     
     return parsed
 
-# --- 3. Helper function to normalize format to 6 digit ---
+# --- 3. Helper function to normalize format to 6 digit (8-digit 0ABC0DEF -> ABCDEF) ---
 def normalize_course_id(s: str) -> str:
-    return re.sub(r"\D", "", s)[:6]
+    digits = re.sub(r"\D", "", s)
+    if len(digits) == 8 and digits[0] == "0" and digits[4] == "0":
+        return digits[1:4] + digits[5:]
+    return digits[:6]
+
+# --- Canonical 8-digit course ID, the same for the old 6-digit and new 8-digit forms ---
+def canonical_course_id(s) -> str:
+    digits = re.sub(r"\D", "", str(s or ""))
+    if not digits:
+        # Empty or non-numeric input is not a course ID
+        return ""
+    if len(digits) <= 6:
+        # Old format ABCDEF -> 0ABC0DEF (leading zeros may have been dropped)
+        digits = digits.zfill(6)
+        return f"0{digits[:3]}0{digits[3:]}"
+    return digits.zfill(8)
 
 # --- 4. Helper function clean course description to show it in "Full Details" window ---
 def clean_description(text):
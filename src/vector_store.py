@@ -0,0 +1,403 @@
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+import numpy as np
+from src.config import load_env
+from src.ann import load_ann_for_snapshot
+from src.quantization import load_quantized_for_snapshot
+from src.snapshot import (SnapshotMetadata, course_from_metadata, is_snapshot, open_snapshot,
+                          write_snapshot)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_INDEX_DIR = Path(__file__).resolve().parent.parent / "data" / "indexes"
+# Queries asking for more matches than this scan every vector instead of the ANN index
+ANN_MAX_TOP_K = 1000
+
+_local_indexes = {}
+_local_indexes_lock = threading.Lock()
+
+
+# ============================================================================
+# PINECONE-COMPATIBLE RESPONSE OBJECTS
+# ============================================================================
+# The serving code reads matches both as objects (match.id, match.metadata)
+# and as dicts (match["metadata"], match["id"]), so these support both.
+
+class _Record:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if name != 'values')
+        return f"{type(self).__name__}({fields})"
+
+
+class ScoredVector(_Record):
+    __slots__ = ('id', 'score', 'values', 'metadata')
+
+    def __init__(self, id, score, values=None, metadata=None):
+        self.id = id
+        self.score = score
+        self.values = values if values is not None else []
+        self.metadata = metadata
+
+
+class Vector(_Record):
+    __slots__ = ('id', 'values', 'metadata')
+
+    def __init__(self, id, values, metadata=None):
+        self.id = id
+        self.values = values
+        self.metadata = metadata
+
+
+class QueryResponse(_Record):
+    __slots__ = ('matches', 'namespace')
+
+    def __init__(self, matches, namespace=""):
+        self.matches = matches
+        self.namespace = namespace
+
+
+class FetchResponse(_Record):
+    __slots__ = ('vectors', 'namespace')
+
+    def __init__(self, vectors, namespace=""):
+        self.vectors = vectors
+        self.namespace = namespace
+
+
+class IndexStats(dict):
+    """describe_index_stats() result, readable as stats['dimension'] or stats.dimension"""
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+
+# ============================================================================
+# LOCAL INDEX
+# ============================================================================
+
+class MetadataTable:
+    """
+    Column-oriented metadata store: one list per field instead of one dict per course.
+
+    Rows are materialised as fresh dicts on demand, so callers can mutate the
+    returned metadata (the filter step adds 'ID', 'semantic_score', ...) without
+    corrupting the table.
+    """
+
+    def __init__(self, columns, num_rows):
+        self.columns = columns
+        self.num_rows = num_rows
+
+    @classmethod
+    def from_rows(cls, rows):
+        names = []
+        for row in rows:
+            for key in row:
+                if key not in names:
+                    names.append(key)
+        columns = {name: [row.get(name) for row in rows] for name in names}
+        return cls(columns, len(rows))
+
+    def column(self, name):
+        return self.columns.get(name, [None] * self.num_rows)
+
+    def row(self, i):
+        # Pinecone drops None-valued fields, so do the same
+        return {name: values[i] for name, values in self.columns.items() if values[i] is not None}
+
+
+class LocalVectorIndex:
+    """
+    In-memory stand-in for a Pinecone index over one semester's courses.
+
+    Embeddings live in one contiguous float32 matrix with L2-normalised rows,
+    so exact cosine scoring of a query is a single matrix-vector product.
+    With an `ann` index (src/ann.py) queries for fewer than all vectors scan
+    only the probed lists instead; with `quantized` codes (src/quantization.py)
+    they scan the int8/binary codes and rescore a shortlist with the float rows.
+    Implements the subset of the Pinecone Index API used by the app: query,
+    fetch, upsert and describe_index_stats.
+    """
+
+    def __init__(self, ids, embeddings, metadata, name=None, normalized=False, version=None, ann=None,
+                 quantized=None):
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(ids):
+            raise ValueError(f"Expected {len(ids)} embedding rows, got shape {embeddings.shape}")
+
+        if normalized:
+            # Already unit-length (e.g. a memory-mapped snapshot) - use as is, no copy
+            self.embeddings = embeddings
+        else:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.embeddings = embeddings / norms
+        self.ids = [str(i) for i in ids]
+        self.metadata = metadata
+        self.name = name
+        self.version = version
+        self.snapshot = None
+        self.ann = ann
+        self.quantized = quantized
+        self._row_by_id = {course_id: row for row, course_id in enumerate(self.ids)}
+        # Upserted rows: metadata overrides and a growable copy of the matrix
+        self._metadata_overrides = {}
+        self._buffer = None
+
+    @classmethod
+    def from_records(cls, records, name=None):
+        """Build from Pinecone-style upsert records: [{'id', 'values', 'metadata'}, ...]"""
+        ids = [r['id'] for r in records]
+        embeddings = np.array([r['values'] for r in records], dtype=np.float32)
+        metadata = MetadataTable.from_rows([r.get('metadata') or {} for r in records])
+        return cls(ids, embeddings, metadata, name=name)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Serve a memory-mapped SemesterSnapshot without copying its arrays."""
+        index = cls(snapshot.ids, snapshot.embeddings, SnapshotMetadata(snapshot),
+                    name=snapshot.semester, normalized=True, version=snapshot.version,
+                    ann=load_ann_for_snapshot(snapshot), quantized=load_quantized_for_snapshot(snapshot))
+        index.snapshot = snapshot
+        return index
+
+    @property
+    def dimension(self):
+        return self.embeddings.shape[1]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def score(self, vector):
+        """Cosine similarity of `vector` against every course, in index order."""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        return self.embeddings @ (query / norm)
+
+    def _metadata_row(self, row):
+        override = self._metadata_overrides.get(row)
+        return dict(override) if override is not None else self.metadata.row(row)
+
+    def _search(self, vector, top_k, nprobe=None):
+        """(rows, scores) of the top_k matches, best first."""
+        # Large top_k (recommendation candidate sets ask for the whole catalog) is exact:
+        # probing a few IVF lists would silently drop courses, and quantized estimates
+        # beyond the rescore budget would reorder them
+        use_ann = self.ann is not None and top_k <= min(ANN_MAX_TOP_K, len(self.ids) - 1)
+        use_quantized = self.quantized is not None and top_k <= self.quantized.max_rescore
+        if use_ann or use_quantized:
+            query = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm > 0 and use_ann:
+                return self.ann.search(self.embeddings, query / norm, top_k, nprobe=nprobe)
+            if norm > 0:
+                return self.quantized.search(self.embeddings, query / norm, top_k)
+
+        scores = self.score(vector)
+        if top_k < len(scores):
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+        else:
+            top = np.argsort(-scores, kind='stable')
+        return top, scores[top]
+
+    def query(self, vector=None, top_k=10, include_metadata=False, include_values=False, id=None, nprobe=None,
+              **kwargs):
+        # kwargs absorbs Pinecone-only options such as timeout or namespace;
+        # nprobe tunes the ANN recall/latency trade-off per query
+        if vector is None:
+            if id is None:
+                raise ValueError("Either vector or id must be provided")
+            vector = self.embeddings[self._row_by_id[str(id)]]
+
+        top_k = min(int(top_k), len(self.ids))
+        if top_k <= 0:
+            return QueryResponse([])
+
+        rows, scores = self._search(vector, top_k, nprobe)
+        matches = [
+            ScoredVector(
+                id=self.ids[row],
+                score=float(score),
+                values=self.embeddings[row].tolist() if include_values else None,
+                metadata=self._metadata_row(row) if include_metadata else None,
+            )
+            for row, score in zip(rows, scores)
+        ]
+        return QueryResponse(matches)
+
+    def _grow(self, count):
+        """Make room for `count` more rows in a writable, over-allocated copy of the matrix."""
+        n = len(self.ids)
+        if self._buffer is None or len(self._buffer) < n + count:
+            buffer = np.empty((max(n + count, 2 * n, 16), self.dimension), dtype=np.float32)
+            buffer[:n] = self.embeddings
+            self._buffer = buffer
+        self.embeddings = self._buffer[:n + count]
+
+    def upsert(self, vectors, **kwargs):
+        """
+        Insert or overwrite vectors, Pinecone style: [{'id', 'values', 'metadata'}, ...]
+        or (id, values[, metadata]) tuples.
+
+        New vectors are searchable (and added to the ANN lists and quantized
+        codes) right away. They
+        live in memory only; write a new snapshot (export_index) to keep them.
+        """
+        records = [r if isinstance(r, dict) else dict(zip(('id', 'values', 'metadata'), r)) for r in vectors]
+        new = [r for r in records if str(r['id']) not in self._row_by_id]
+        self._grow(len(new))
+
+        first_new = len(self.ids)
+        for offset, record in enumerate(new):
+            self.ids.append(str(record['id']))
+            self._row_by_id[str(record['id'])] = first_new + offset
+
+        rows = np.array([self._row_by_id[str(r['id'])] for r in records], dtype=np.int64)
+        values = np.array([r['values'] for r in records], dtype=np.float32).reshape(len(records), -1)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.embeddings[rows] = values / norms
+        for row, record in zip(rows, records):
+            self._metadata_overrides[int(row)] = dict(record.get('metadata') or {})
+
+        if self.ann is not None:
+            updated = rows[rows < first_new]
+            if len(updated):
+                self.ann.remove(updated)
+            self.ann.add(rows, self.embeddings[rows])
+        if self.quantized is not None:
+            self.quantized.set_rows(rows, self.embeddings[rows])
+        return {'upserted_count': len(records)}
+
+    def fetch(self, ids, **kwargs):
+        vectors = {}
+        for course_id in ids:
+            row = self._row_by_id.get(str(course_id))
+            if row is None:
+                continue
+            vectors[self.ids[row]] = Vector(
+                id=self.ids[row],
+                values=self.embeddings[row].tolist(),
+                metadata=self._metadata_row(row),
+            )
+        return FetchResponse(vectors)
+
+    def metadata_for(self, ids):
+        """{id: metadata} for the given IDs, without materialising their vectors."""
+        return {
+            str(course_id): self._metadata_row(self._row_by_id[str(course_id)])
+            for course_id in ids if str(course_id) in self._row_by_id
+        }
+
+    def describe_index_stats(self, **kwargs):
+        return IndexStats(
+            dimension=self.dimension,
+            index_fullness=0.0,
+            total_vector_count=len(self.ids),
+            namespaces={"": {"vector_count": len(self.ids)}},
+        )
+
+
+# ============================================================================
+# LOADING / SAVING
+# ============================================================================
+
+def get_vector_store_backend():
+    """'pinecone' (default) or 'local', from the VECTOR_STORE_BACKEND env var"""
+    load_env()
+    return os.getenv("VECTOR_STORE_BACKEND", "pinecone").strip().lower()
+
+
+def get_local_index_dir():
+    load_env()
+    return Path(os.getenv("LOCAL_INDEX_DIR", DEFAULT_LOCAL_INDEX_DIR))
+
+
+def get_local_index(semester_name):
+    """Load a semester's local index once per process and reuse it."""
+    index = _local_indexes.get(semester_name)
+    if index is not None:
+        return index
+
+    with _local_indexes_lock:
+        index = _local_indexes.get(semester_name)
+        if index is None:
+            path = get_local_index_dir() / semester_name
+            if not is_snapshot(path):
+                raise ValueError(f"No local snapshot found for semester {semester_name} at {path}")
+            index = LocalVectorIndex.from_snapshot(open_snapshot(path))
+            _local_indexes[semester_name] = index
+            logger.info("Loaded local index %s: %d vectors, dim %d", semester_name, len(index), index.dimension)
+    return index
+
+
+def export_index(index, path, semester_name=None, batch_size=100, model_name=None):
+    """
+    Copy every vector of a (Pinecone) index into a local semester snapshot.
+
+    IDs are listed with a dummy query (ids only, so the 10000 limit applies) and
+    vectors are then fetched in batches together with their metadata. A local
+    index (e.g. one with upserted vectors) is copied in full.
+    """
+    stats = index.describe_index_stats()
+    dimension = stats['dimension']
+    if isinstance(index, LocalVectorIndex):
+        all_ids = list(index.ids)
+    else:
+        response = index.query(vector=[0.0] * dimension, top_k=10000, include_metadata=False)
+        all_ids = [m.id for m in response.matches]
+
+    ids, embeddings, metadata_rows = [], [], []
+    for start in range(0, len(all_ids), batch_size):
+        fetched = index.fetch(ids=all_ids[start:start + batch_size])
+        for course_id, vector in fetched.vectors.items():
+            ids.append(course_id)
+            embeddings.append(vector.values)
+            metadata_rows.append(dict(vector.metadata or {}))
+
+    write_snapshot(
+        path,
+        semester_name or Path(path).name,
+        ids,
+        np.array(embeddings, dtype=np.float32).reshape(-1, dimension),
+        [course_from_metadata(metadata) for metadata in metadata_rows],
+        model_name=model_name,
+    )
+    return len(ids)
+
+
+# Export semesters from Pinecone: python -m src.vector_store WINTER_2025_2026 WINTER_2025_2026_RAG
+if __name__ == "__main__":
+    from src.config import configure_logging
+    from src.connections import get_pinecone
+
+    configure_logging()
+    pc = get_pinecone()
+    for semester in sys.argv[1:]:
+        host = os.getenv(semester)
+        if not host:
+            raise ValueError(f"No index found for semester: {semester}")
+        count = export_index(pc.Index(host=host), get_local_index_dir() / semester, semester,
+                             model_name=os.getenv("EMBEDDING_MODEL"))
+        print(f"✅ Exported {count} vectors for {semester}")
@@ -0,0 +1,94 @@
+import pytest
+import app as webapp
+from src.autocomplete import CourseCompleter
+from src.utilities import canonical_course_id
+
+COURSES = {
+    "094101": "00940101 - מבוא להנדסת תעשיה וניהול",
+    "104012": "01040012 - חשבון דיפרנציאלי ואינטגרלי 1ת",
+    "114071": "01140071 - פיזיקה 1מ",
+    "114052": "01140052 - פיזיקה 2",
+    "00960210": "00960210 - מבוא לסטטיסטיקה",
+    "234111": "02340111 - מבוא למדעי המחשב מ'",
+}
+
+
+@pytest.fixture
+def completer():
+    return CourseCompleter(list(COURSES), list(COURSES.values()))
+
+
+def _ids(matches):
+    return [match['id'] for match in matches]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("0941", ["094101"]),                # 6-digit prefix
+    ("009401", ["094101"]),              # 8-digit prefix
+    ("0096 0210", ["00960210"]),         # separators inside an ID
+    ("1140", ["114052", "114071"]),
+])
+def test_id_prefix_completion(completer, query, expected):
+    assert sorted(_ids(completer.complete(query))) == expected
+
+
+def test_title_prefix_completion(completer):
+    # Title starts rank before later words, shorter titles first
+    assert _ids(completer.complete("מבוא")) == ["00960210", "234111", "094101"]
+    assert _ids(completer.complete("להנדס")) == ["094101"]
+    assert _ids(completer.complete("פיזיקה 2")) == ["114052"]
+    assert _ids(completer.complete("למדעי המחש")) == ["234111"]
+
+
+def test_hebrew_final_letters_and_niqqud(completer):
+    # Final letters match their regular forms, so a finished word still completes
+    assert _ids(completer.complete("חשבון")) == _ids(completer.complete("חשבונ")) == ["104012"]
+    assert _ids(completer.complete("מָבוֹא לסטט")) == ["00960210"]
+    assert _ids(completer.complete("לסטטיסטיקה")) == ["00960210"]
+    assert _ids(completer.complete("מבוא למדעים")) == []
+
+
+def test_limit_and_empty_queries(completer):
+    assert len(completer.complete("מבוא", limit=2)) == 2
+    assert completer.complete("") == []
+    assert completer.complete("   ") == []
+    assert completer.complete("-") == []
+
+
+def test_match_fields(completer):
+    (match,) = completer.complete("094101")
+    assert match == {'id': "094101", 'canonical_id': "00940101", 'legacy_id': "094101",
+                     'name': "מבוא להנדסת תעשיה וניהול"}
+
+
+@pytest.mark.parametrize("course_id, expected", [
+    ("094101", "094101"),
+    ("00940101", "094101"),
+    ("104012", "104012"),
+    ("00960210", "00960210"),
+    ("960210", None),                    # 6-digit form of a different course (09600210)
+    ("99999999", None),
+    ("", None),
+    ("פיזיקה", None),
+])
+def test_lookup_either_id_form(completer, course_id, expected):
+    assert completer.lookup(course_id) == expected
+
+
+@pytest.mark.parametrize("value", ["", None, "abc", "פיזיקה", " - "])
+def test_canonical_course_id_of_non_ids_is_empty(value):
+    assert canonical_course_id(value) == ""
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("094101", "094101"),
+    (" 00940101 ", "094101"),
+    ("פיזיקה 2", "114052"),              # a name with a number is not ID "2"
+    ("2", "234111"),                     # partial IDs complete
+    ("0941", "094101"),
+    ("לא קיים", ""),
+])
+def test_resolve_course_input(monkeypatch, completer, query, expected):
+    monkeypatch.setattr(webapp, "get_completer", lambda semester: completer)
+    with webapp.app.test_request_context():
+        assert webapp.resolve_course_input("WINTER_2025_2026", query) == expected
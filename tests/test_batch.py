@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_catalog
+from src.batch import parse_profile, recommend_batch
+from src.embeddings import cache_query_embedding
+from src.knowledgebase import recommend_courses
+from src.snapshot import course_from_metadata, write_snapshot
+
+SEMESTER = "TEST_BATCH_PARITY"
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    catalog = generate_catalog(600, dim=32, seed=5)
+    directory = tmp_path_factory.mktemp("snapshots")
+    write_snapshot(directory / SEMESTER, SEMESTER, catalog.ids, catalog.embeddings,
+                   [course_from_metadata(metadata) for metadata in catalog.metadata])
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("VECTOR_STORE_BACKEND", "local")
+        patch.setenv("LOCAL_INDEX_DIR", str(directory))
+        yield catalog
+
+
+def _profiles(catalog):
+    raw = []
+    for i in range(6):
+        query, vector = catalog.query(seed=i)
+        cache_query_embedding(query, vector)
+        raw.append({'completed': catalog.completed_courses(10 * i, seed=i), 'query': query, 'top_n': 10})
+    # A course title (keyword match), no query, and non-default filters and weights
+    title = catalog.metadata[3]['title'].split(' - ', 1)[1]
+    cache_query_embedding(title, catalog.embeddings[3])
+    raw.append({'query': title, 'top_n': 5})
+    raw.append({'completed': catalog.completed_courses(30, seed=9), 'top_n': 20})
+    raw.append({'query': raw[0]['query'], 'no_exam': True, 'min_credits': 3, 'top_n': 15,
+                'weights': {'semantic': 0.7, 'credits': 0, 'avg_grade': 0.3}})
+    return [parse_profile({**profile, 'semester': SEMESTER}, i) for i, profile in enumerate(raw)]
+
+
+def test_batch_matches_recommend_courses(catalog):
+    profiles = _profiles(catalog)
+    batch = recommend_batch(profiles)
+
+    for profile in profiles:
+        expected = recommend_courses(SEMESTER, profile['completed'], profile['no_exam'], profile['min_credits'],
+                                     profile['query'], *profile['weights'], top_n=profile['top_n'])
+        rows = batch[batch['student_id'] == profile['student_id']]
+        assert list(rows['course_id']) == [str(c) for c in expected['ID']]
+        assert np.allclose(rows['combined_score'], expected['combined_score'], atol=1e-5)
+        assert np.allclose(rows['semantic_score'], expected['semantic_score'], atol=1e-5)
+        assert (rows['eligible_count'] == expected.attrs['eligible_count']).all()
+
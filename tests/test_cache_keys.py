@@ -0,0 +1,85 @@
+import pytest
+import src.knowledgebase
+from src.knowledgebase import candidate_set_key, recommendation_cache_key
+
+WEIGHTS = (0.2, 0.2, 0.2, 0.2, 0.2)
+
+
+@pytest.fixture(autouse=True)
+def pinecone_backend(monkeypatch):
+    monkeypatch.setenv("VECTOR_STORE_BACKEND", "pinecone")
+
+
+def _keys(courses_list=("104012", "234111"), user_query="מבוא למדעי המחשב", semester="WINTER_2025_2026",
+          no_exam=False, min_credits=0, weights=WEIGHTS, top_n=None):
+    return (candidate_set_key(semester, list(courses_list), no_exam, min_credits, user_query),
+            recommendation_cache_key(semester, list(courses_list), no_exam, min_credits, user_query, weights, top_n))
+
+
+@pytest.mark.parametrize("courses_list", [
+    ("234111", "104012"),                       # order
+    ("104012", "234111", "104012"),             # duplicates
+    (104012, "234111"),                         # int and str IDs
+])
+def test_equivalent_completed_lists_share_keys(courses_list):
+    assert _keys(courses_list) == _keys()
+
+
+@pytest.mark.parametrize("user_query", [
+    "  מבוא למדעי המחשב ",
+    "מבוא\tלמדעי  המחשב",
+    "מבוא למדעי\nהמחשב",
+])
+def test_equivalent_queries_share_keys(user_query):
+    assert _keys(user_query=user_query) == _keys()
+
+
+def test_decomposed_unicode_shares_keys():
+    assert _keys(user_query="cafe\u0301") == _keys(user_query="caf\u00e9")
+
+
+def test_unset_filters_share_keys():
+    assert _keys(no_exam=None, min_credits=None) == _keys(no_exam=False, min_credits=0)
+    assert _keys(min_credits="3") == _keys(min_credits=3.0)
+
+
+def test_six_and_eight_digit_ids_are_distinct():
+    # Eligibility matches completed IDs exactly as stored in the index (see
+    # check_prerequisites), so the two forms can give different results
+    six, eight = _keys(["104012"]), _keys(["01040012"])
+    assert six[0] != eight[0] and six[1] != eight[1]
+
+
+@pytest.mark.parametrize("change", [
+    dict(courses_list=("104012",)),
+    dict(courses_list=("104012", "234111", "234112")),
+    dict(user_query="מבוא למדעי המחשב 2"),
+    dict(semester="SPRING_2026"),
+    dict(no_exam=True),
+    dict(min_credits=2),
+])
+def test_retrieval_inputs_change_both_keys(change):
+    candidates, result = _keys(**change)
+    assert candidates != _keys()[0]
+    assert result != _keys()[1]
+
+
+@pytest.mark.parametrize("change", [
+    dict(weights=(0.9, 0, 0.1, 0, 0)),
+    dict(top_n=10),
+])
+def test_weights_and_page_size_only_change_the_result_key(change):
+    candidates, result = _keys(**change)
+    assert candidates == _keys()[0]
+    assert result != _keys()[1]
+
+
+def test_weights_are_rounded():
+    assert _keys(weights=(0.2 + 1e-9,) + WEIGHTS[1:]) == _keys()
+
+
+def test_new_snapshot_version_changes_keys(monkeypatch):
+    before = _keys()
+    monkeypatch.setattr(src.knowledgebase, "get_semester_version", lambda semester_name: "v2")
+    after = _keys()
+    assert before[0] != after[0] and before[1] != after[1]
@@ -0,0 +1,221 @@
+import os
+import time
+import socket
+import threading
+import socketserver
+import numpy as np
+import pytest
+import src.embeddings as embeddings
+from src.embedding_server import (EmbeddingClient, EmbeddingServer, EmbeddingServerError, _HEADER,
+                                  _json_frame, _recv_frame, _send_frames)
+
+MODEL = "test-e5"
+DIM = 16
+
+
+class FakeModel:
+    """Deterministic stand-in for a SentenceTransformer (vectors derived from the text)."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.batches.append(len(texts))
+        time.sleep(self.delay)
+        vectors = np.stack([np.random.default_rng(list(text.encode())).normal(size=DIM) for text in texts])
+        vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    # AF_UNIX paths are limited to ~100 bytes; pytest's tmp_path can be longer
+    path = f"/tmp/cheesespoon-test-{os.getpid()}-{tmp_path.name}.sock"
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _start(server):
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def model():
+    return FakeModel(delay=0.02)
+
+
+@pytest.fixture
+def server(socket_path, model):
+    server = _start(EmbeddingServer(socket_path, MODEL, model.encode, max_batch=64, max_wait_ms=20))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_vectors_match_direct_embed_query(monkeypatch, server, model, socket_path):
+    monkeypatch.setenv("EMBEDDING_MODEL", MODEL)
+    monkeypatch.delenv("EMBEDDING_SERVER_SOCKET", raising=False)
+    monkeypatch.setitem(embeddings._models, MODEL, model)
+    cache, _ = embeddings._get_query_cache()
+    cache.clear()
+    direct = embeddings.embed_query("מה אומרים על המבחן?")
+    direct_many = embeddings.embed_queries(["אלגברה", "חדו\"א"])
+
+    cache.clear()
+    monkeypatch.setenv("EMBEDDING_SERVER_SOCKET", socket_path)
+    batches = len(model.batches)
+    assert np.allclose(embeddings.embed_query("מה אומרים על המבחן?"), direct, atol=1e-6)
+    assert np.allclose(embeddings.embed_queries(["אלגברה", "חדו\"א"]), direct_many, atol=1e-6)
+    # Both went through the server's batcher
+    assert server.batcher.stats()['requests'] == 2 and len(model.batches) == batches + 2
+    cache.clear()
+
+
+def test_concurrent_requests_are_batched(server, socket_path):
+    client = EmbeddingClient(socket_path)
+    count = 24
+    start = threading.Barrier(count)
+    results = [None] * count
+
+    def request(i):
+        start.wait()
+        results[i] = client.embed([f"query: {i}"], MODEL)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = client.stats()
+    assert stats['requests'] == count and stats['texts'] == count
+    assert stats['batches'] < count and max(map(int, stats['batch_sizes'])) > 1
+    # Each caller got its own rows back
+    expected = FakeModel().encode([f"query: {i}" for i in range(count)])
+    assert np.allclose(np.vstack(results), expected, atol=1e-6)
+
+
+def test_retry_when_the_request_was_never_sent(server, socket_path, model):
+    client = EmbeddingClient(socket_path)
+    connect = client._connection
+    attempts = []
+
+    def flaky_connection():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionRefusedError("server restarting")
+        return connect()
+
+    client._connection = flaky_connection
+    assert client.embed(["query: x"], MODEL).shape == (1, DIM)
+    assert len(attempts) == 2 and server.batcher.stats()['requests'] == 1
+
+
+def test_missing_socket_is_retried_once_then_fails(socket_path):
+    client = EmbeddingClient(socket_path)
+    connect = client._connection
+    attempts = []
+    client._connection = lambda: attempts.append(1) or connect()
+    with pytest.raises(EmbeddingServerError, match="unavailable"):
+        client.embed(["query: x"], MODEL)
+    assert len(attempts) == 2
+
+
+class _OneShotHandler(socketserver.BaseRequestHandler):
+    """Reads one request, then replies with server.reply (closing the connection if None)."""
+
+    def handle(self):
+        _recv_frame(self.request)
+        self.server.requests += 1
+        if self.server.reply is not None:
+            self.request.sendall(self.server.reply)
+
+
+@pytest.fixture
+def raw_server(socket_path):
+    server = socketserver.ThreadingUnixStreamServer(socket_path, _OneShotHandler)
+    server.daemon_threads = True
+    server.requests, server.reply = 0, None
+    yield _start(server)
+    server.shutdown()
+    server.server_close()
+
+
+def test_no_retry_once_the_request_was_sent(raw_server, socket_path):
+    client = EmbeddingClient(socket_path)
+    with pytest.raises(EmbeddingServerError, match="unavailable"):
+        client.embed(["query: x"], MODEL)
+    assert raw_server.requests == 1
+
+
+def test_no_retry_after_a_timeout(socket_path):
+    slow = FakeModel(delay=0.5)
+    server = _start(EmbeddingServer(socket_path, MODEL, slow.encode, max_wait_ms=0))
+    try:
+        with pytest.raises(EmbeddingServerError, match="unavailable"):
+            EmbeddingClient(socket_path, timeout=0.1).embed(["query: x"], MODEL)
+        time.sleep(0.6)
+        assert server.batcher.stats()['requests'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("reply", [
+    _HEADER.pack(9) + b"not json!",
+    _HEADER.pack(2) + b"[]",
+    _HEADER.pack(2) + b"\xff\xfe",
+])
+def test_malformed_reply_frames(raw_server, socket_path, reply):
+    raw_server.reply = reply
+    client = EmbeddingClient(socket_path)
+    with pytest.raises(EmbeddingServerError, match="Malformed reply"):
+        client.embed(["query: x"], MODEL)
+    assert raw_server.requests == 1
+
+
+def test_error_frames(server, socket_path):
+    client = EmbeddingClient(socket_path)
+    with pytest.raises(EmbeddingServerError, match="not other-model"):
+        client.embed(["query: x"], "other-model")
+    with pytest.raises(EmbeddingServerError, match="Unknown op"):
+        client._call({'op': 'reload'})
+    # The connection survives error replies
+    assert client.embed(["query: x"], MODEL).shape == (1, DIM)
+
+
+def test_encoding_failures_are_reported(socket_path):
+    def broken(texts):
+        raise RuntimeError("CUDA out of memory")
+
+    server = _start(EmbeddingServer(socket_path, MODEL, broken, max_wait_ms=0))
+    try:
+        with pytest.raises(EmbeddingServerError, match="Encoding failed: CUDA out of memory"):
+            EmbeddingClient(socket_path).embed(["query: x"], MODEL)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_survives_malformed_and_truncated_requests(server, socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(socket_path)
+        for payload in (b"{not json", b'"a string"', b"\xff"):
+            _send_frames(sock, payload)
+            assert b"Malformed request frame" in _recv_frame(sock)
+        _send_frames(sock, _json_frame({'op': 'embed', 'model': MODEL, 'texts': ["query: y"]}))
+        assert b'"count": 1' in _recv_frame(sock)
+        _recv_frame(sock)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(_HEADER.pack(100) + b"{\"op\"")  # header promises more than is sent
+
+    assert EmbeddingClient(socket_path).embed(["query: z"], MODEL).shape == (1, DIM)
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+import src.prerequisites
+from benchmarks.legacy import check_prerequisites
+from src.prerequisites import PrerequisiteIndex
+
+
+def _random_catalog(num_courses=300, seed=0):
+    """Course IDs in both 6- and 8-digit forms and OR-of-AND prerequisites, some on unknown IDs."""
+    rng = np.random.default_rng(seed)
+    ids = [f"{n:06d}" if n % 2 else f"0{n:07d}" for n in rng.choice(10_000_000, size=num_courses, replace=False)]
+    unknown = [f"{n:08d}" for n in range(10_000_000, 10_000_020)]
+    prerequisites = []
+    for row in range(num_courses):
+        groups = []
+        for _ in range(rng.choice([0, 0, 1, 2, 3])):
+            pool = ids[:row] + unknown if row else unknown
+            groups.append([pool[i] for i in rng.choice(len(pool), size=rng.integers(1, 4), replace=False)])
+        prerequisites.append(groups)
+    return ids, prerequisites, unknown, rng
+
+
+def _expected(prerequisites, completed):
+    return np.array([check_prerequisites(completed, groups) for groups in prerequisites])
+
+
+def _students(ids, unknown, rng, count=40):
+    students = [[], list(ids), unknown[:5]]
+    for _ in range(count):
+        size = rng.integers(1, len(ids))
+        students.append([ids[i] for i in rng.choice(len(ids), size=size, replace=False)] + unknown[:rng.integers(0, 3)])
+    return students
+
+
+def test_eligible_for_bitsets_matches_check_prerequisites():
+    ids, prerequisites, unknown, rng = _random_catalog()
+    index = PrerequisiteIndex(ids, prerequisites)
+    # More distinct prerequisite IDs than one 64-bit word holds
+    assert index.num_words > 1
+
+    students = _students(ids, unknown, rng)
+    bitsets = np.stack([index.completed_bitset(completed) for completed in students])
+    eligible = index.eligible_for_bitsets(bitsets)
+    for completed, row in zip(students, eligible):
+        assert np.array_equal(row, _expected(prerequisites, completed))
+        assert np.array_equal(index.eligible(completed), _expected(prerequisites, completed))
+
+
+def test_eligible_for_bitsets_is_chunk_independent(monkeypatch):
+    ids, prerequisites, unknown, rng = _random_catalog(seed=1)
+    index = PrerequisiteIndex(ids, prerequisites)
+    students = _students(ids, unknown, rng, count=10)
+    bitsets = np.stack([index.completed_bitset(completed) for completed in students])
+    expected = index.eligible_for_bitsets(bitsets)
+
+    monkeypatch.setattr(src.prerequisites, "CHUNK_WORDS", index.num_words * 3)
+    assert np.array_equal(index.eligible_for_bitsets(bitsets), expected)
+
+
+def test_eligible_rows_matches_check_prerequisites():
+    ids, prerequisites, unknown, rng = _random_catalog(seed=2)
+    index = PrerequisiteIndex(ids, prerequisites)
+    for completed in _students(ids, unknown, rng, count=10):
+        rows = rng.choice(len(ids), size=50, replace=False)
+        assert np.array_equal(index.eligible_rows(completed, rows), _expected(prerequisites, completed)[rows])
+
+
+@pytest.mark.parametrize("prerequisites, completed", [
+    ([], []),                                           # no prerequisites
+    ([["104012"]], []),
+    ([["104012", "104013"], ["234111"]], ["234111"]),   # second alternative
+    ([["104012", "104013"], ["234111"]], ["104012"]),   # half of a group
+    ([["104012", "104013"]], ["104012", "104013"]),
+    ([["99999999"]], ["99999999"]),                     # only known as a prerequisite
+    ([["104012"]], ["01040012"]),                       # 6- vs 8-digit forms are distinct IDs
+    ([["01040012"]], ["01040012", "00000000"]),         # unknown completed IDs are ignored
+])
+def test_single_course_cases(prerequisites, completed):
+    index = PrerequisiteIndex(["104012", "104013", "234111", "01040012", "00940100"],
+                              [[], [], [], [], prerequisites])
+    expected = _expected([[], [], [], [], prerequisites], completed)
+    assert np.array_equal(index.eligible(completed), expected)
+    assert np.array_equal(index.eligible_rows(completed, np.array([4, 0])), expected[[4, 0]])
+    assert np.array_equal(index.eligible_for_bitsets(index.completed_bitset(completed)[None, :])[0], expected)
+
+
+def test_clause_past_the_word_boundary():
+    ids = [f"{n:06d}" for n in range(100_000, 100_130)]
+    # The last course needs two courses interned at bits 64 and 129
+    prerequisites = [[[ids[i]]] for i in range(129)] + [[[ids[64], ids[129]]]]
+    index = PrerequisiteIndex(ids, prerequisites)
+    assert index.num_words == 3
+    assert not index.eligible([ids[64]])[-1]
+    assert index.eligible([ids[64], ids[129]])[-1]
+    assert index.eligible_rows([ids[64], ids[129]], np.array([129]))[0]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from src.quantization import QuantizedVectors
+from src.vector_store import LocalVectorIndex
+
+
+def _index(mode, n=3_000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"{i:08d}" for i in range(n)]
+    quantized = QuantizedVectors.build(vectors, mode)
+    return LocalVectorIndex(ids, vectors, None, normalized=True, quantized=quantized), vectors, rng
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_full_catalog_ranking_matches_exact(mode):
+    # Recommendation candidate sets ask for every row: the ranking must not change
+    index, vectors, rng = _index(mode)
+    query = rng.normal(size=vectors.shape[1]).astype(np.float32)
+    exact = vectors @ (query / np.linalg.norm(query))
+
+    matches = index.query(vector=query, top_k=len(vectors)).matches
+    assert [int(m.id) for m in matches] == np.argsort(-exact, kind='stable').tolist()
+    assert np.allclose([m.score for m in matches], np.sort(exact)[::-1], atol=1e-5)
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_returned_scores_are_exact(mode):
+    index, vectors, rng = _index(mode)
+    query = vectors[7] + rng.normal(scale=0.05, size=vectors.shape[1]).astype(np.float32)
+    exact = vectors @ (query / np.linalg.norm(query))
+
+    for top_k in (10, index.quantized.max_rescore, index.quantized.max_rescore + 1):
+        matches = index.query(vector=query, top_k=top_k).matches
+        assert len(matches) == top_k
+        assert np.allclose([m.score for m in matches], exact[[int(m.id) for m in matches]], atol=1e-5)
+    assert int(index.query(vector=query, top_k=1).matches[0].id) == 7
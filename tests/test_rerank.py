@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.legacy import rerank
+from src.course_metadata import DEFAULT_AVG_GRADE
+from src.rerank import build_feature_matrix, combined_scores, top_n_order, weight_vector
+
+WEIGHTS = [
+    (0.2, 0.2, 0.2, 0.2, 0.2),
+    (0.9, 0.0, 0.1, 0.0, 0.0),
+    (0.0, 1.0, 0.0, 0.0, 0.0),
+    (0.5, 0.1, 0.3, 0.05, 0.05),
+]
+
+
+@pytest.fixture
+def candidates():
+    """Candidate frame as the original filter built it, with every kind of missing value."""
+    rng = np.random.default_rng(0)
+    n = 500
+    frame = pd.DataFrame({
+        'ID': [f"{i:06d}" for i in range(n)],
+        'semantic_score': rng.uniform(0.6, 0.9, n),
+        'credits': rng.choice([2.0, 2.5, 3.0, 3.5, 4.0, 5.0], n),
+        'avg_grade_all_sem': rng.uniform(60, 95, n),
+        'workload_rating': rng.uniform(1, 5, n).round(1),
+        'general_rating': rng.uniform(1, 5, n).round(1),
+    })
+    for column, share in [('semantic_score', 0.05), ('credits', 0.05), ('avg_grade_all_sem', 0.2),
+                          ('workload_rating', 0.4), ('general_rating', 0.4)]:
+        frame.loc[rng.random(n) < share, column] = np.nan
+    # Courses with no grade history rerank as DEFAULT_AVG_GRADE
+    frame.loc[:9, 'avg_grade_all_sem'] = np.nan
+    return frame
+
+
+def _scores(frame, weights):
+    features = build_feature_matrix(frame['credits'].to_numpy(), frame['avg_grade_all_sem'].to_numpy(),
+                                    frame['workload_rating'].to_numpy(), frame['general_rating'].to_numpy())
+    return combined_scores(features, frame['semantic_score'].to_numpy(), weights[0], weight_vector(*weights[1:]))
+
+
+@pytest.mark.parametrize("weights", WEIGHTS)
+def test_combined_scores_match_pandas_rerank(candidates, weights):
+    expected = rerank(candidates, *weights).set_index('ID')['combined_score']
+    scores = pd.Series(_scores(candidates, weights), index=candidates['ID'])
+    assert np.allclose(scores[expected.index], expected, rtol=0, atol=1e-6)
+
+
+def test_missing_avg_grade_uses_default(candidates):
+    weights = (0, 0, 1, 0, 0)
+    scores = _scores(candidates, weights)
+    assert np.allclose(scores[:10], DEFAULT_AVG_GRADE / 100)
+    expected = rerank(candidates, *weights).set_index('ID')['combined_score']
+    assert np.allclose(expected[candidates['ID'][:10]], DEFAULT_AVG_GRADE / 100)
+
+
+@pytest.mark.parametrize("weights", WEIGHTS)
+@pytest.mark.parametrize("top_n", [1, 10, 100, None])
+def test_top_n_order_matches_pandas_order(candidates, weights, top_n):
+    scores = _scores(candidates, weights)
+    order = top_n_order(scores, top_n)
+    ranked = rerank(candidates, *weights)
+    count = len(candidates) if top_n is None else top_n
+    # Same scores in the same positions; tied courses may come in any order
+    assert np.allclose(scores[order], ranked['combined_score'][:count], rtol=0, atol=1e-6)
+    cutoff = ranked['combined_score'].iloc[count - 1]
+    clear = ranked['combined_score'][:count] > cutoff + 1e-6
+    assert set(candidates['ID'][order][clear.to_numpy()]) == set(ranked['ID'][:count][clear])
+
+
+def test_ties_break_by_row_whatever_top_n():
+    # Only a few distinct scores: argpartition must still return the stable full-sort prefix
+    scores = np.repeat(np.array([0.3, 0.5, 0.1, 0.5, 0.2], dtype=np.float32), 40)
+    full = top_n_order(scores)
+    assert np.array_equal(full, np.argsort(-scores, kind='stable'))
+    for top_n in (1, 5, 40, 79, 80, 81, 199):
+        assert np.array_equal(top_n_order(scores, top_n), full[:top_n])
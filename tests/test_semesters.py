@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic import SyntheticCatalog, StandInIndex, generate_catalog
+from src.connections import register_index
+from src.embeddings import cache_query_embedding
+from src.semesters import recommend_across_semesters
+
+
+@pytest.fixture
+def two_semesters(monkeypatch):
+    monkeypatch.setenv("VECTOR_STORE_BACKEND", "pinecone")
+    monkeypatch.setenv("HYBRID_SEARCH", "0")
+    first = generate_catalog(300, dim=32, seed=11)
+    # The second semester offers the first 200 courses, with twice the credits
+    metadata = [{**course, 'credits': course['credits'] * 2} for course in first.metadata[:200]]
+    second = SyntheticCatalog(first.ids[:200], first.embeddings[:200], metadata, first.levels[:200],
+                              first.topics, first.vocabulary, first.seed)
+    register_index("TEST_SEMESTERS_A", StandInIndex(first))
+    register_index("TEST_SEMESTERS_B", StandInIndex(second))
+    query, vector = first.query(seed=3)
+    cache_query_embedding(query, vector)
+    # A course only A offers and that has no prerequisites
+    only_a = next(row for row in range(200, 300) if first.levels[row] == 0)
+    return first, query, only_a
+
+
+def test_offering_semesters_come_from_catalog_membership(two_semesters):
+    first, query, only_a = two_semesters
+    # Credits only: the doubled offering in B always wins, and top_n=1 truncates both shards
+    ranked = recommend_across_semesters(["TEST_SEMESTERS_A", "TEST_SEMESTERS_B"], user_query=query, top_n=1,
+                                        semantic_weight=0, credits_weight=1, avg_grade_weight=0,
+                                        workload_rating_weight=0, general_rating_weight=0)
+    course = ranked.iloc[0]
+    assert course['semester'] == "TEST_SEMESTERS_B"
+    assert course['semesters'] == ["TEST_SEMESTERS_A", "TEST_SEMESTERS_B"]
+
+    ranked = recommend_across_semesters(["TEST_SEMESTERS_A", "TEST_SEMESTERS_B"], user_query=query, top_n=300,
+                                        semantic_weight=1, credits_weight=0, avg_grade_weight=0,
+                                        workload_rating_weight=0, general_rating_weight=0)
+    offered = dict(zip(ranked['ID'], ranked['semesters']))
+    assert offered[first.ids[only_a]] == ["TEST_SEMESTERS_A"]
+
+
+def test_credits_are_normalized_across_semesters(two_semesters):
+    first, query, only_a = two_semesters
+    ranked = recommend_across_semesters(["TEST_SEMESTERS_A", "TEST_SEMESTERS_B"], user_query=query, top_n=300,
+                                        semantic_weight=0, credits_weight=1, avg_grade_weight=0,
+                                        workload_rating_weight=0, general_rating_weight=0)
+    max_credits = 2 * max(course['credits'] for course in first.metadata[:200])
+    assert np.allclose(ranked['combined_score'], ranked['credits'] / max_credits, atol=1e-6)
+    # A course only in A is scored against B's larger credits too
+    course = ranked[ranked['ID'] == first.ids[only_a]].iloc[0]
+    assert course['combined_score'] == pytest.approx(first.metadata[only_a]['credits'] / max_credits)
@@ -0,0 +1,34 @@
+import numpy as np
+from src.ann import IVFIndex
+from src.vector_store import LocalVectorIndex
+
+
+def _clustered_index(n=12_000, dim=32, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = (centers[rng.integers(clusters, size=n)] + rng.normal(scale=0.3, size=(n, dim))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"{i:08d}" for i in range(n)]
+    index = LocalVectorIndex(ids, vectors, None, normalized=True, ann=IVFIndex.build(vectors, nprobe=2, seed=seed))
+    return index, vectors, rng
+
+
+def test_full_catalog_query_is_exact_with_ann():
+    # The recommendation candidate set asks for top_k=10000: every course must come back
+    index, vectors, rng = _clustered_index()
+    query = rng.normal(size=vectors.shape[1]).astype(np.float32)
+    expected = set(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:10_000])
+
+    matches = index.query(vector=query, top_k=10_000).matches
+    recall = len({int(m.id) for m in matches} & expected) / len(expected)
+    assert recall == 1.0
+
+
+def test_small_top_k_uses_ann():
+    index, vectors, rng = _clustered_index()
+    calls = []
+    search = index.ann.search
+    index.ann.search = lambda *args, **kwargs: calls.append(args) or search(*args, **kwargs)
+
+    index.query(vector=vectors[0], top_k=10)
+    assert calls